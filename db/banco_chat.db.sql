@@ -29,15 +29,25 @@ CREATE TABLE Cuentas (
     fecha_apertura DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX ix_cuentas_cliente ON Cuentas(id_cliente);
+
 CREATE TABLE Transacciones (
     id_transaccion INTEGER PRIMARY KEY AUTOINCREMENT,
     id_cuenta INTEGER,
     tipo TEXT,
     monto REAL,
     fecha DATETIME DEFAULT CURRENT_TIMESTAMP,
+    tx_id TEXT,
+    indice_mov INTEGER NOT NULL DEFAULT 0,
     FOREIGN KEY(id_cuenta) REFERENCES Cuentas(id_cuenta)
 );
 
+CREATE UNIQUE INDEX ux_transacciones_tx_mov ON Transacciones(tx_id, id_cuenta, tipo, indice_mov);
+
+CREATE INDEX ix_transacciones_cuenta_fecha ON Transacciones(id_cuenta, fecha);
+
+CREATE INDEX ix_transacciones_cuenta_id ON Transacciones(id_cuenta, id_transaccion);
+
 CREATE TABLE Prestamos (
     id_prestamo INTEGER PRIMARY KEY AUTOINCREMENT,
     id_cliente INTEGER,
@@ -46,3 +56,10 @@ CREATE TABLE Prestamos (
     estado TEXT,
     fecha_solicitud DATETIME DEFAULT CURRENT_TIMESTAMP
 );
+
+CREATE INDEX ix_prestamos_cliente ON Prestamos(id_cliente);
+
+CREATE INDEX ix_mensajes_fecha ON MensajesChat(fecha_envio);
+
+-- Versión de esquema de common/db_utils.py (MIGRACIONES) a la que equivale este archivo
+PRAGMA user_version = 5;
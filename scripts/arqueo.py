@@ -1,31 +1,184 @@
 # scripts/arqueo.py
-import socket
+import argparse
 import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexiones
 
 CENTRAL_SERVER = ("127.0.0.1", 6000)
+CONFIG_PATH = os.path.join(ROOT_DIR, "config", "nodos_config.json")
+
 
 def main():
     print(f"Conectando con el Servidor Central en {CENTRAL_SERVER} para el arqueo...")
     try:
-        with socket.create_connection(CENTRAL_SERVER, timeout=10) as s:
-            msg = json.dumps({"type": "ARQUEO"}) + "\n"
-            s.sendall(msg.encode())
-            resp = s.recv(4096).decode().strip()
-            j = json.loads(resp)
-            
-            if j.get("status") == "OK":
-                total = j.get("total_balance")
-                print("\n==================================")
-                print(f"  ARQUEO COMPLETADO CON ÉXITO")
-                print(f"  SALDO TOTAL DEL SISTEMA: {total:.2f}")
-                print("==================================\n")
-            else:
-                print("\n>> ERROR DURANTE EL ARQUEO:")
-                print(f">> {j.get('error', 'Respuesta de error inesperada.')}")
+        central = PoolConexiones(*CENTRAL_SERVER, max_conexiones=1, timeout=10)
+        j = central.solicitar({"type": "ARQUEO"}, reintentable=True)
+        central.cerrar()
+
+        if j.get("status") == "OK":
+            total = j.get("total_balance")
+            print("\n==================================")
+            print(f"  ARQUEO COMPLETADO CON ÉXITO")
+            print(f"  SALDO TOTAL DEL SISTEMA: {total:.2f}")
+            print("==================================\n")
+        else:
+            print("\n>> ERROR DURANTE EL ARQUEO:")
+            print(f">> {j.get('error', 'Respuesta de error inesperada.')}")
 
     except Exception as e:
         print(f"\n>> ERROR DE CONEXIÓN:")
         print(f">> No se pudo conectar al Servidor Central: {e}")
 
+
+# ------------------ Arqueo directo contra las réplicas ------------------ #
+#
+# Los nodos de Python responden SUM_PARTITION con el seq del último commit
+# aplicado y la cantidad de transacciones preparadas. Si dos lecturas seguidas
+# de todas las particiones devuelven los mismos seq, ninguna cambió entre ambas
+# y existe un instante en que todos los valores leídos eran ciertos a la vez.
+# Si además ninguna partición tiene transacciones preparadas, ningún 2PC estaba
+# confirmado en una partición y pendiente en otra: el corte es consistente.
+# Los nodos Java/Go no envían seq y se comparan solo por la suma.
+
+class Arqueador:
+    def __init__(self, config, timeout=2.0):
+        self.config = config
+        self.timeout = timeout
+        self.pools = {}
+        self.ejecutor = ThreadPoolExecutor(max_workers=16)
+
+    @staticmethod
+    def nombre(nodo):
+        return f"{nodo['host']}:{nodo['port']}"
+
+    def _sumar(self, nodo):
+        nombre = self.nombre(nodo)
+        pool = self.pools.get(nombre)
+        if pool is None:
+            pool = self.pools[nombre] = PoolConexiones(nodo["host"], nodo["port"], max_conexiones=1,
+                                                       timeout=self.timeout, espera_max=self.timeout)
+        try:
+            return pool.solicitar({"type": "SUM_PARTITION"}, reintentable=True)
+        except Exception as e:
+            return {"status": "ERROR", "error": str(e)}
+
+    def recolectar(self, nodos_por_particion):
+        """SUM_PARTITION en paralelo: {particion: [(nodo, respuesta), ...]}."""
+        pares = [(p, nodo) for p, nodos in nodos_por_particion.items() for nodo in nodos]
+        respuestas = list(self.ejecutor.map(lambda par: self._sumar(par[1]), pares))
+        resultado = {p: [] for p in nodos_por_particion}
+        for (p, nodo), resp in zip(pares, respuestas):
+            resultado[p].append((nodo, resp))
+        return resultado
+
+    def todas_las_replicas(self):
+        return {int(p): nodos for p, nodos in self.config["partitions_map"].items()}
+
+    def elegir_replicas(self):
+        """Una réplica que responda por partición, prefiriendo las que informan seq."""
+        elegidas = {}
+        for p, respuestas in self.recolectar(self.todas_las_replicas()).items():
+            vivas = [(n, r) for n, r in respuestas if r.get("status") == "OK"]
+            if not vivas:
+                raise RuntimeError(f"ninguna réplica de la partición {p} responde")
+            con_seq = [(n, r) for n, r in vivas if "seq" in r]
+            elegidas[p] = [(con_seq or vivas)[0][0]]
+        return elegidas
+
+    def corte_consistente(self, intentos=20, pausa=0.05):
+        """Suma total con doble lectura; devuelve (total, total ajustado, consistente, lectura)."""
+        replicas = self.elegir_replicas()
+        anterior = None
+        for _ in range(intentos):
+            lectura = {p: r[0][1] for p, r in self.recolectar(replicas).items()}
+            if any(r.get("status") != "OK" for r in lectura.values()):
+                anterior = None
+                continue
+            firma = {p: (r.get("seq"), r["sum"]) for p, r in lectura.items()}
+            sin_preparadas = all(not r.get("preparadas") for r in lectura.values())
+            if firma == anterior and sin_preparadas:
+                total = sum(r["sum"] for r in lectura.values())
+                ajustado = total + sum(r.get("pendiente", 0) for r in lectura.values())
+                return round(total, 2), round(ajustado, 2), True, lectura
+            anterior = firma
+            if not sin_preparadas:
+                time.sleep(pausa)
+        total = sum(r.get("sum", 0) for r in lectura.values())
+        ajustado = total + sum(r.get("pendiente", 0) for r in lectura.values())
+        return round(total, 2), round(ajustado, 2), False, lectura
+
+
+def arqueo_consistente(args):
+    arq = Arqueador(json.load(open(args.config)), timeout=args.timeout)
+    total, ajustado, consistente, lectura = arq.corte_consistente(args.intentos)
+    for p, r in sorted(lectura.items()):
+        print(f"  Partición {p}: {r.get('sum')}  (seq {r.get('seq', '-')}, preparadas {r.get('preparadas', '-')})")
+    print("\n==================================")
+    print(f"  SALDO TOTAL DEL SISTEMA: {total:.2f}")
+    if ajustado != total:
+        print(f"  INCLUYENDO TRANSACCIONES EN CURSO: {ajustado:.2f}")
+    print(f"  CORTE CONSISTENTE: {'sí' if consistente else 'no (el sistema no se detuvo entre lecturas)'}")
+    print("==================================\n")
+
+
+def arqueo_continuo(args):
+    """Consulta todas las réplicas cada `intervalo` segundos e informa la deriva entre ellas."""
+    arq = Arqueador(json.load(open(args.config)), timeout=args.timeout)
+    replicas = arq.todas_las_replicas()
+    max_deriva = {p: 0.0 for p in replicas}
+    print(f"Arqueo continuo de {sum(len(n) for n in replicas.values())} réplicas cada {args.intervalo}s (Ctrl+C para terminar)")
+    try:
+        while True:
+            inicio = time.monotonic()
+            lectura = arq.recolectar(replicas)
+            total = 0.0
+            marca = time.strftime("%H:%M:%S")
+            for p, respuestas in sorted(lectura.items()):
+                sumas = [r["sum"] for _, r in respuestas if r.get("status") == "OK"]
+                deriva = round(max(sumas) - min(sumas), 2) if sumas else 0.0
+                max_deriva[p] = max(max_deriva[p], deriva)
+                if sumas:
+                    total += sumas[0]
+                detalle = "  ".join(
+                    f"{arq.nombre(n)}={r['sum']:.2f}" + (f"@{r['seq']}" if "seq" in r else "")
+                    if r.get("status") == "OK" else f"{arq.nombre(n)}=caído"
+                    for n, r in respuestas)
+                aviso = "  <-- DERIVA" if deriva > args.tolerancia else ""
+                print(f"[{marca}] P{p} deriva {deriva:>10.2f}  {detalle}{aviso}")
+            print(f"[{marca}] total (primera réplica viva por partición): {total:.2f}")
+            time.sleep(max(0.0, args.intervalo - (time.monotonic() - inicio)))
+    except KeyboardInterrupt:
+        print("\nDeriva máxima observada por partición:")
+        for p, d in sorted(max_deriva.items()):
+            print(f"  Partición {p}: {d:.2f}")
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Arqueo del saldo total del sistema")
+    parser.add_argument("--continuo", action="store_true",
+                        help="consultar las réplicas periódicamente e informar la deriva entre ellas")
+    parser.add_argument("--consistente", action="store_true",
+                        help="sumar directamente en las particiones con un corte consistente (doble lectura)")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--intervalo", type=float, default=2.0)
+    parser.add_argument("--tolerancia", type=float, default=0.0, help="deriva a partir de la cual se marca una partición")
+    parser.add_argument("--intentos", type=int, default=20, help="rondas de lectura para buscar un corte consistente")
+    parser.add_argument("--timeout", type=float, default=2.0)
+    args = parser.parse_args()
+    if args.continuo:
+        arqueo_continuo(args)
+    elif args.consistente:
+        arqueo_consistente(args)
+    else:
+        main()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
@@ -0,0 +1,136 @@
+# scripts/bench_admision.py
+# Carga en lazo abierto (llegadas de Poisson a tasa fija, sin esperar a las respuestas) contra un nodo en modo
+# por hilos, con y sin control de admisión, a tasas crecientes. Mide el goodput: operaciones OK respondidas
+# dentro del SLO por segundo. Sin admisión el goodput cae al pasar la saturación; con admisión se mantiene.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexionesAsync
+from src.python.common.histograma import Histograma
+from utilidades_bench import detener, levantar_nodo
+
+PRIMERA_CUENTA = 1000
+
+
+async def operacion(conexiones, rnd, args):
+    """Una consulta o una transferencia (PREPARE_TRANSFER + COMMIT); devuelve el estado final."""
+    if rnd.random() >= args.transferencias:
+        cuenta = PRIMERA_CUENTA + rnd.randrange(args.cuentas)
+        resp = await conexiones.solicitar({"type": "CONSULTAR_CUENTA", "account": cuenta})
+        return resp.get("status")
+    # Las transferencias se concentran en pocas cuentas para que haya espera por locks
+    origen, destino = rnd.sample(range(PRIMERA_CUENTA, PRIMERA_CUENTA + args.calientes), 2)
+    tx_id = f"bench_{uuid.uuid4().hex}"
+    resp = await conexiones.solicitar(
+        {"type": "PREPARE_TRANSFER", "tx_id": tx_id, "from": origen, "to": destino, "amount": 0.01})
+    if resp.get("status") == "READY":
+        resp = await conexiones.solicitar({"type": "COMMIT", "tx_id": tx_id})
+        return "OK" if resp.get("status") == "COMMITTED" else "ERROR"
+    if resp.get("status") != "BUSY":
+        # PREPARE rechazado (lock ocupado, saldo): se aborta como haría el coordinador
+        await conexiones.solicitar({"type": "ABORT", "tx_id": tx_id})
+    return resp.get("status")
+
+
+async def medir_tasa(port, tasa, args, semilla):
+    # Sin reintentos: un BUSY se cuenta como tal en lugar de esperar retry_after
+    conexiones = PoolConexionesAsync("127.0.0.1", port, max_conexiones=args.conexiones, max_ociosas=args.conexiones,
+                                     timeout=30.0, timeout_conexion=30.0, reintentos=0)
+    rnd = random.Random(semilla)
+    latencias = Histograma()
+    estados = {"OK": 0, "BUSY": 0, "ERROR": 0, "fuera_de_slo": 0}
+    pendientes = set()
+
+    async def una(programada):
+        try:
+            estado = await operacion(conexiones, rnd, args)
+        except Exception:
+            estado = "ERROR"
+        # La latencia se cuenta desde la llegada programada: incluye la espera por una conexión libre
+        segundos = time.monotonic() - programada
+        if estado == "OK":
+            latencias.registrar(segundos * 1e6)
+            estados["OK" if segundos <= args.slo else "fuera_de_slo"] += 1
+        else:
+            estados["BUSY" if estado == "BUSY" else "ERROR"] += 1
+
+    inicio = time.monotonic()
+    programada = inicio
+    while programada < inicio + args.duracion:
+        programada += rnd.expovariate(tasa)
+        espera = programada - time.monotonic()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarea = asyncio.create_task(una(programada))
+        pendientes.add(tarea)
+        tarea.add_done_callback(pendientes.discard)
+    # Las operaciones que siguen en vuelo al terminar no se esperan más que el SLO: ya no cuentan como goodput
+    if pendientes:
+        await asyncio.wait(pendientes, timeout=args.slo)
+    for tarea in list(pendientes):
+        tarea.cancel()
+        estados["fuera_de_slo"] += 1
+    await asyncio.gather(*pendientes, return_exceptions=True)
+    conexiones.cerrar()
+    return estados, latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Goodput de un nodo por encima de la saturación, con y sin control de admisión")
+    parser.add_argument("--tasas", default="250,500,1000,2000,4000", help="operaciones por segundo ofrecidas")
+    parser.add_argument("--duracion", type=float, default=5.0, help="segundos por tasa")
+    parser.add_argument("--transferencias", type=float, default=0.3, help="fracción de operaciones que son transferencias")
+    parser.add_argument("--cuentas", type=int, default=10000)
+    parser.add_argument("--calientes", type=int, default=50, help="cuentas entre las que se hacen las transferencias")
+    parser.add_argument("--slo", type=float, default=0.2, help="segundos dentro de los que una respuesta cuenta como goodput")
+    parser.add_argument("--conexiones", type=int, default=512, help="conexiones simultáneas del cliente")
+    parser.add_argument("--hilos", type=int, default=16, help="--hilos del nodo con admisión")
+    parser.add_argument("--cola", type=int, default=64, help="--cola del nodo con admisión")
+    parser.add_argument("--espera-max-cola", type=float, default=0.1, help="--espera-max-cola del nodo con admisión")
+    parser.add_argument("--json", help="archivo donde guardar los resultados")
+    args = parser.parse_args()
+
+    variantes = (
+        ("sin admisión", ["--sin-admision"]),
+        ("con admisión", ["--hilos", str(args.hilos), "--cola", str(args.cola),
+                          "--espera-max-cola", str(args.espera_max_cola)]),
+    )
+    tasas = [int(t) for t in args.tasas.split(",")]
+    resultados = {}
+    print(f"{args.transferencias:.0%} transferencias entre {args.calientes} cuentas, SLO {args.slo * 1e3:.0f} ms, "
+          f"{args.duracion:.0f} s por tasa")
+    print(f"\n{'variante':<14}{'ofrecidas/s':>12}{'goodput/s':>11}{'fuera SLO':>11}{'BUSY':>8}{'errores':>9}"
+          f"{'p50 ms':>9}{'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, extra in variantes:
+            proc, port = levantar_nodo(os.path.join(tmp, nombre.replace(" ", "_")), cuentas=args.cuentas,
+                                       modo="hilos", extra=["--max-conexiones", "0", *extra])
+            try:
+                for i, tasa in enumerate(tasas):
+                    estados, h = asyncio.run(medir_tasa(port, tasa, args, semilla=i))
+                    r = h.resumen(escala=1e-3) if h.total else {"p50": 0.0, "p99": 0.0}
+                    resultados.setdefault(nombre, {})[tasa] = dict(estados, p50_ms=r["p50"], p99_ms=r["p99"])
+                    print(f"{nombre:<14}{tasa:>12}{estados['OK'] / args.duracion:>11,.0f}{estados['fuera_de_slo']:>11}"
+                          f"{estados['BUSY']:>8}{estados['ERROR']:>9}{r['p50']:>9.1f}{r['p99']:>9.1f}")
+                    # Se deja vaciar el nodo antes de la tasa siguiente
+                    time.sleep(1.0)
+            finally:
+                detener(proc)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
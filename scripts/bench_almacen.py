@@ -0,0 +1,71 @@
+# scripts/bench_almacen.py
+# Compara memoria y tiempo de búsqueda del almacén de cuentas dict vs compacto.
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.nodo_trabajador.almacen_cuentas import AlmacenDict, AlmacenCompacto
+
+
+def construir(clase, n, paso):
+    """Cuentas con ids como los de generar_datos.py para una partición (1000, 1000+paso, ...)."""
+    rnd = random.Random(7)
+    if clase is AlmacenCompacto:
+        ids = array('q', range(1000, 1000 + n * paso, paso))
+        saldos = array('q', (rnd.randrange(10000, 1000000) for _ in range(n)))
+        return AlmacenCompacto.desde_arreglos(ids, saldos)
+    almacen = AlmacenDict()
+    for acc in range(1000, 1000 + n * paso, paso):
+        almacen[acc] = rnd.randrange(10000, 1000000)
+    return almacen
+
+
+def medir(clase, n, paso, busquedas):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    almacen = construir(clase, n, paso)
+    t_carga = time.perf_counter() - t0
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rnd = random.Random(11)
+    claves = [1000 + rnd.randrange(n) * paso for _ in range(busquedas)]
+    t0 = time.perf_counter()
+    get = almacen.get
+    for acc in claves:
+        get(acc)
+    t_busqueda = (time.perf_counter() - t0) / busquedas
+
+    t0 = time.perf_counter()
+    almacen.total()
+    t_suma = time.perf_counter() - t0
+    return memoria, t_carga, t_busqueda, t_suma
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del almacén de cuentas")
+    parser.add_argument("--tamanos", default="10000,1000000,10000000",
+                        help="cantidades de cuentas separadas por coma")
+    parser.add_argument("--paso", type=int, default=3, help="separación entre ids (nº de particiones)")
+    parser.add_argument("--busquedas", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'cuentas':>10} {'almacén':<9} {'memoria':>10} {'B/cuenta':>9} {'carga s':>8} {'get µs':>7} {'suma ms':>8}")
+    for n in (int(x) for x in args.tamanos.split(",")):
+        for clase, nombre in ((AlmacenDict, "dict"), (AlmacenCompacto, "compacto")):
+            mem, carga, busqueda, suma = medir(clase, n, args.paso, args.busquedas)
+            print(f"{n:>10} {nombre:<9} {mem / 2**20:>8.1f}MB {mem / n:>9.1f} {carga:>8.2f} "
+                  f"{busqueda * 1e6:>7.3f} {suma * 1e3:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
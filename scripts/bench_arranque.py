@@ -0,0 +1,67 @@
+# scripts/bench_arranque.py
+# Mide cuánto tarda un nodo en cargar su partición desde el snapshot de texto y desde el binario.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common import snapshots
+from src.python.nodo_trabajador.almacen_cuentas import AlmacenDict, AlmacenCompacto
+
+
+def cronometrar(f):
+    t0 = time.perf_counter()
+    f()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque: snapshot de texto vs binario")
+    parser.add_argument("--tamanos", default="10000,100000,1000000,10000000")
+    args = parser.parse_args()
+
+    print(f"{'cuentas':>10} {'txt MB':>7} {'bin MB':>7} {'txt→compacto':>13} {'bin→compacto':>13} "
+          f"{'bin→dict':>9} {'mmap':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(x) for x in args.tamanos.split(",")):
+            rnd = random.Random(n)
+            ids = array('q', range(1000, 1000 + 3 * n, 3))
+            saldos = array('q', (rnd.randrange(10000, 1000000) for _ in range(n)))
+            txt = os.path.join(tmp, f"p{n}.txt")
+            binf = os.path.join(tmp, f"p{n}.bin")
+            snapshots.escribir_texto(txt, zip(ids, saldos))
+            snapshots.escribir_binario(binf, ids=ids, saldos=saldos)
+            del ids, saldos
+
+            def texto():
+                pares, _ = snapshots.leer_texto(txt)
+                AlmacenCompacto().cargar(pares)
+
+            def binario_compacto():
+                i, s, _ = snapshots.leer_binario(binf)
+                AlmacenCompacto().cargar_arreglos(i, s)
+
+            def binario_dict():
+                i, s, _ = snapshots.leer_binario(binf)
+                AlmacenDict().cargar_arreglos(i, s)
+
+            def mmap():
+                mm, i, s, _ = snapshots.mapear(binf)
+                i[len(i) // 2], s[len(s) // 2]
+                i.release()
+                s.release()
+                mm.close()
+
+            tiempos = [cronometrar(f) for f in (texto, binario_compacto, binario_dict, mmap)]
+            print(f"{n:>10} {os.path.getsize(txt) / 2**20:>7.1f} {os.path.getsize(binf) / 2**20:>7.1f} "
+                  f"{tiempos[0]:>12.3f}s {tiempos[1]:>12.3f}s {tiempos[2]:>8.3f}s {tiempos[3] * 1e3:>5.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# scripts/bench_consultas_multiples.py
+# Compara consultar N saldos de a uno (un CONSULTAR_CUENTA por cuenta) con EnrutadorLecturas.consultar_varias
+# (un CONSULTAR_CUENTAS por partición, todas en paralelo). Levanta un nodo Python por partición.
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.enrutador_lecturas import EnrutadorLecturas
+from utilidades_bench import crear_datos, detener, levantar_nodo
+
+PRIMERA_CUENTA = 1000
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CONSULTAR_CUENTAS con scatter-gather vs consultas individuales")
+    parser.add_argument("--particiones", type=int, default=3)
+    parser.add_argument("--cuentas", type=int, default=100000, help="cuentas en total, repartidas por módulo")
+    parser.add_argument("--tamanos", default="10,100,1000,10000", help="cantidad de cuentas por consulta")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    procesos = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            mapa = {}
+            for p in range(args.particiones):
+                directorio = os.path.join(tmp, f"p{p}")
+                os.makedirs(directorio)
+                # Solo las cuentas de la partición: las que cumplen cuenta % particiones == p
+                inicio = PRIMERA_CUENTA + (p - PRIMERA_CUENTA) % args.particiones
+                crear_datos(os.path.join(directorio, "cuentas.txt"), args.cuentas // args.particiones,
+                            inicio=inicio, paso=args.particiones)
+                proc, port = levantar_nodo(directorio)
+                procesos.append(proc)
+                mapa[str(p)] = [{"id": p, "host": "127.0.0.1", "port": port}]
+            enrutador = EnrutadorLecturas({"partitions": args.particiones, "partitions_map": mapa}, cobertura=False)
+            rnd = random.Random(args.semilla)
+
+            print(f"{args.particiones} particiones, {args.cuentas} cuentas; mediana de {args.repeticiones} repeticiones")
+            print(f"\n{'cuentas':>8}{'de a una ms':>14}{'varias ms':>12}{'aceleración':>13}{'cuentas/s (varias)':>20}")
+            for n in (int(t) for t in args.tamanos.split(",")):
+                cuentas = rnd.sample(range(PRIMERA_CUENTA, PRIMERA_CUENTA + args.cuentas), n)
+                resp = enrutador.consultar_varias(cuentas)
+                if resp["status"] != "OK" or len(resp["saldos"]) + len(resp["no_existen"]) != n:
+                    raise RuntimeError(f"respuesta incompleta: {resp.get('error')}")
+                for acc in cuentas[:20]:
+                    if enrutador.consultar(acc).get("balance") != resp["saldos"].get(acc):
+                        raise RuntimeError(f"saldo distinto para la cuenta {acc}")
+                individual = medir(lambda: [enrutador.consultar(acc) for acc in cuentas], args.repeticiones)
+                varias = medir(lambda: enrutador.consultar_varias(cuentas), args.repeticiones)
+                print(f"{n:>8}{individual * 1e3:>14.2f}{varias * 1e3:>12.2f}{individual / varias:>12.1f}x"
+                      f"{n / varias:>20,.0f}")
+            enrutador.cerrar()
+        finally:
+            for proc in procesos:
+                detener(proc)
+
+
+if __name__ == "__main__":
+    main()
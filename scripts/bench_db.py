@@ -0,0 +1,154 @@
+# scripts/bench_db.py
+# Mide las consultas de SQLite sobre tablas con millones de filas antes y después de las migraciones
+# de índices, y los commits de una fila con la conexión por defecto de sqlite3 vs db_utils.conectar().
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.db_utils import conectar, crear_tablas, migrar
+
+LOTE = 100000
+INICIO = datetime(2024, 1, 1)
+SEGUNDOS_ANIO = 365 * 24 * 3600
+
+CONSULTAS = (
+    ("transacciones de una cuenta",
+     "SELECT id_transaccion, tipo, monto, fecha FROM Transacciones WHERE id_cuenta=? ORDER BY fecha DESC LIMIT 20",
+     "cuenta"),
+    ("préstamos de un cliente",
+     "SELECT id_prestamo, monto, monto_pendiente, estado, fecha_solicitud FROM Prestamos WHERE id_cliente=?",
+     "cliente"),
+    ("historial del chat",
+     "SELECT fecha_envio, mensaje, respuesta FROM MensajesChat ORDER BY fecha_envio DESC LIMIT ?",
+     "limite"),
+)
+
+
+def fecha_aleatoria(rnd):
+    return (INICIO + timedelta(seconds=rnd.randrange(SEGUNDOS_ANIO))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def insertar(conn, sql, filas):
+    """Inserta un generador de filas por lotes, una transacción por lote."""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= LOTE:
+            conn.executemany(sql, lote)
+            conn.commit()
+            lote = []
+    conn.executemany(sql, lote)
+    conn.commit()
+
+
+def poblar(ruta, args):
+    conn = sqlite3.connect(ruta)
+    crear_tablas(conn)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    rnd = random.Random(42)
+    tipos = ("Débito", "Crédito")
+    insertar(conn, "INSERT INTO Transacciones (id_cuenta, tipo, monto, fecha, tx_id) VALUES (?, ?, ?, ?, ?)",
+             ((1000 + rnd.randrange(args.cuentas), tipos[i & 1], round(rnd.uniform(1, 500), 2),
+               fecha_aleatoria(rnd), f"tx{i // 2}") for i in range(args.transacciones)))
+    insertar(conn, "INSERT INTO Prestamos (id_cliente, monto, monto_pendiente, estado, fecha_solicitud) "
+                   "VALUES (?, ?, ?, ?, ?)",
+             ((100 + rnd.randrange(args.cuentas), 10000.0, round(rnd.uniform(0, 10000), 2), "Activo",
+               fecha_aleatoria(rnd)) for _ in range(args.prestamos)))
+    insertar(conn, "INSERT INTO MensajesChat (id_cliente_chat, mensaje, respuesta, fecha_envio, tipo_mensaje) "
+                   "VALUES (?, ?, ?, ?, ?)",
+             ((rnd.randrange(1000), "consulta", "respuesta", fecha_aleatoria(rnd), "chat")
+              for _ in range(args.mensajes)))
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+
+
+def medir_consultas(conn, args):
+    rnd = random.Random(7)
+    parametros = {
+        "cuenta": lambda: (1000 + rnd.randrange(args.cuentas),),
+        "cliente": lambda: (100 + rnd.randrange(args.cuentas),),
+        "limite": lambda: (100,),
+    }
+    resultados = []
+    for nombre, sql, parametro in CONSULTAS:
+        plan = "; ".join(fila[-1] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, parametros[parametro]()))
+        tiempos = []
+        for _ in range(args.consultas):
+            t0 = time.perf_counter()
+            conn.execute(sql, parametros[parametro]()).fetchall()
+            tiempos.append(time.perf_counter() - t0)
+        tiempos.sort()
+        resultados.append((nombre, sum(tiempos) / len(tiempos), tiempos[int(len(tiempos) * 0.99)], plan))
+    return resultados
+
+
+def imprimir_consultas(titulo, resultados):
+    print(f"\n{titulo}")
+    print(f"  {'consulta':<28} {'media ms':>9} {'p99 ms':>9}  plan")
+    for nombre, media, p99, plan in resultados:
+        print(f"  {nombre:<28} {media * 1e3:>9.3f} {p99 * 1e3:>9.3f}  {plan}")
+
+
+def medir_commits(ruta, abrir, commits):
+    """Commits de una fila como los de registrar_mensaje_local del ChatServidor; devuelve commits/s."""
+    conn = abrir(ruta)
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    t0 = time.perf_counter()
+    for i in range(commits):
+        conn.execute("INSERT INTO MensajesChat (id_cliente_chat, mensaje, respuesta, fecha_envio, tipo_mensaje) "
+                     "VALUES (?, ?, ?, ?, ?)", (i, "consulta", "respuesta", fecha, "chat"))
+        conn.commit()
+    segundos = time.perf_counter() - t0
+    conn.close()
+    return commits / segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de índices y conexión de SQLite")
+    parser.add_argument("--transacciones", type=int, default=2000000)
+    parser.add_argument("--prestamos", type=int, default=200000)
+    parser.add_argument("--mensajes", type=int, default=500000)
+    parser.add_argument("--cuentas", type=int, default=100000, help="cuentas (y clientes) distintos")
+    parser.add_argument("--consultas", type=int, default=200, help="repeticiones de cada consulta")
+    parser.add_argument("--commits", type=int, default=2000, help="commits de una fila por tipo de conexión")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        poblar(ruta, args)
+        print(f"BD poblada en {time.perf_counter() - t0:.1f}s ({os.path.getsize(ruta) / 2**20:.0f} MB): "
+              f"{args.transacciones} transacciones, {args.prestamos} préstamos, {args.mensajes} mensajes")
+
+        conn = sqlite3.connect(ruta)
+        imprimir_consultas("Sin índices, conexión por defecto", medir_consultas(conn, args))
+        conn.close()
+
+        conn = conectar(ruta)
+        t0 = time.perf_counter()
+        version = migrar(conn)
+        print(f"\nMigraciones aplicadas en {time.perf_counter() - t0:.1f}s (user_version={version})")
+        imprimir_consultas("Con índices, conectar()", medir_consultas(conn, args))
+        conn.close()
+
+        # Los commits se miden en una BD aparte: journal_mode=WAL queda grabado en el archivo
+        print(f"\nCommits de una fila ({args.commits}):")
+        for i, (nombre, abrir) in enumerate((("sqlite3.connect", sqlite3.connect), ("conectar()", conectar))):
+            ruta_commits = os.path.join(tmp, f"commits{i}.db")
+            conn = sqlite3.connect(ruta_commits)
+            crear_tablas(conn)
+            conn.close()
+            print(f"  {nombre:<16} {medir_commits(ruta_commits, abrir, args.commits):>10,.0f} commits/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# scripts/bench_lecturas.py
+# Latencia de CONSULTAR_CUENTA con una réplica lenta: siempre la primera réplica (como el ServidorCentral)
+# vs EnrutadorLecturas por EWMA, con y sin peticiones de cobertura. Levanta sus propios nodos Python y
+# pone delante de las réplicas lentas un proxy que demora una fracción de las peticiones.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.enrutador_lecturas import EnrutadorLecturas
+from src.python.common.histograma import Histograma
+from src.python.common.cliente import PoolConexiones
+from utilidades_bench import detener, levantar_nodo, puerto_libre
+
+PRIMERA_CUENTA = 1000
+
+
+class ProxyLento:
+    """Proxy JSON por líneas que demora `retardo` segundos una fracción `prob` de las peticiones."""
+
+    def __init__(self, destino, retardo, prob, semilla=0):
+        self.destino = destino
+        self.retardo = retardo
+        self.prob = prob
+        self.port = puerto_libre()
+        self._rnd = random.Random(semilla)
+        listo = threading.Event()
+        threading.Thread(target=lambda: asyncio.run(self._servir(listo)), daemon=True).start()
+        listo.wait()
+
+    async def _servir(self, listo):
+        server = await asyncio.start_server(self._atender, "127.0.0.1", self.port)
+        listo.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _atender(self, reader, writer):
+        destino_r, destino_w = await asyncio.open_connection("127.0.0.1", self.destino)
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                if self._rnd.random() < self.prob:
+                    await asyncio.sleep(self.retardo)
+                destino_w.write(linea)
+                writer.write(await destino_r.readline())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            destino_w.close()
+            writer.close()
+
+
+class PrimeraReplica:
+    """Lo que hace el ServidorCentral: siempre la primera réplica de la configuración."""
+
+    def __init__(self, config):
+        nodo = config["partitions_map"]["0"][0]
+        self.pool = PoolConexiones(nodo["host"], nodo["port"], max_conexiones=64)
+
+    def consultar(self, cuenta):
+        return self.pool.solicitar({"type": "CONSULTAR_CUENTA", "account": cuenta}, reintentable=True)
+
+    def estadisticas(self):
+        return {}
+
+    def cerrar(self):
+        self.pool.cerrar()
+
+
+def medir(cliente, args):
+    """Consultas desde `args.hilos` hilos durante `args.duracion` segundos; devuelve (histograma µs, errores)."""
+    histogramas = []
+    errores = [0]
+    fin = time.monotonic() + args.calentamiento + args.duracion
+    inicio_medicion = time.monotonic() + args.calentamiento
+
+    def trabajador(semilla):
+        rnd = random.Random(semilla)
+        h = Histograma()
+        histogramas.append(h)
+        while time.monotonic() < fin:
+            cuenta = PRIMERA_CUENTA + rnd.randrange(args.cuentas)
+            t0 = time.perf_counter()
+            resp = cliente.consultar(cuenta)
+            segundos = time.perf_counter() - t0
+            if time.monotonic() >= inicio_medicion:
+                if resp.get("status") != "OK":
+                    errores[0] += 1
+                h.registrar(segundos * 1e6)
+
+    hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(args.hilos)]
+    for t in hilos:
+        t.start()
+    for t in hilos:
+        t.join()
+    total = Histograma()
+    for h in histogramas:
+        total.combinar(h)
+    return total, errores[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del enrutador de lecturas con una réplica lenta")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--lentas", type=int, default=1, help="réplicas detrás del proxy lento (las primeras)")
+    parser.add_argument("--retardo", type=float, default=0.05, help="segundos que el proxy demora una petición")
+    parser.add_argument("--prob-retardo", type=float, default=0.2, help="fracción de peticiones demoradas")
+    parser.add_argument("--cuentas", type=int, default=10000)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos medidos por variante")
+    parser.add_argument("--calentamiento", type=float, default=1.0)
+    parser.add_argument("--json", help="archivo donde guardar los resultados")
+    args = parser.parse_args()
+
+    procesos = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            nodos = []
+            for i in range(args.replicas):
+                proc, port = levantar_nodo(os.path.join(tmp, f"r{i}"), cuentas=args.cuentas)
+                procesos.append(proc)
+                if i < args.lentas:
+                    port = ProxyLento(port, args.retardo, args.prob_retardo, semilla=i).port
+                nodos.append({"id": i, "host": "127.0.0.1", "port": port})
+            config = {"partitions": 1, "partitions_map": {"0": nodos}}
+            print(f"{args.replicas} réplicas, {args.lentas} lenta(s): {args.prob_retardo:.0%} de las peticiones "
+                  f"demoradas {args.retardo * 1e3:.0f} ms; {args.hilos} hilos, {args.duracion:.0f} s por variante")
+
+            variantes = (
+                ("primera réplica", lambda: PrimeraReplica(config)),
+                ("EWMA", lambda: EnrutadorLecturas(config, cobertura=False)),
+                ("EWMA + cobertura", lambda: EnrutadorLecturas(config)),
+            )
+            resultados = {}
+            print(f"\n{'variante':<18}{'consultas/s':>12}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'p99.9 ms':>10}"
+                  f"{'max ms':>9}{'errores':>9}{'coberturas':>12}")
+            for nombre, crear in variantes:
+                cliente = crear()
+                try:
+                    h, errores = medir(cliente, args)
+                    stats = cliente.estadisticas()
+                finally:
+                    cliente.cerrar()
+                r = h.resumen(escala=1e-3)
+                resultados[nombre] = dict(r, errores=errores, enrutador=stats)
+                print(f"{nombre:<18}{h.total / args.duracion:>12,.0f}{r['p50']:>9.2f}{r['p90']:>9.2f}{r['p99']:>9.2f}"
+                      f"{r['p999']:>10.2f}{r['max']:>9.2f}{errores:>9}{stats.get('coberturas', '-'):>12}")
+        finally:
+            for proc in procesos:
+                detener(proc)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# scripts/bench_protocolo.py
+# Compara el protocolo JSON por líneas con el protocolo binario: costo de
+# codificar/decodificar y TPS de punta a punta contra un nodo Python local.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common import protocolo_binario as pb
+from utilidades_bench import levantar_nodo, detener
+
+PETICION = {"type": "PREPARE_TRANSFER", "tx_id": "tx_1730000000000", "from": 1234, "to": 5678, "amount": 150.25}
+RESPUESTA = {"status": "OK", "account": 1234, "balance": 9876.54}
+
+
+def bench_codec(n):
+    casos = {
+        "json": (
+            lambda: (json.dumps(PETICION) + "\n").encode(),
+            json.loads,
+            lambda: (json.dumps(RESPUESTA) + "\n").encode(),
+            json.loads,
+        ),
+        "binario": (
+            lambda: pb.codificar_peticion(PETICION),
+            lambda b: pb.decodificar_peticion(b[4:]),
+            lambda: pb.codificar_respuesta(RESPUESTA),
+            lambda b: pb.decodificar_respuesta(b[4:]),
+        ),
+    }
+    print(f"\n--- Codificación/decodificación ({n} iteraciones, µs por operación) ---")
+    print(f"{'formato':<10}{'enc pet':>10}{'dec pet':>10}{'enc resp':>10}{'dec resp':>10}{'bytes pet':>11}")
+    for nombre, (enc_p, dec_p, enc_r, dec_r) in casos.items():
+        bp, br = enc_p(), enc_r()
+        tiempos = [
+            timeit.timeit(enc_p, number=n),
+            timeit.timeit(lambda: dec_p(bp), number=n),
+            timeit.timeit(enc_r, number=n),
+            timeit.timeit(lambda: dec_r(br), number=n),
+        ]
+        print(f"{nombre:<10}" + "".join(f"{t / n * 1e6:>10.2f}" for t in tiempos) + f"{len(bp):>11}")
+
+
+def bench_e2e(port, binario, hilos, duracion, pipeline):
+    """Consultas de saldo en pipeline desde `hilos` conexiones persistentes."""
+    total = [0]
+    lock = threading.Lock()
+    fin = time.monotonic() + duracion
+
+    def trabajador(i):
+        hechas = 0
+        with pb.ClienteProtocolo("127.0.0.1", port, binario=binario) as cli:
+            lote = [{"type": "CONSULTAR_CUENTA", "account": 1000 + (i * 37 + k) % 10000} for k in range(pipeline)]
+            while time.monotonic() < fin:
+                cli.enviar_varios(lote)
+                hechas += pipeline
+        with lock:
+            total[0] += hechas
+
+    inicio = time.monotonic()
+    ts = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return total[0] / (time.monotonic() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs protocolo binario")
+    parser.add_argument("--iteraciones", type=int, default=200000)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--duracion", type=float, default=5.0)
+    parser.add_argument("--pipeline", type=int, default=16, help="peticiones por envío en cada conexión")
+    parser.add_argument("--port", type=int, help="usar un nodo ya levantado en lugar de uno temporal")
+    args = parser.parse_args()
+
+    bench_codec(args.iteraciones)
+
+    proc = None
+    port = args.port
+    tmp = tempfile.TemporaryDirectory()
+    if port is None:
+        proc, port = levantar_nodo(tmp.name, cuentas=10000, modo="asyncio")
+    try:
+        print(f"\n--- Punta a punta: {args.hilos} conexiones, pipeline {args.pipeline}, {args.duracion}s ---")
+        for binario in (False, True):
+            tps = bench_e2e(port, binario, args.hilos, args.duracion, args.pipeline)
+            print(f"{'binario' if binario else 'json':<10}{tps:>12.0f} consultas/s")
+    finally:
+        if proc:
+            detener(proc)
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
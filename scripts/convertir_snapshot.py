@@ -0,0 +1,33 @@
+# scripts/convertir_snapshot.py
+# Convierte un archivo de datos de partición entre el formato de texto (id,saldo) y el binario.
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common import snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte snapshots de partición entre texto y binario")
+    parser.add_argument("entrada")
+    parser.add_argument("salida")
+    parser.add_argument("--a", choices=("txt", "bin"),
+                        help="formato de salida (por defecto, el contrario al de la entrada)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    ids, saldos, seq = snapshots.leer(args.entrada)
+    destino = args.a or ("txt" if snapshots.es_binario(args.entrada) else "bin")
+    if destino == "bin":
+        snapshots.escribir_binario(args.salida, ids=ids, saldos=saldos, seq=seq)
+    else:
+        snapshots.escribir_texto(args.salida, zip(ids, saldos), seq=seq or None)
+    print(f"{len(ids)} cuentas escritas en {args.salida} ({destino}) en {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
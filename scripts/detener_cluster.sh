@@ -9,5 +9,7 @@ echo "Deteniendo todos los nodos del clúster..."
 pkill -f "nodo_trabajador.NodoWorker"
 pkill -f "nodo_worker_go"
 pkill -f "python3 src/python/nodo_trabajador/nodo_worker.py"
+# El supervisor detiene a sus propios nodos al recibir SIGTERM
+pkill -f "src/python/nodo_trabajador/supervisor.py"
 
 echo "Procesos de nodos detenidos."
@@ -1,10 +1,37 @@
 # python/scripts/generar_cuentas_10000.py
-import os, random, argparse, json, sqlite3
+"""Genera las cuentas de cada partición (todas sus réplicas) y puebla la tabla Cuentas de SQLite.
+
+Las cuentas se generan por bloques de ids consecutivos en un pool de
+procesos; cada bloque usa su propio RNG derivado de la semilla, así que el
+resultado no depende de la cantidad de procesos y la misma semilla produce
+los mismos datos. Cada bloque escribe un fragmento por partición, los
+fragmentos se concatenan una sola vez por partición y el archivo resultante
+se copia (o se enlaza con --enlazar) a las demás réplicas. SQLite se carga en
+paralelo desde otro proceso que regenera los mismos bloques.
+"""
+import os, sys, random, argparse, json, sqlite3, shutil, time, zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from multiprocessing import Process
 from pathlib import Path
 
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common import snapshots
+from src.python.common.dinero import formato_centavos
+from src.python.common.particionado import Particionador
+
 DEFAULT_DB_DIR = Path("data")
 CONFIG = "config/nodos_config.json"
+PRIMERA_CUENTA = 1000
+# Cuentas por bloque: unos 20-30 MB de texto por proceso
+TAM_BLOQUE = 1_000_000
+# Saldos iniciales entre 100.00 y 10000.00, en centavos
+SALDO_MIN = 10000
+SALDO_MAX = 1000000
 
 def load_config():
     with open(CONFIG,"r") as f:
@@ -13,67 +40,181 @@ def load_config():
 def ensure(path):
     os.makedirs(path, exist_ok=True)
 
-def main(total=10000):
-    cfg = load_config()
-    partitions = cfg["partitions"]
-    rep_factor = cfg["replication_factor"]
-    
-    # create accounts list
-    print(f"Generando {total} cuentas en memoria...")
-    accounts = []
-    for i in range(1000, 1000 + total):
-        # (id_cuenta, id_cliente, saldo, fecha)
-        accounts.append((i, i - 900, round(random.uniform(100.0, 10000.0), 2), datetime.now().strftime("%Y-%m-%d")))
-
-    # --- NUEVA LÓGICA: Poblar la base de datos SQLite ---
-    db_path = Path("db/banco_chat.db")
-    print(f"Poblando la base de datos SQLite en {db_path}...")
+def rango_bloque(k, total, bloque):
+    inicio = PRIMERA_CUENTA + k * bloque
+    return inicio, min(inicio + bloque, PRIMERA_CUENTA + total)
+
+def saldos_bloque(semilla, k, n):
+    """Saldos (centavos) del bloque k: dependen solo de la semilla y del número de bloque."""
+    rng = random.Random(semilla * 1_000_003 + k)
+    aleatorio = rng.random
+    rango = SALDO_MAX - SALDO_MIN + 1
+    return [SALDO_MIN + int(aleatorio() * rango) for _ in range(n)]
+
+def generar_bloque(k, total, bloque, semilla, particionado, formato, dir_tmp):
+    """Escribe los fragmentos del bloque k (uno por partición) y devuelve {partición: cuentas}."""
+    inicio, fin = rango_bloque(k, total, bloque)
+    saldos = saldos_bloque(semilla, k, fin - inicio)
+    particion = Particionador.desde_config(particionado).particion
+    por_particion = {}
+    for acc, saldo in zip(range(inicio, fin), saldos):
+        por_particion.setdefault(particion(acc), []).append((acc, saldo))
+    for p, cuentas in por_particion.items():
+        base = os.path.join(dir_tmp, f"p{p}_b{k:06d}")
+        if formato == "bin":
+            with open(base + ".ids", "wb") as f:
+                array('q', (acc for acc, _ in cuentas)).tofile(f)
+            with open(base + ".saldos", "wb") as f:
+                array('q', (saldo for _, saldo in cuentas)).tofile(f)
+        else:
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write("".join(f"{acc},{formato_centavos(saldo)}\n" for acc, saldo in cuentas))
+    return {p: len(c) for p, c in por_particion.items()}
+
+def ensamblar_particion(p, bloques, formato, rutas, dir_tmp, enlazar):
+    """Concatena los fragmentos de la partición p en su primera réplica y la replica en las demás."""
+    if sys.byteorder != "little" and formato == "bin":
+        raise RuntimeError("el formato binario se genera solo en máquinas little endian")
+    destino = rutas[0]
+    tmp = str(destino) + ".tmp"
+    with open(tmp, "wb") as salida:
+        if formato == "bin":
+            # Cabecera provisoria; la cantidad y el crc se conocen al terminar de copiar las columnas
+            salida.write(b"\0" * snapshots._CABECERA.size)
+            n, crc = 0, 0
+            for extension in (".ids", ".saldos"):
+                for k in bloques:
+                    with open(os.path.join(dir_tmp, f"p{p}_b{k:06d}{extension}"), "rb") as f:
+                        datos = f.read()
+                    crc = zlib.crc32(datos, crc)
+                    if extension == ".ids":
+                        n += len(datos) // 8
+                    salida.write(datos)
+            salida.seek(0)
+            salida.write(snapshots._CABECERA.pack(snapshots.MAGIC, snapshots.VERSION, 0, n, 0, crc))
+        else:
+            for k in bloques:
+                with open(os.path.join(dir_tmp, f"p{p}_b{k:06d}.txt"), "rb") as f:
+                    shutil.copyfileobj(f, salida, 1 << 20)
+    os.replace(tmp, destino)
+    for ruta in rutas[1:]:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        if enlazar:
+            # Solo seguro con nodos que reemplazan el archivo al persistir (los de Python, con rename)
+            os.link(destino, ruta)
+        else:
+            shutil.copyfile(destino, ruta)
+    return os.path.getsize(destino)
+
+def poblar_db(db_path, total, bloque, semilla):
+    """Carga la tabla Cuentas regenerando los mismos bloques, sin journal y en una transacción por bloque."""
+    fecha = datetime.now().strftime("%Y-%m-%d")
+    inicio_carga = time.monotonic()
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        modo_anterior = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        # Carga masiva: si se interrumpe, basta con volver a generar
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-262144")
         print("Limpiando la tabla 'Cuentas' en SQLite...")
-        cursor.execute("DELETE FROM Cuentas;")
-        
-        # Preparar datos para la inserción masiva
-        cuentas_para_db = [(acc[0], acc[1], acc[2], acc[3]) for acc in accounts]
-        
-        print(f"Insertando {len(cuentas_para_db)} registros en la tabla 'Cuentas'...")
-        cursor.executemany("INSERT INTO Cuentas (id_cuenta, id_cliente, saldo, fecha_apertura) VALUES (?, ?, ?, ?)", cuentas_para_db)
-        
-        conn.commit()
+        conn.execute("DELETE FROM Cuentas")
+        for k in range((total + bloque - 1) // bloque):
+            inicio, fin = rango_bloque(k, total, bloque)
+            saldos = saldos_bloque(semilla, k, fin - inicio)
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO Cuentas (id_cuenta, id_cliente, saldo, fecha_apertura) VALUES (?, ?, ?, ?)",
+                ((acc, acc - 900, saldo / 100, fecha) for acc, saldo in zip(range(inicio, fin), saldos)),
+            )
+            conn.execute("COMMIT")
+        conn.execute(f"PRAGMA journal_mode={modo_anterior}")
         conn.close()
-        print("Tabla 'Cuentas' en SQLite poblada exitosamente.")
     except Exception as e:
         print(f"[ERROR] No se pudo poblar la base de datos SQLite: {e}")
-    # --- FIN DE LA NUEVA LÓGICA ---
-
-    # for each partition index, write to each replica location (directories based on config)
-    for p in range(partitions):
-        # gather replica nodes for this partition
-        nodes = cfg["partitions_map"].get(str(p), [])
-        if not nodes:
-            print(f"[WARN] Partición {p} sin nodos.")
-            continue
-        # create file content for accounts belonging to this partition
-        part_accs = [a for a in accounts if (a[0] % partitions) == p]
-        # Replicas are now identified by their full node object, not just index
-        for node_info in nodes:
-            # Construct path based on partition and replica index derived from node id or order
-            # This part of your script might need adjustment depending on how you map node IDs to replica indices.
-            # Assuming a simple mapping for now, e.g., replica_index is the order in the list.
-            replica_index = nodes.index(node_info)
-            dirpath = Path(f"data/particion{p}_replica{replica_index}")
-            ensure(dirpath)
-            filep = dirpath / f"cuentas_part{p}.txt"
-            with open(filep, "w", encoding="utf-8") as fw:
-                for acc in part_accs:
-                    fw.write(f"{acc[0]},{acc[2]}\n")  # id,saldo
-            print(f"Wrote {len(part_accs)} accounts to {filep}")
+        sys.exit(1)
+    segundos = time.monotonic() - inicio_carga
+    print(f"SQLite: {total} cuentas en {segundos:.1f}s ({total / max(segundos, 1e-9):,.0f} cuentas/s)")
+
+def rutas_replicas(p, nodes, formato):
+    rutas = []
+    for replica_index, node_info in enumerate(nodes):
+        if node_info.get("data_file"):
+            ruta = Path(node_info["data_file"])
+        else:
+            ruta = Path(f"data/particion{p}_replica{replica_index}") / f"cuentas_part{p}.{formato}"
+        ensure(ruta.parent)
+        rutas.append(str(ruta))
+    return rutas
+
+def main(total=10000, formato="txt", semilla=None, procesos=None, bloque=TAM_BLOQUE, enlazar=False, con_db=True):
+    cfg = load_config()
+    partitions = cfg["partitions"]
+    particionador = Particionador.desde_config(cfg)
+    if semilla is None:
+        semilla = random.randrange(1 << 31)
+    procesos = procesos or os.cpu_count() or 1
+    print(f"Particionador: {particionador.tipo} ({partitions} particiones)")
+    print(f"Generando {total} cuentas en bloques de {bloque} con {procesos} procesos (semilla {semilla})...")
+    inicio = time.monotonic()
+
+    db_path = Path("db/banco_chat.db")
+    cargador = None
+    if con_db:
+        print(f"Poblando la base de datos SQLite en {db_path} en segundo plano...")
+        cargador = Process(target=poblar_db, args=(str(db_path), total, bloque, semilla))
+        cargador.start()
+
+    dir_tmp = DEFAULT_DB_DIR / f".generando_{os.getpid()}"
+    ensure(dir_tmp)
+    bloques = range((total + bloque - 1) // bloque)
+    try:
+        with ProcessPoolExecutor(max_workers=procesos) as ex:
+            generar = partial(generar_bloque, total=total, bloque=bloque, semilla=semilla,
+                              particionado=particionador.descripcion(), formato=formato, dir_tmp=str(dir_tmp))
+            conteos = list(ex.map(generar, bloques))
+            segundos = time.monotonic() - inicio
+            print(f"Cuentas generadas en {segundos:.1f}s ({total / max(segundos, 1e-9):,.0f} cuentas/s); "
+                  f"ensamblando particiones...")
+            trabajos = {}
+            for p in range(partitions):
+                nodes = cfg["partitions_map"].get(str(p), [])
+                if not nodes:
+                    print(f"[WARN] Partición {p} sin nodos.")
+                    continue
+                con_cuentas = [k for k, c in zip(bloques, conteos) if c.get(p)]
+                rutas = rutas_replicas(p, nodes, formato)
+                trabajos[p] = (ex.submit(ensamblar_particion, p, con_cuentas, formato, rutas, str(dir_tmp), enlazar),
+                               rutas, sum(c.get(p, 0) for c in conteos))
+            for p, (futuro, rutas, cantidad) in trabajos.items():
+                futuro.result()
+                for ruta in rutas:
+                    print(f"Wrote {cantidad} accounts to {ruta}")
+    finally:
+        shutil.rmtree(dir_tmp, ignore_errors=True)
+
+    archivos = time.monotonic() - inicio
+    print(f"Archivos listos en {archivos:.1f}s ({total / max(archivos, 1e-9):,.0f} cuentas/s)")
+    if cargador is not None:
+        cargador.join()
+        if cargador.exitcode == 0:
+            print("Tabla 'Cuentas' en SQLite poblada exitosamente.")
+    total_s = time.monotonic() - inicio
+    print(f"Total: {total_s:.1f}s ({total / max(total_s, 1e-9):,.0f} cuentas/s)")
 
 if __name__ == "__main__":
-    import sys
-    n = 10000
-    if len(sys.argv) > 1:
-        n = int(sys.argv[1])
-    main(n)
+    parser = argparse.ArgumentParser(description="Genera las cuentas de cada partición y puebla SQLite")
+    parser.add_argument("total", nargs="?", type=int, default=10000)
+    parser.add_argument("--formato", choices=("txt", "bin"), default="txt",
+                        help="txt: id,saldo por línea (todos los nodos); bin: snapshot binario (solo nodos Python)")
+    parser.add_argument("--semilla", type=int, help="semilla del generador; la misma semilla produce los mismos saldos")
+    parser.add_argument("--procesos", type=int, help="procesos generadores (por defecto, uno por núcleo)")
+    parser.add_argument("--bloque", type=int, default=TAM_BLOQUE, help="cuentas por bloque de generación")
+    parser.add_argument("--enlazar", action="store_true",
+                        help="enlazar (hardlink) las réplicas al archivo de la primera en lugar de copiarlo; "
+                             "solo para réplicas de Python, que reemplazan el archivo al persistir")
+    parser.add_argument("--sin-db", action="store_true", help="no poblar la tabla Cuentas de SQLite")
+    args = parser.parse_args()
+    main(args.total, args.formato, args.semilla, args.procesos, args.bloque, args.enlazar, not args.sin_db)
     print("Hecho.")
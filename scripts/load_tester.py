@@ -1,9 +1,20 @@
-import socket
+import argparse
+import asyncio
+import csv
+import itertools
 import json
+import os
+import sys
 import threading
 import time
 import random
-import statistics
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexiones, PoolConexionesAsync
+from src.python.common.histograma import Histograma
+from src.python.cliente_banco.BancoCliente import cargar_config, transferir_lote
 
 HOST = "127.0.0.1"
 PORT = 6000  # Puerto del ServidorCentral
@@ -13,55 +24,61 @@ ITERATIONS_PER_THREAD = 10  # Cuántas transferencias hará cada hilo
 MAX_ACCOUNT_ID = 10000      # Rango de cuentas a usar (1000 a 1000+MAX_ACCOUNT_ID)
 THREAD_LEVELS = [10, 20, 50, 100, 150, 200] # Niveles de concurrencia a probar
 
+# --- Modo abierto ---
+MEZCLA_DEFECTO = "consulta=70,transferencia=30"
+# Las cuentas creadas por la prueba usan ids por encima de este valor para no pisar datos reales
+BASE_CUENTAS_NUEVAS = 10_000_000
+
 results = []
+# Conexiones persistentes al central compartidas por los hilos de la prueba cerrada (se crea en main)
+central = None
 
 def do_transfer(from_acc, to_acc, amount, timeout=5):
     """Realiza una única transferencia y devuelve la latencia y el estado."""
     start_time = time.monotonic()
     try:
-        with socket.create_connection((HOST, PORT), timeout=timeout) as s:
-            req = {"type": "TRANSFERIR_CUENTA", "from": from_acc, "to": to_acc, "amount": amount}
-            s.sendall((json.dumps(req) + "\n").encode())
-            resp_raw = s.recv(4096).decode().strip()
-            resp_json = json.loads(resp_raw)
-            status = "OK" if resp_json.get("status") == "OK" else "ERROR"
+        req = {"type": "TRANSFERIR_CUENTA", "from": from_acc, "to": to_acc, "amount": amount}
+        resp_json = central.solicitar(req, timeout=timeout)
+        status = "OK" if resp_json.get("status") == "OK" else "ERROR"
     except Exception as e:
         # print(f"[ERROR] {e}")
         status = "ERROR"
-    
+
     end_time = time.monotonic()
     latency_ms = (end_time - start_time) * 1000
     return latency_ms, status
 
-def worker_thread(thread_id, latencies, success_count, failure_count):
+def worker_thread(thread_id, resultados):
     """El trabajo que realiza cada hilo: un número fijo de iteraciones."""
+    # Cada hilo acumula en su propio histograma; se combinan al terminar
+    hist = Histograma()
+    success = failure = 0
     for i in range(ITERATIONS_PER_THREAD):
         a = random.randint(1000, 1000 + MAX_ACCOUNT_ID - 1)
         b = random.randint(1000, 1000 + MAX_ACCOUNT_ID - 1)
         if a == b: b = a + 1
         amt = round(random.uniform(1, 100), 2)
-        
+
         latency, status = do_transfer(a, b, amt)
-        
-        latencies.append(latency)
+
+        hist.registrar(latency * 1000)
         if status == "OK":
-            success_count.append(1)
+            success += 1
         else:
-            failure_count.append(1)
+            failure += 1
+    resultados[thread_id] = (hist, success, failure)
 
 def run_test(num_threads):
     """Ejecuta una prueba para un nivel de concurrencia dado."""
     print(f"\n--- Ejecutando prueba con {num_threads} hilos concurrentes ---")
-    
-    latencies = []
-    success_count = []
-    failure_count = []
+
+    resultados = [None] * num_threads
     threads = []
 
     start_total_time = time.monotonic()
 
     for i in range(num_threads):
-        t = threading.Thread(target=worker_thread, args=(i, latencies, success_count, failure_count))
+        t = threading.Thread(target=worker_thread, args=(i, resultados))
         threads.append(t)
         t.start()
 
@@ -71,11 +88,14 @@ def run_test(num_threads):
     end_total_time = time.monotonic()
     total_time_s = end_total_time - start_total_time
 
-    total_success = len(success_count)
-    total_failure = len(failure_count)
+    hist = Histograma()
+    for h, _, _ in resultados:
+        hist.combinar(h)
+    total_success = sum(r[1] for r in resultados)
+    total_failure = sum(r[2] for r in resultados)
     total_requests = total_success + total_failure
-    
-    avg_latency = statistics.mean(latencies) if latencies else 0
+
+    lat = hist.resumen(escala=1e-3)
     throughput = total_success / total_time_s if total_time_s > 0 else 0
 
     print(f"Prueba completada en {total_time_s:.2f} segundos.")
@@ -83,7 +103,7 @@ def run_test(num_threads):
     print(f"  - Exitosas: {total_success}")
     print(f"  - Fallidas: {total_failure}")
     print(f"  - Throughput: {throughput:.2f} TPS (transacciones por segundo)")
-    print(f"  - Latencia Promedio: {avg_latency:.2f} ms")
+    print(f"  - Latencia Promedio: {lat['media']:.2f} ms (p50 {lat['p50']:.2f} / p99 {lat['p99']:.2f} ms)")
 
     results.append({
         "Threads": num_threads,
@@ -91,10 +111,13 @@ def run_test(num_threads):
         "SuccessCount": total_success,
         "FailureCount": total_failure,
         "TPS": round(throughput, 2),
-        "AvgLatency_ms": round(avg_latency, 2)
+        "AvgLatency_ms": lat["media"],
+        "P50_ms": lat["p50"],
+        "P99_ms": lat["p99"],
     })
 
-if __name__ == "__main__":
+
+def modo_cerrado():
     print("Iniciando suite de pruebas de carga...")
     print(f"Asegúrate de que el clúster y el Servidor Central estén corriendo en el puerto {PORT}.")
 
@@ -103,11 +126,374 @@ if __name__ == "__main__":
 
     print("\n\n--- TABLA DE RESULTADOS (Formato CSV) ---")
     print("Copia y pega esto en una hoja de cálculo para generar las gráficas.")
-    
+
     # Imprimir cabecera
     header = results[0].keys()
     print(",".join(header))
-    
+
     # Imprimir filas
     for res in results:
-        print(",".join(map(str, res.values())))
\ No newline at end of file
+        print(",".join(map(str, res.values())))
+
+
+# ------------------ Modo abierto (tasa de llegada fija) ------------------ #
+#
+# Las peticiones se lanzan en el instante que fija la tasa de llegada, sin
+# esperar a que respondan las anteriores, y la latencia se mide desde ese
+# instante previsto: si el sistema se satura, el tiempo en cola aparece en los
+# percentiles en lugar de frenar al generador (coordinated omission).
+
+OPERACIONES = ("consulta", "transferencia", "crear", "eliminar")
+
+
+def parsear_mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"operación desconocida: {nombre} (válidas: {', '.join(OPERACIONES)})")
+        mezcla[nombre] = float(peso or 1)
+    if sum(mezcla.values()) <= 0:
+        raise argparse.ArgumentTypeError("la mezcla debe tener algún peso positivo")
+    return mezcla
+
+
+class SelectorZipf:
+    """Elige cuentas con probabilidad ∝ 1/rango^s; s=0 es uniforme.
+
+    Los rangos se asignan a cuentas con una permutación fija, así que las
+    cuentas calientes quedan repartidas entre las particiones.
+    """
+
+    def __init__(self, primera, cantidad, s, rnd):
+        self.rnd = rnd
+        self.cuentas = list(range(primera, primera + cantidad))
+        random.Random(42).shuffle(self.cuentas)
+        self.acumulados = None
+        if s > 0:
+            self.acumulados = list(itertools.accumulate(1.0 / (k ** s) for k in range(1, cantidad + 1)))
+
+    def elegir(self):
+        if self.acumulados is None:
+            return self.rnd.choice(self.cuentas)
+        return self.rnd.choices(self.cuentas, cum_weights=self.acumulados)[0]
+
+
+class Intervalo:
+    """Métricas de una ventana de la serie de tiempo."""
+
+    def __init__(self):
+        self.hist = Histograma()
+        self.enviadas = self.ok = self.errores = self.timeouts = 0
+
+
+class PruebaAbierta:
+    def __init__(self, args):
+        self.args = args
+        self.rnd = random.Random(args.semilla)
+        self.selector = SelectorZipf(args.primera_cuenta, args.cuentas, args.zipf, self.rnd)
+        self.operaciones = list(args.mezcla)
+        self.pesos = list(itertools.accumulate(args.mezcla.values()))
+        self.creadas = []
+        self.siguiente_nueva = BASE_CUENTAS_NUEVAS + self.rnd.randrange(1_000_000) * 1000
+        # Conexiones persistentes (reutilizadas) o una por petición; sin reintentos, para no ocultar errores
+        self.conexiones = PoolConexionesAsync(
+            args.host, args.port, max_conexiones=args.max_conexiones, timeout=args.timeout,
+            timeout_conexion=args.timeout, reintentos=0,
+            max_ociosas=args.max_conexiones if args.conexiones == "persistente" else 0)
+        self.por_operacion = {op: Histograma() for op in OPERACIONES}
+        self.total = Histograma()
+        self.contadores = {"enviadas": 0, "ok": 0, "errores": 0, "timeouts": 0, "descartadas": 0}
+        self.errores_por_tipo = {}
+        self.serie = []
+        self.en_vuelo = 0
+        self.max_en_vuelo_visto = 0
+        self.midiendo = False
+        self.intervalo = Intervalo()
+
+    def _peticion(self):
+        op = self.rnd.choices(self.operaciones, cum_weights=self.pesos)[0]
+        if op == "eliminar" and not self.creadas:
+            op = "crear"
+        if op == "consulta":
+            return op, {"type": "CONSULTAR_CUENTA", "account": self.selector.elegir()}
+        if op == "transferencia":
+            a = self.selector.elegir()
+            b = self.selector.elegir()
+            while b == a:
+                b = self.selector.elegir()
+            return op, {"type": "TRANSFERIR_CUENTA", "from": a, "to": b,
+                        "amount": round(self.rnd.uniform(1, 100), 2)}
+        if op == "crear":
+            self.siguiente_nueva += 1
+            self.creadas.append(self.siguiente_nueva)
+            return op, {"type": "CREAR_CUENTA", "account": self.siguiente_nueva, "initial": 100.0}
+        cuenta = self.creadas.pop(self.rnd.randrange(len(self.creadas)))
+        return op, {"type": "ELIMINAR_CUENTA", "account": cuenta}
+
+    async def _ejecutar(self, op, req, previsto):
+        self.en_vuelo += 1
+        self.max_en_vuelo_visto = max(self.max_en_vuelo_visto, self.en_vuelo)
+        medir = self.midiendo
+        resultado = "errores"
+        try:
+            resp = await asyncio.wait_for(self.conexiones.solicitar(req), self.args.timeout)
+            resultado = "ok" if resp.get("status") == "OK" else "errores"
+            if resultado == "errores" and medir:
+                clave = str(resp.get("error", "ERROR"))[:60]
+                self.errores_por_tipo[clave] = self.errores_por_tipo.get(clave, 0) + 1
+        except asyncio.TimeoutError:
+            resultado = "timeouts"
+        except (OSError, ValueError) as e:
+            if medir:
+                clave = type(e).__name__
+                self.errores_por_tipo[clave] = self.errores_por_tipo.get(clave, 0) + 1
+        finally:
+            self.en_vuelo -= 1
+        if not medir:
+            return
+        latencia_us = (time.monotonic() - previsto) * 1e6
+        # Las respuestas cuentan en el intervalo en que llegan
+        intervalo = self.intervalo
+        self.contadores[resultado] += 1
+        setattr(intervalo, resultado, getattr(intervalo, resultado) + 1)
+        if resultado == "ok":
+            self.total.registrar(latencia_us)
+            self.por_operacion[op].registrar(latencia_us)
+            intervalo.hist.registrar(latencia_us)
+
+    def _llegadas(self, inicio):
+        """Instantes previstos de envío según la tasa y el proceso de llegada."""
+        tasa = self.args.tasa
+        t = inicio
+        for i in itertools.count(1):
+            if self.args.llegadas == "poisson":
+                t += self.rnd.expovariate(tasa)
+            else:
+                t = inicio + i / tasa
+            yield t
+
+    async def correr(self):
+        args = self.args
+        inicio = time.monotonic()
+        inicio_medicion = inicio + args.calentamiento
+        fin = inicio_medicion + args.duracion
+        tareas = set()
+        fin_intervalo = inicio_medicion + args.intervalo
+        for previsto in self._llegadas(inicio):
+            if previsto >= fin:
+                break
+            if not self.midiendo and previsto >= inicio_medicion:
+                self.midiendo = True
+            espera = previsto - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            while self.midiendo and time.monotonic() >= fin_intervalo:
+                self._cerrar_intervalo(fin_intervalo - inicio_medicion)
+                fin_intervalo += args.intervalo
+            if self.en_vuelo >= args.max_en_vuelo:
+                # El generador no acumula tareas sin límite: lo que no entra se cuenta aparte
+                if self.midiendo:
+                    self.contadores["descartadas"] += 1
+                continue
+            op, req = self._peticion()
+            if self.midiendo:
+                self.contadores["enviadas"] += 1
+                self.intervalo.enviadas += 1
+            tarea = asyncio.ensure_future(self._ejecutar(op, req, previsto))
+            tareas.add(tarea)
+            tarea.add_done_callback(tareas.discard)
+        if tareas:
+            await asyncio.wait(tareas)
+        self._cerrar_intervalo(time.monotonic() - inicio_medicion)
+        self.conexiones.cerrar()
+        return time.monotonic() - inicio_medicion
+
+    def _cerrar_intervalo(self, t):
+        intervalo, self.intervalo = self.intervalo, Intervalo()
+        lat = intervalo.hist.resumen(escala=1e-3)
+        fila = {"t_s": round(t, 3), "enviadas": intervalo.enviadas, "ok": intervalo.ok,
+                "errores": intervalo.errores, "timeouts": intervalo.timeouts,
+                "tps": round(intervalo.ok / self.args.intervalo, 1),
+                "p50_ms": lat["p50"], "p99_ms": lat["p99"], "max_ms": lat["max"],
+                "en_vuelo": self.en_vuelo}
+        self.serie.append(fila)
+        if not self.args.silencioso:
+            print(f"  t={fila['t_s']:>6.1f}s  enviadas {fila['enviadas']:>6}  ok {fila['ok']:>6}  "
+                  f"err {fila['errores'] + fila['timeouts']:>4}  p50 {fila['p50_ms']:>8.2f}ms  "
+                  f"p99 {fila['p99_ms']:>8.2f}ms  en vuelo {fila['en_vuelo']}")
+
+    def informe(self, duracion_real):
+        args = self.args
+        return {
+            "config": {
+                "host": args.host, "port": args.port, "tasa": args.tasa, "llegadas": args.llegadas,
+                "duracion_s": args.duracion, "calentamiento_s": args.calentamiento,
+                "mezcla": args.mezcla, "zipf": args.zipf, "cuentas": args.cuentas,
+                "conexiones": args.conexiones, "max_conexiones": args.max_conexiones,
+                "semilla": args.semilla,
+            },
+            "duracion_real_s": round(duracion_real, 3),
+            "tps_ok": round(self.contadores["ok"] / duracion_real, 1) if duracion_real > 0 else 0.0,
+            "contadores": dict(self.contadores),
+            "max_en_vuelo": self.max_en_vuelo_visto,
+            "latencia_ms": self.total.resumen(escala=1e-3),
+            "latencia_por_operacion_ms": {op: h.resumen(escala=1e-3)
+                                          for op, h in self.por_operacion.items() if h.total},
+            "errores_por_tipo": self.errores_por_tipo,
+            "serie": self.serie,
+        }
+
+
+def modo_abierto(args):
+    print(f"Carga abierta contra {args.host}:{args.port}: {args.tasa:g} pet/s ({args.llegadas}), "
+          f"{args.duracion:g}s + {args.calentamiento:g}s de calentamiento, mezcla {args.mezcla}, zipf s={args.zipf:g}, "
+          f"conexiones {args.conexiones}")
+    prueba = PruebaAbierta(args)
+    duracion = asyncio.run(prueba.correr())
+    informe = prueba.informe(duracion)
+
+    c = informe["contadores"]
+    lat = informe["latencia_ms"]
+    print(f"\nEnviadas {c['enviadas']}  ok {c['ok']}  errores {c['errores']}  timeouts {c['timeouts']}  "
+          f"descartadas {c['descartadas']}  ->  {informe['tps_ok']:.1f} TPS")
+    print(f"Latencia (ms) p50 {lat['p50']:.2f}  p90 {lat['p90']:.2f}  p99 {lat['p99']:.2f}  "
+          f"p99.9 {lat['p999']:.2f}  max {lat['max']:.2f}")
+    for op, r in informe["latencia_por_operacion_ms"].items():
+        print(f"  {op:<14} n={r['cantidad']:<7} p50 {r['p50']:>8.2f}  p99 {r['p99']:>8.2f}  p99.9 {r['p999']:>8.2f}")
+    if informe["errores_por_tipo"]:
+        print("Errores:", informe["errores_por_tipo"])
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"Resumen JSON en {args.json}")
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(informe["serie"][0]))
+            w.writeheader()
+            w.writerows(informe["serie"])
+        print(f"Serie de tiempo CSV en {args.csv}")
+
+
+# ------------------ Modo lote (PREPARE_BATCH) ------------------ #
+
+def config_lote(args):
+    """Config de nodos para el modo lote: la del clúster o, con --nodos, una sola partición."""
+    if not args.nodos:
+        return cargar_config(args.config)
+    nodos = [{"host": h, "port": int(p)} for h, p in (n.rsplit(":", 1) for n in args.nodos.split(","))]
+    return {"partitions": 1, "partitions_map": {"0": nodos}}
+
+
+def hilo_lote(cuentas, tamano, config, fin, semilla, resultado):
+    rnd = random.Random(semilla)
+    hist = Histograma()
+    lotes = rechazados = 0
+    while time.monotonic() < fin:
+        transferencias = []
+        for _ in range(tamano):
+            a, b = rnd.sample(cuentas, 2)
+            transferencias.append((a, b, round(rnd.uniform(0.01, 1.0), 2)))
+        inicio = time.monotonic()
+        resp = transferir_lote(transferencias, config)
+        hist.registrar((time.monotonic() - inicio) * 1e6)
+        if resp.get("status") == "OK":
+            lotes += 1
+        else:
+            rechazados += 1
+            if rechazados == 1:
+                print(f"  [WARN] lote rechazado: {resp}")
+    resultado.append((hist, lotes, rechazados))
+
+
+def modo_lote(args):
+    config = config_lote(args)
+    todas = list(range(args.primera_cuenta, args.primera_cuenta + args.cuentas * args.paso_cuentas, args.paso_cuentas))
+    # Cada hilo usa un rango de cuentas propio para que los lotes no se bloqueen entre sí
+    rebanadas = [todas[i::args.hilos] for i in range(args.hilos)]
+    filas = []
+    print(f"{'lote':>6} {'lotes/s':>9} {'transf/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'rechazados':>11}")
+    for tamano in (int(x) for x in args.tamanos_lote.split(",")):
+        resultado = []
+        fin = time.monotonic() + args.duracion
+        inicio = time.monotonic()
+        hilos = [threading.Thread(target=hilo_lote, args=(rebanadas[i], tamano, config, fin, i, resultado))
+                 for i in range(args.hilos)]
+        for t in hilos:
+            t.start()
+        for t in hilos:
+            t.join()
+        duracion = time.monotonic() - inicio
+        hist = Histograma()
+        for h, _, _ in resultado:
+            hist.combinar(h)
+        lotes = sum(r[1] for r in resultado)
+        lat = hist.resumen(escala=1e-3)
+        fila = {"tamano_lote": tamano, "lotes_s": round(lotes / duracion, 1),
+                "transferencias_s": round(lotes * tamano / duracion, 1),
+                "p50_ms": lat["p50"], "p99_ms": lat["p99"], "rechazados": sum(r[2] for r in resultado)}
+        filas.append(fila)
+        print(f"{tamano:>6} {fila['lotes_s']:>9.1f} {fila['transferencias_s']:>10.1f} "
+              f"{fila['p50_ms']:>9.2f} {fila['p99_ms']:>9.2f} {fila['rechazados']:>11}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"nodos": config["partitions_map"], "hilos": args.hilos, "resultados": filas}, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(filas[0]))
+            w.writeheader()
+            w.writerows(filas)
+
+
+def main():
+    global HOST, PORT, central
+    parser = argparse.ArgumentParser(description="Pruebas de carga contra el ServidorCentral")
+    parser.add_argument("--modo", choices=["cerrado", "abierto", "lote"], default="cerrado",
+                        help="cerrado: hilos que esperan su respuesta (niveles de THREAD_LEVELS); "
+                             "abierto: tasa de llegada fija con asyncio; "
+                             "lote: throughput de PREPARE_BATCH directo contra los nodos según el tamaño del lote")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--tasa", type=float, default=200.0, help="peticiones por segundo (modo abierto)")
+    parser.add_argument("--llegadas", choices=["constante", "poisson"], default="poisson")
+    parser.add_argument("--duracion", type=float, default=30.0, help="segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=2.0, help="segundos iniciales sin medir")
+    parser.add_argument("--mezcla", type=parsear_mezcla, default=parsear_mezcla(MEZCLA_DEFECTO),
+                        help=f"pesos por operación ({'/'.join(OPERACIONES)}), p.ej. {MEZCLA_DEFECTO}")
+    parser.add_argument("--zipf", type=float, default=0.0, help="exponente de sesgo hacia cuentas calientes (0 = uniforme)")
+    parser.add_argument("--primera-cuenta", type=int, default=1000)
+    parser.add_argument("--cuentas", type=int, default=MAX_ACCOUNT_ID)
+    parser.add_argument("--conexiones", choices=["persistente", "por-peticion"], default="persistente")
+    parser.add_argument("--max-conexiones", type=int, default=64)
+    parser.add_argument("--max-en-vuelo", type=int, default=10000,
+                        help="peticiones pendientes a partir de las cuales las nuevas llegadas se descartan")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--intervalo", type=float, default=1.0, help="segundos por punto de la serie de tiempo")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--csv", help="archivo donde guardar la serie de tiempo")
+    parser.add_argument("--json", help="archivo donde guardar el resumen completo")
+    parser.add_argument("--silencioso", action="store_true", help="no imprimir la serie de tiempo")
+    parser.add_argument("--tamanos-lote", default="1,10,100,1000", help="tamaños de lote a medir (modo lote)")
+    parser.add_argument("--hilos", type=int, default=4, help="clientes concurrentes (modo lote)")
+    parser.add_argument("--config", default=os.path.join(ROOT_DIR, "config", "nodos_config.json"))
+    parser.add_argument("--nodos", help="host:port,... de nodos Python tratados como réplicas de una única partición")
+    parser.add_argument("--paso-cuentas", type=int, default=1,
+                        help="separación entre ids de cuenta (p.ej. 3 para las cuentas de una partición)")
+    args = parser.parse_args()
+
+    if args.modo == "cerrado":
+        HOST, PORT = args.host, args.port
+        # Una transferencia no se reintenta: si llegó al central antes del fallo ya se aplicó
+        central = PoolConexiones(HOST, PORT, max_conexiones=max(THREAD_LEVELS), timeout=5, espera_max=5)
+        modo_cerrado()
+        central.cerrar()
+    elif args.modo == "lote":
+        modo_lote(args)
+    else:
+        modo_abierto(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# scripts/migrar_particion.py
+"""Mueve a su nueva partición solo las cuentas que cambian de dueño al cambiar el particionado.
+
+Uso típico para agregar una partición con hashing consistente:
+
+  1. Copiar config/nodos_config.json a config/nodos_config_nueva.json, poner
+     "partitioner": "hash", sumar 1 a "partitions" y agregar sus nodos.
+  2. Arrancar los nodos Python de la partición nueva (con archivo de datos vacío).
+  3. python3 scripts/migrar_particion.py config/nodos_config_nueva.json
+
+Por cada partición de origen y en lotes de `--lote` cuentas:
+  MIGRATE_OUT preparar (bloquea las cuentas en todas las réplicas de origen)
+  -> MIGRATE_IN en todas las réplicas de destino -> MIGRATE_OUT confirmar.
+Al terminar reemplaza la configuración actual (dejando una copia .bak) y
+pide al ServidorCentral que la recargue. Las demás cuentas siguen operando
+durante toda la migración; las que se mueven no están disponibles entre su
+lote y la recarga del central. Todas las réplicas involucradas deben ser
+nodos Python.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexiones
+from src.python.common.particionado import Particionador
+
+CONFIG_PATH = os.path.join(ROOT_DIR, "config", "nodos_config.json")
+REINTENTOS = 5
+
+
+class ErrorMigracion(Exception):
+    pass
+
+
+def nombre(nodo):
+    return f"{nodo['host']}:{nodo['port']}"
+
+
+def enviar(nodo, req, timeout):
+    cliente = PoolConexiones(nodo["host"], int(nodo["port"]), max_conexiones=1, timeout=timeout)
+    try:
+        return cliente.solicitar(req)
+    except Exception as e:
+        return {"status": "ERROR", "error": str(e)}
+    finally:
+        cliente.cerrar()
+
+
+def enviar_todos(nodos, req, timeout):
+    """Envía `req` a todos los nodos en paralelo y devuelve [(nodo, respuesta)]."""
+    with ThreadPoolExecutor(max_workers=max(1, len(nodos))) as ex:
+        return list(zip(nodos, ex.map(lambda n: enviar(n, req, timeout), nodos)))
+
+
+def suma_total(config, timeout):
+    total = 0.0
+    for p, nodos in config["partitions_map"].items():
+        for nodo in nodos:
+            resp = enviar(nodo, {"type": "SUM_PARTITION"}, timeout)
+            if resp.get("status") == "OK":
+                total += resp["sum"]
+                break
+        else:
+            return None
+    return round(total, 2)
+
+
+class Migracion:
+    def __init__(self, actual, nueva, lote, timeout):
+        self.actual = actual
+        self.nueva = nueva
+        self.particionado = Particionador.desde_config(nueva).descripcion()
+        self.lote = lote
+        self.timeout = timeout
+        self.movidas = 0
+
+    def contar(self):
+        """{origen: {destino: cuentas}} según la primera réplica de cada partición de origen."""
+        conteo = {}
+        for p, nodos in sorted(self.actual["partitions_map"].items(), key=lambda kv: int(kv[0])):
+            resp = enviar(nodos[0], {"type": "MIGRATE_OUT", "fase": "contar", "migracion_id": "contar",
+                                     "particion": int(p), "particionado": self.particionado}, self.timeout)
+            if resp.get("status") != "OK":
+                raise ErrorMigracion(f"{nombre(nodos[0])} no puede migrar: {resp.get('error')}")
+            conteo[int(p)] = {int(q): n for q, n in resp["por_destino"].items()}
+        return conteo
+
+    def _preparar(self, origen, nodos, migracion_id):
+        req = {"type": "MIGRATE_OUT", "fase": "preparar", "migracion_id": migracion_id,
+               "particion": origen, "particionado": self.particionado, "limite": self.lote}
+        for intento in range(REINTENTOS):
+            respuestas = enviar_todos(nodos, req, self.timeout)
+            fallidos = [(n, r) for n, r in respuestas if r.get("status") != "READY"]
+            if not fallidos:
+                cuentas = respuestas[0][1]["cuentas"]
+                distintas = [n for n, r in respuestas if r["cuentas"] != cuentas]
+                if distintas:
+                    self._cancelar(nodos, migracion_id)
+                    raise ErrorMigracion(f"las réplicas de la partición {origen} no coinciden: "
+                                         f"{', '.join(nombre(n) for n in distintas)}")
+                return cuentas, respuestas[0][1]["restantes"]
+            self._cancelar(nodos, migracion_id)
+            detalle = ", ".join(f"{nombre(n)}: {r.get('error')}" for n, r in fallidos)
+            print(f"  Intento {intento + 1}: {detalle}")
+            time.sleep(0.2 * (intento + 1))
+        raise ErrorMigracion(f"no se pudieron bloquear las cuentas de la partición {origen}")
+
+    def _cancelar(self, nodos, migracion_id):
+        enviar_todos(nodos, {"type": "MIGRATE_OUT", "fase": "cancelar", "migracion_id": migracion_id}, self.timeout)
+
+    def _entrar(self, migracion_id, por_destino):
+        """MIGRATE_IN en todas las réplicas de cada destino; si alguna falla, deshace lo aplicado."""
+        aplicadas = []
+        for destino, cuentas in sorted(por_destino.items()):
+            nodos = self.nueva["partitions_map"].get(str(destino))
+            if not nodos:
+                raise ErrorMigracion(f"la partición {destino} no tiene nodos en la nueva configuración")
+            req = {"type": "MIGRATE_IN", "migracion_id": migracion_id, "cuentas": cuentas}
+            respuestas = enviar_todos(nodos, req, self.timeout)
+            aplicadas += [(n, cuentas) for n, r in respuestas if r.get("status") == "COMMITTED"]
+            fallidos = [(n, r) for n, r in respuestas if r.get("status") != "COMMITTED"]
+            if fallidos:
+                for nodo, hechas in aplicadas:
+                    enviar(nodo, {"type": "MIGRATE_IN", "fase": "deshacer", "migracion_id": migracion_id,
+                                  "cuentas": hechas}, self.timeout)
+                raise ErrorMigracion(", ".join(f"{nombre(n)}: {r.get('error')}" for n, r in fallidos))
+
+    def migrar_particion(self, origen):
+        nodos = self.actual["partitions_map"][str(origen)]
+        numero = 0
+        while True:
+            migracion_id = f"mig_{int(time.time() * 1000)}_{origen}_{numero}"
+            por_destino, restantes = self._preparar(origen, nodos, migracion_id)
+            cantidad = sum(len(c) for c in por_destino.values())
+            if not cantidad:
+                self._cancelar(nodos, migracion_id)
+                return
+            try:
+                self._entrar(migracion_id, por_destino)
+            except ErrorMigracion:
+                self._cancelar(nodos, migracion_id)
+                raise
+            confirmadas = enviar_todos(nodos, {"type": "MIGRATE_OUT", "fase": "confirmar",
+                                               "migracion_id": migracion_id}, self.timeout)
+            for nodo, resp in confirmadas:
+                if resp.get("status") != "COMMITTED":
+                    # Las cuentas ya están en el destino: la réplica que no confirmó las tiene duplicadas
+                    print(f"  [ERROR] {nombre(nodo)} no confirmó {migracion_id}: {resp.get('error')}; "
+                          f"hay que eliminar a mano esas cuentas o resincronizar la réplica.")
+            self.movidas += cantidad
+            destinos = ", ".join(f"{len(c)} -> P{q}" for q, c in sorted(por_destino.items()))
+            print(f"  P{origen}: lote {numero} ({destinos}), quedan {restantes}")
+            numero += 1
+            if not restantes:
+                return
+
+
+def recargar_central(central, timeout):
+    host, port = central.rsplit(":", 1)
+    return enviar({"host": host, "port": int(port)}, {"type": "RECARGAR_CONFIG"}, timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra las cuentas afectadas por un cambio de particionado")
+    parser.add_argument("nueva", help="configuración de destino (particiones, nodos y particionador)")
+    parser.add_argument("--actual", default=CONFIG_PATH, help="configuración con la que corre el clúster hoy")
+    parser.add_argument("--central", default="127.0.0.1:6000", help="ServidorCentral a recargar al terminar ('' para omitir)")
+    parser.add_argument("--lote", type=int, default=5000, help="cuentas bloqueadas y movidas por lote")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--simular", action="store_true", help="solo contar cuántas cuentas se moverían")
+    args = parser.parse_args()
+
+    with open(args.actual) as f:
+        actual = json.load(f)
+    with open(args.nueva) as f:
+        nueva = json.load(f)
+    migracion = Migracion(actual, nueva, args.lote, args.timeout)
+
+    try:
+        conteo = migracion.contar()
+    except ErrorMigracion as e:
+        print(f">> ERROR: {e}")
+        sys.exit(1)
+    total_cuentas = sum(sum(d.values()) for d in conteo.values())
+    for origen, destinos in conteo.items():
+        detalle = ", ".join(f"{n} -> P{q}" for q, n in sorted(destinos.items())) or "ninguna"
+        print(f"Partición {origen}: {detalle}")
+    print(f"Cuentas a mover: {total_cuentas}")
+    if args.simular or not total_cuentas:
+        return
+
+    antes = suma_total(nueva, args.timeout)
+    inicio = time.monotonic()
+    try:
+        for origen in conteo:
+            migracion.migrar_particion(origen)
+    except ErrorMigracion as e:
+        print(f">> ERROR: migración interrumpida tras {migracion.movidas} cuentas: {e}")
+        print(">> La configuración actual no se modificó; volver a ejecutar mueve las cuentas que faltan.")
+        sys.exit(1)
+    print(f"{migracion.movidas} cuentas movidas en {time.monotonic() - inicio:.1f}s")
+
+    if os.path.abspath(args.actual) != os.path.abspath(args.nueva):
+        shutil.copyfile(args.actual, args.actual + ".bak")
+        shutil.copyfile(args.nueva, args.actual)
+        print(f"Configuración reemplazada ({args.actual}, anterior en {args.actual}.bak)")
+    if args.central:
+        resp = recargar_central(args.central, args.timeout)
+        if resp.get("status") == "OK":
+            print(f"ServidorCentral recargado: {resp.get('partitions')} particiones ({resp.get('partitioner')})")
+        else:
+            print(f"[WARN] No se pudo recargar el ServidorCentral ({resp.get('error')}); reiniciarlo con la nueva configuración.")
+
+    despues = suma_total(nueva, args.timeout)
+    print(f"Saldo total antes: {antes}  después: {despues}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
 
-import sqlite3
 import os
+import sys
 
-# Construir la ruta a la base de datos desde la ubicación del script
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "db", "banco_chat.db"))
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.db_utils import DB_PATH, conectar, inicializar_bd
 
 def poblar_db():
     """Limpia y puebla las tablas Cuentas y Prestamos con datos de ejemplo."""
     print(f"Conectando a la base de datos en {DB_PATH}...")
     try:
-        conn = sqlite3.connect(DB_PATH)
+        inicializar_bd()
+        conn = conectar()
         cursor = conn.cursor()
 
         # --- Limpiar datos antiguos para evitar duplicados ---
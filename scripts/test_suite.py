@@ -1,15 +1,19 @@
-import socket, json, time
+import json, os, sys, time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexiones
 
 CENTRAL_HOST = '127.0.0.1'
 CENTRAL_PORT = 6000
 
+central = PoolConexiones(CENTRAL_HOST, CENTRAL_PORT, max_conexiones=1)
+
 def enviar(req):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((CENTRAL_HOST, CENTRAL_PORT))
-        s.sendall((json.dumps(req) + "\n").encode())
-        resp = s.recv(4096).decode().strip()
-        print("[RESPUESTA]", resp)
-        return json.loads(resp)
+    resp = central.solicitar_linea((json.dumps(req) + "\n").encode()).decode().strip()
+    print("[RESPUESTA]", resp)
+    return json.loads(resp)
 
 print("\n=== TEST 1: CONSULTA ===")
 enviar({"type":"CONSULTAR_CUENTA","account":1000})
@@ -0,0 +1,71 @@
+# scripts/utilidades_bench.py
+# Funciones comunes de los benchmarks: levantan nodos Python aislados en un directorio temporal.
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+WORKER = os.path.join(ROOT_DIR, "src", "python", "nodo_trabajador", "nodo_worker.py")
+ESQUEMA = os.path.join(ROOT_DIR, "db", "banco_chat.db.sql")
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def crear_bd(ruta):
+    """Crea una BD vacía con el esquema del proyecto (para no tocar db/banco_chat.db)."""
+    conn = sqlite3.connect(ruta)
+    with open(ESQUEMA, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.close()
+
+
+def crear_datos(ruta, cuentas, inicio=1000, paso=1, seed=42):
+    rnd = random.Random(seed)
+    with open(ruta, "w") as f:
+        for acc in range(inicio, inicio + cuentas * paso, paso):
+            f.write(f"{acc},{rnd.uniform(100.0, 10000.0):.2f}\n")
+
+
+def esperar_puerto(port, timeout=30.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"el nodo en el puerto {port} no arrancó")
+
+
+def levantar_nodo(directorio, cuentas=10000, modo="asyncio", port=None, extra=()):
+    """Arranca un nodo_worker.py en un subproceso con datos propios. Devuelve (proceso, puerto)."""
+    port = port or puerto_libre()
+    os.makedirs(directorio, exist_ok=True)
+    datos = os.path.join(directorio, "cuentas.txt")
+    bd = os.path.join(directorio, "banco.db")
+    if not os.path.exists(datos):
+        crear_datos(datos, cuentas)
+    if not os.path.exists(bd):
+        crear_bd(bd)
+    proc = subprocess.Popen(
+        [sys.executable, WORKER, str(port), datos, "--modo", modo, "--db", bd, *extra],
+        cwd=directorio, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    esperar_puerto(port)
+    return proc, port
+
+
+def detener(proc):
+    proc.terminate()
+    try:
+        proc.wait(5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
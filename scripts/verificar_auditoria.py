@@ -0,0 +1,72 @@
+# scripts/verificar_auditoria.py
+# Comprueba la auditoría de un PREPARE_BATCH que mueve varias veces la misma cuenta: levanta un nodo aislado,
+# confirma el lote y verifica que la tabla Transacciones tenga una fila por movimiento. Repetir el COMMIT (como
+# hace una réplica que comparte la BD) no debe duplicarlas.
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexiones
+from utilidades_bench import detener, levantar_nodo
+
+PRIMERA_CUENTA = 1000
+ESPERA_AUDITORIA = 10.0
+
+
+def filas_de(bd, tx_id):
+    conn = sqlite3.connect(bd)
+    try:
+        return conn.execute("SELECT id_cuenta, tipo, monto, indice_mov FROM Transacciones WHERE tx_id = ? "
+                            "ORDER BY indice_mov", (tx_id,)).fetchall()
+    finally:
+        conn.close()
+
+
+def esperar_filas(bd, tx_id, esperadas):
+    limite = time.monotonic() + ESPERA_AUDITORIA
+    while True:
+        filas = filas_de(bd, tx_id)
+        if len(filas) >= esperadas or time.monotonic() > limite:
+            return filas
+        time.sleep(0.1)
+
+
+def main():
+    a, b, c = PRIMERA_CUENTA, PRIMERA_CUENTA + 1, PRIMERA_CUENTA + 2
+    tx_id = f"verif_{uuid.uuid4().hex}"
+    ops = [{"type": "TRANSFER", "from": a, "to": b, "amount": 1.0},
+           {"type": "TRANSFER", "from": a, "to": b, "amount": 2.0},
+           {"type": "TRANSFER", "from": c, "to": a, "amount": 0.5}]
+    esperadas = 2 * len(ops)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc, port = levantar_nodo(tmp, cuentas=10, modo="hilos", extra=["--sin-catchup"])
+        try:
+            nodo = PoolConexiones("127.0.0.1", port, max_conexiones=1)
+            resp = nodo.solicitar({"type": "PREPARE_BATCH", "tx_id": tx_id, "ops": ops})
+            if resp.get("status") != "READY":
+                sys.exit(f"PREPARE_BATCH rechazado: {resp}")
+            for _ in range(2):
+                resp = nodo.solicitar({"type": "COMMIT", "tx_id": tx_id})
+                if resp.get("status") != "COMMITTED":
+                    sys.exit(f"COMMIT rechazado: {resp}")
+            nodo.cerrar()
+            filas = esperar_filas(os.path.join(tmp, "banco.db"), tx_id, esperadas)
+        finally:
+            detener(proc)
+
+    for fila in filas:
+        print(fila)
+    if len(filas) != esperadas:
+        sys.exit(f"FALLO: {len(filas)} filas de auditoría, se esperaban {esperadas}")
+    print(f"OK: {esperadas} filas de auditoría, una por movimiento")
+
+
+if __name__ == "__main__":
+    main()
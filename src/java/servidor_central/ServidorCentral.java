@@ -2,6 +2,9 @@ package servidor_central;
 
 import java.io.*;
 import java.net.*;
+import java.nio.charset.StandardCharsets;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
 import java.sql.Connection;
 import java.sql.DriverManager;
 import java.sql.PreparedStatement;
@@ -12,8 +15,9 @@ import java.util.concurrent.*;
 public class ServidorCentral {
 
     private int port;
-    private int partitions;
-    private final Map<Integer, List<NodeInfo>> partitionsMap = new HashMap<>();
+    private final String configPath;
+    // Se reemplaza entera al recargar la configuración (RECARGAR_CONFIG)
+    private volatile Topologia topologia;
     private final ExecutorService pool = Executors.newCachedThreadPool();
 
     static class NodeInfo {
@@ -33,12 +37,68 @@ public class ServidorCentral {
         }
     }
 
+    /**
+     * Particiones, sus nodos y la asignación de cuentas. Con "partitioner":"hash"
+     * usa el mismo anillo de hashing consistente que src/python/common/particionado.py:
+     * "vnodes" puntos por partición en la posición MD5("p<partición>-v<i>").
+     */
+    static class Topologia {
+        final int partitions;
+        final Map<Integer, List<NodeInfo>> partitionsMap;
+        final String partitioner;
+        final long[] anillo;
+        final int[] duenos;
+
+        Topologia(int partitions, Map<Integer, List<NodeInfo>> partitionsMap, String partitioner, int vnodes) {
+            this.partitions = partitions;
+            this.partitionsMap = partitionsMap;
+            this.partitioner = partitioner;
+            if (!"hash".equals(partitioner)) {
+                anillo = null;
+                duenos = null;
+                return;
+            }
+            long[][] puntos = new long[partitions * vnodes][];
+            for (int p = 0; p < partitions; p++) {
+                for (int v = 0; v < vnodes; v++) {
+                    puntos[p * vnodes + v] = new long[]{posicion("p" + p + "-v" + v), p};
+                }
+            }
+            Arrays.sort(puntos, (a, b) -> a[0] != b[0] ? Long.compare(a[0], b[0]) : Long.compare(a[1], b[1]));
+            anillo = new long[puntos.length];
+            duenos = new int[puntos.length];
+            for (int i = 0; i < puntos.length; i++) {
+                anillo[i] = puntos[i][0];
+                duenos[i] = (int) puntos[i][1];
+            }
+        }
+
+        int particionDe(int acc) {
+            if (anillo == null) return acc % partitions;
+            long h = posicion(String.valueOf(acc));
+            int i = Arrays.binarySearch(anillo, h);
+            if (i < 0) i = -i - 1;
+            while (i > 0 && anillo[i - 1] == h) i--;
+            return duenos[i == anillo.length ? 0 : i];
+        }
+
+        static long posicion(String s) {
+            try {
+                byte[] d = MessageDigest.getInstance("MD5").digest(s.getBytes(StandardCharsets.UTF_8));
+                return ((d[0] & 0xFFL) << 24) | ((d[1] & 0xFFL) << 16) | ((d[2] & 0xFFL) << 8) | (d[3] & 0xFFL);
+            } catch (NoSuchAlgorithmException e) {
+                throw new IllegalStateException(e);
+            }
+        }
+    }
+
     public ServidorCentral(int port, String configFile) throws Exception {
         this.port = port;
-        loadConfig(configFile);
+        this.configPath = configFile;
+        this.topologia = loadConfig(configFile);
     }
 
-    private void loadConfig(String configPath) throws IOException {
+    private Topologia loadConfig(String configPath) throws IOException {
         String content = new String(java.nio.file.Files.readAllBytes(java.nio.file.Paths.get(configPath)));
         content = content.replaceAll("\\s+", "");
 
@@ -47,7 +107,23 @@ public class ServidorCentral {
         int startPart = idxPart + "\"partitions\":".length();
         int endPart = content.indexOf(",", startPart);
         if (endPart < 0) endPart = content.indexOf("}", startPart);
-        partitions = Integer.parseInt(content.substring(startPart, endPart));
+        int partitions = Integer.parseInt(content.substring(startPart, endPart));
+
+        String partitioner = "modulo";
+        int idxTipo = content.indexOf("\"partitioner\":\"");
+        if (idxTipo >= 0) {
+            int startTipo = idxTipo + "\"partitioner\":\"".length();
+            partitioner = content.substring(startTipo, content.indexOf("\"", startTipo));
+        }
+        int vnodes = 64;
+        int idxVnodes = content.indexOf("\"vnodes\":");
+        if (idxVnodes >= 0) {
+            int startV = idxVnodes + "\"vnodes\":".length();
+            int endV = startV;
+            while (endV < content.length() && Character.isDigit(content.charAt(endV))) endV++;
+            vnodes = Integer.parseInt(content.substring(startV, endV));
+        }
+        Map<Integer, List<NodeInfo>> partitionsMap = new HashMap<>();
 
         int idxMap = content.indexOf("\"partitions_map\":{");
         if (idxMap < 0) throw new IOException("Campo partitions_map no encontrado en config");
@@ -86,8 +162,9 @@ public class ServidorCentral {
             partitionsMap.put(p, list);
         }
 
-        System.out.println("Configuración cargada. Particiones: " + partitions);
+        System.out.println("Configuración cargada. Particiones: " + partitions + " (" + partitioner + ")");
         partitionsMap.forEach((k, v) -> System.out.println("Partición " + k + " -> " + v));
+        return new Topologia(partitions, partitionsMap, partitioner, vnodes);
     }
 
     public void start() throws IOException {
@@ -113,7 +190,7 @@ public class ServidorCentral {
 
                 if ("CONSULTAR_CUENTA".equals(type)) {
                     int acc = Integer.parseInt(req.get("account"));
-                    int p = acc % partitions;
+                    int p = topologia.particionDe(acc);
                     String resp = forwardToPartition(p, line);
                     out.write(resp + "\n");
                     out.flush();
@@ -121,20 +198,20 @@ public class ServidorCentral {
                     int from = Integer.parseInt(req.get("from"));
                     int to = Integer.parseInt(req.get("to"));
                     double amount = Double.parseDouble(req.get("amount"));
-                    String tx = "tx_" + System.currentTimeMillis();
+                    String tx = nuevoTxId();
                     boolean ok = twoPhaseCommitTransfer(tx, from, to, amount);
                     out.write(ok ? "{\"status\":\"OK\"}\n" : "{\"status\":\"ERROR\"}\n");
                     out.flush();
                 } else if ("CREAR_CUENTA".equals(type)) {
                     int acc = Integer.parseInt(req.get("account"));
                     double init = Double.parseDouble(req.get("initial"));
-                    String tx = "tx_" + System.currentTimeMillis();
+                    String tx = nuevoTxId();
                     boolean ok = twoPhaseCommitCreate(tx, acc, init);
                     out.write(ok ? "{\"status\":\"OK\"}\n" : "{\"status\":\"ERROR\"}\n");
                     out.flush();
                 } else if ("ELIMINAR_CUENTA".equals(type)) {
                     int acc = Integer.parseInt(req.get("account"));
-                    String tx = "tx_" + System.currentTimeMillis();
+                    String tx = nuevoTxId();
                     boolean ok = twoPhaseCommitDelete(tx, acc);
                     out.write(ok ? "{\"status\":\"OK\"}\n" : "{\"status\":\"ERROR\"}\n");
                     out.flush();
@@ -191,9 +268,21 @@ public class ServidorCentral {
                     }
                     out.write(sb.toString() + "\n");
                     out.flush();
+                } else if ("RECARGAR_CONFIG".equals(type)) {
+                    // Tras migrar cuentas entre particiones: las peticiones nuevas usan la nueva asignación
+                    try {
+                        Topologia nueva = loadConfig(configPath);
+                        topologia = nueva;
+                        out.write(String.format("{\"status\":\"OK\",\"partitions\":%d,\"partitioner\":\"%s\"}\n",
+                                nueva.partitions, nueva.partitioner));
+                    } catch (Exception e) {
+                        out.write(String.format("{\"status\":\"ERROR\",\"error\":\"%s\"}\n", String.valueOf(e.getMessage()).replace('"', '\'')));
+                    }
+                    out.flush();
                 } else if ("ARQUEO".equals(type)) {
                     double totalBalance = 0.0;
                     boolean error = false;
+                    int partitions = topologia.partitions;
                     for (int p = 0; p < partitions; p++) {
                         String respStr = forwardToPartition(p, "{\"type\":\"SUM_PARTITION\"}");
                         try {
@@ -243,7 +332,7 @@ public class ServidorCentral {
     }
 
     private String forwardToPartition(int partition, String json) {
-        List<NodeInfo> nodes = partitionsMap.get(partition);
+        List<NodeInfo> nodes = topologia.partitionsMap.get(partition);
         if (nodes == null || nodes.isEmpty()) {
             return "{\"status\":\"ERROR\",\"error\":\"particion no configurada\"}";
         }
@@ -256,9 +345,20 @@ public class ServidorCentral {
         return "{\"status\":\"ERROR\",\"error\":\"particion inalcanzable\"}";
     }
 
+    /**
+     * Identificador único de transacción ("tx_<milisegundos>_<UUID>"). Los nodos reconocen
+     * los reintentos por tx_id, así que dos transacciones concurrentes nunca pueden
+     * compartirlo: el milisegundo solo se repite con carga concurrente.
+     */
+    private static String nuevoTxId() {
+        return "tx_" + System.currentTimeMillis() + "_" + UUID.randomUUID().toString().replace("-", "");
+    }
+
     private boolean twoPhaseCommitTransfer(String tx, int from, int to, double amount) {
-        int pFrom = from % partitions;
-        int pTo = to % partitions;
+        Topologia t = topologia;
+        Map<Integer, List<NodeInfo>> partitionsMap = t.partitionsMap;
+        int pFrom = t.particionDe(from);
+        int pTo = t.particionDe(to);
         Set<NodeInfo> participants = new HashSet<>();
         if (partitionsMap.containsKey(pFrom)) participants.addAll(partitionsMap.get(pFrom));
         if (partitionsMap.containsKey(pTo)) participants.addAll(partitionsMap.get(pTo));
@@ -291,8 +391,9 @@ public class ServidorCentral {
     }
 
     private boolean twoPhaseCommitCreate(String tx, int acc, double init) {
-        int p = acc % partitions;
-        List<NodeInfo> nodes = partitionsMap.get(p);
+        Topologia t = topologia;
+        int p = t.particionDe(acc);
+        List<NodeInfo> nodes = t.partitionsMap.get(p);
         if (nodes == null || nodes.isEmpty()) return false;
 
         List<NodeInfo> preparedNodes = new CopyOnWriteArrayList<>();
@@ -323,8 +424,9 @@ public class ServidorCentral {
     }
 
     private boolean twoPhaseCommitDelete(String tx, int acc) {
-        int p = acc % partitions;
-        List<NodeInfo> nodes = partitionsMap.get(p);
+        Topologia t = topologia;
+        int p = t.particionDe(acc);
+        List<NodeInfo> nodes = t.partitionsMap.get(p);
         if (nodes == null || nodes.isEmpty()) return false;
 
         List<NodeInfo> preparedNodes = new CopyOnWriteArrayList<>();
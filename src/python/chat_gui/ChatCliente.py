@@ -1,6 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, simpledialog
-import socket, json, threading, os, sys
+import json, threading, os, sys
 from datetime import datetime
 
 # Añadir el directorio raíz del proyecto al path para permitir imports absolutos desde src
@@ -8,26 +8,58 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
 sys.path.append(ROOT_DIR)
 
 from src.python.common.db_utils import conectar
+from src.python.common.cliente import PoolConexiones
 
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 8085  # Puerto ChatServidor
 
+# La sesión de la GUI reutiliza sus conexiones con el ChatServidor
+servidor = PoolConexiones(SERVER_HOST, SERVER_PORT, max_conexiones=4)
+
+# Historial de transacciones: filas por página, páginas al abrirlo y cuánto falta para el final
+# de la lista (fracción visible) para pedir la página siguiente
+PAGINA_TRANSACCIONES = 50
+PAGINAS_INICIALES = 2
+UMBRAL_SIGUIENTE_PAGINA = 0.9
+
 
 # ------------------ Funciones auxiliares ------------------ #
 
 def send_to_server(payload, timeout=4):
+    reintentable = (payload.get("type") or "").upper() != "TRANSFERIR_CUENTA"
     try:
-        with socket.create_connection((SERVER_HOST, SERVER_PORT), timeout=timeout) as s:
-            s.sendall((json.dumps(payload) + "\n").encode())
-            data = s.recv(65536).decode().strip()
-            if not data:
-                return {"status": "ERROR", "error": "sin respuesta"}
-            try:
-                return json.loads(data)
-            except:
-                return {"status": "ERROR", "error": "respuesta no JSON", "raw": data}
+        linea = (json.dumps(payload) + "\n").encode()
+        data = servidor.solicitar_linea(linea, timeout=timeout, reintentable=reintentable).decode().strip()
     except Exception as e:
         return {"status": "ERROR", "error": str(e)}
+    if not data:
+        return {"status": "ERROR", "error": "sin respuesta"}
+    try:
+        return json.loads(data)
+    except:
+        return {"status": "ERROR", "error": "respuesta no JSON", "raw": data}
+
+
+def paginas_transacciones(account, cursor=None, limite=PAGINA_TRANSACCIONES, paginas=1, timeout=10):
+    """Pide `paginas` páginas del historial de `account` después de `cursor` y las entrega a medida que llegan.
+
+    El ChatServidor responde una línea JSON por página; la respuesta termina
+    tras `paginas` páginas, en la que trae "fin" o en un error.
+    """
+    payload = {"type": "CONSULTAR_TRANSACCIONES", "account": account, "cursor": cursor,
+               "limite": limite, "paginas": paginas}
+    recibidas = []
+
+    def es_ultima(linea):
+        resp = json.loads(linea)
+        recibidas.append(resp)
+        return len(recibidas) >= paginas or resp.get("fin") or resp.get("status") != "OK"
+
+    try:
+        for _ in servidor.solicitar_flujo((json.dumps(payload) + "\n").encode(), es_ultima, timeout=timeout):
+            yield recibidas[-1]
+    except Exception as e:
+        yield {"status": "ERROR", "error": str(e)}
 
 
 def get_history(limit=100):
@@ -86,7 +118,12 @@ class ChatGUI:
         self.table_frame = tk.Frame(main, bg="#f4f6f9")
         self.table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         self.tree = ttk.Treeview(self.table_frame, columns=("c1","c2","c3","c4"), show="headings")
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.scroll = ttk.Scrollbar(self.table_frame, orient="vertical", command=self.tree.yview)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Historial que se está mostrando por páginas (None si la tabla muestra otra cosa)
+        self._historial = None
         self._init_table(["ID", "Descripción", "Monto", "Fecha"])
 
         self.load_history()
@@ -94,6 +131,7 @@ class ChatGUI:
     # ------------------ Métodos auxiliares ------------------ #
 
     def _init_table(self, headers):
+        self._historial = None
         self.tree.delete(*self.tree.get_children())
         self.tree["columns"] = [f"c{i}" for i in range(1, len(headers)+1)]
         for i, h in enumerate(headers, start=1):
@@ -102,9 +140,53 @@ class ChatGUI:
 
     def _fill_table(self, rows):
         self.tree.delete(*self.tree.get_children())
+        self._append_rows(rows)
+
+    def _append_rows(self, rows):
         for row in rows:
             self.tree.insert("", "end", values=row)
 
+    # ------------------ Historial de transacciones por páginas ------------------ #
+
+    def _on_scroll(self, first, last):
+        self.scroll.set(first, last)
+        # También se llama al insertar filas: mientras la tabla no se llene se siguen pidiendo páginas
+        if float(last) >= UMBRAL_SIGUIENTE_PAGINA:
+            self._next_page()
+
+    def _next_page(self, paginas=1):
+        hist = self._historial
+        if hist is None or hist["fin"] or hist["cargando"]:
+            return
+        hist["cargando"] = True
+        threading.Thread(target=self._fetch_pages, args=(hist, paginas), daemon=True).start()
+
+    def _fetch_pages(self, hist, paginas):
+        # Tkinter no es seguro entre hilos: las páginas se agregan desde el bucle de eventos
+        for resp in paginas_transacciones(hist["account"], hist["cursor"], paginas=paginas):
+            self.root.after(0, self._add_page, hist, resp)
+        self.root.after(0, self._page_done, hist)
+
+    def _add_page(self, hist, resp):
+        if hist is not self._historial:
+            return  # la tabla ya muestra otra consulta
+        if resp.get("status") != "OK":
+            hist["fin"] = True
+            self.append_text(str(resp), "server")
+            return
+        rows = [(d.get("id_transaccion","-"), d.get("tipo","-"), d.get("monto","-"), d.get("fecha","-")) for d in resp.get("data", [])]
+        self._append_rows(rows)
+        hist["filas"] += len(rows)
+        hist["cursor"] = resp.get("cursor")
+        hist["fin"] = bool(resp.get("fin"))
+        if hist["fin"]:
+            self.append_text(f"{hist['filas']} transacciones encontradas.", "server")
+
+    def _page_done(self, hist):
+        hist["cargando"] = False
+        if hist is self._historial and self.tree.yview()[1] >= UMBRAL_SIGUIENTE_PAGINA:
+            self._next_page()
+
     def append_text(self, txt, sender="system"):
         self.txt.config(state="normal")
         ts = datetime.now().strftime("[%H:%M:%S] ")
@@ -161,8 +243,9 @@ class ChatGUI:
         acc = simpledialog.askinteger("Ver transacciones", "Ingrese ID de cuenta:", parent=self.root)
         if not acc: return
         self.append_text(f"Obteniendo transacciones de la cuenta {acc}...", "you")
-        payload = {"type": "CONSULTAR_TRANSACCIONES", "account": acc}
-        threading.Thread(target=self._do_query_and_show, args=(payload, "transacciones"), daemon=True).start()
+        self._init_table(["ID", "Concepto", "Monto", "Fecha"])
+        self._historial = {"account": acc, "cursor": None, "fin": False, "cargando": False, "filas": 0}
+        self._next_page(PAGINAS_INICIALES)
 
     def ask_estado_prestamo(self):
         acc = simpledialog.askinteger("Estado préstamo", "Ingrese ID de cuenta:", parent=self.root)
@@ -195,13 +278,6 @@ class ChatGUI:
             saldo = row[1] if row[1] is not None else 0.0
             self.append_text(f"Saldo disponible en cuenta {row[0]}: S/. {saldo:.2f}", "server")
 
-        elif mode == "transacciones":
-            self._init_table(["ID", "Concepto", "Monto", "Fecha"])
-            data = resp.get("data", [])
-            rows = [(d.get("id_transaccion","-"), d.get("tipo","-"), d.get("monto","-"), d.get("fecha","-")) for d in data]
-            self._fill_table(rows)
-            self.append_text(f"{len(rows)} transacciones encontradas.", "server")
-
         elif mode == "prestamos":
             self._init_table(["ID", "Monto pendiente", "Estado", "Fecha"])
             data = resp.get("data", [])
@@ -10,6 +10,9 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
 sys.path.append(ROOT_DIR)
 
 from src.python.common.db_utils import conectar, inicializar_bd
+from src.python.common.enrutador_lecturas import ERRORES_SIN_REPLICA, EnrutadorLecturas
+from src.python.common.cliente import PoolConexiones
+from src.python.chat_gui.cache_lectura import CacheLectura
 
 CENTRAL_HOST = "127.0.0.1"
 CENTRAL_PORT = 6000
@@ -17,22 +20,96 @@ CENTRAL_PORT = 6000
 HOST = "127.0.0.1"
 PORT = 8085
 
+# Conexiones persistentes hacia el ServidorCentral (atiende varias líneas por conexión)
+MAX_CONEXIONES_CENTRAL = 32
+# CONSULTAR_CUENTA directo a la réplica más rápida de config/nodos_config.json (el central queda de respaldo)
+LECTURAS_DIRECTAS = True
+# Segundos que una conexión de cliente puede quedar abierta sin enviar peticiones
+INACTIVIDAD_CLIENTE = 300
+
+# Segundos que una respuesta puede servirse desde la cache, por tipo (0 = sin cache)
+TTL_CACHE = {
+    "CONSULTAR_CUENTA": 2.0,
+    "CONSULTAR_TRANSACCIONES": 10.0,
+    "ESTADO_PAGO_PRESTAMO": 30.0,
+}
+CAPACIDAD_CACHE = 10000
+
+# Historial paginado de transacciones: filas por página (por defecto y máximo) y páginas por petición
+PAGINA_TRANSACCIONES = 50
+MAX_PAGINA_TRANSACCIONES = 500
+MAX_PAGINAS_POR_PETICION = 20
+
 inicializar_bd()
 
+pool_central = PoolConexiones(CENTRAL_HOST, CENTRAL_PORT, max_conexiones=MAX_CONEXIONES_CENTRAL)
+enrutador = None
+if LECTURAS_DIRECTAS:
+    try:
+        enrutador = EnrutadorLecturas.desde_archivo()
+    except (OSError, ValueError, KeyError) as e:
+        print("[WARN] Sin lecturas directas a las réplicas:", e)
+cache = CacheLectura(TTL_CACHE, capacidad=CAPACIDAD_CACHE)
+conexiones_cliente = {"activas": 0, "totales": 0, "peticiones": 0}
+_lock_conexiones = threading.Lock()
+
 
 def forward_to_central(payload: dict, timeout=4):
+    # Solo se repiten en otra conexión las peticiones de lectura; una transferencia no
+    reintentable = (payload.get("type") or "").upper() != "TRANSFERIR_CUENTA"
     try:
-        with socket.create_connection((CENTRAL_HOST, CENTRAL_PORT), timeout=timeout) as s:
-            s.sendall((json.dumps(payload) + "\n").encode())
-            data = s.recv(65536).decode().strip()
-            if not data:
-                return {"status": "ERROR", "error": "sin respuesta del central"}
-            try:
-                return json.loads(data)
-            except Exception:
-                return {"status": "ERROR", "error": "respuesta no JSON del central", "raw": data}
+        linea = (json.dumps(payload) + "\n").encode()
+        data = pool_central.solicitar_linea(linea, timeout=timeout, reintentable=reintentable).decode().strip()
     except Exception as e:
         return {"status": "ERROR", "error": "central inalcanzable: " + str(e)}
+    if not data:
+        return {"status": "ERROR", "error": "sin respuesta del central"}
+    try:
+        return json.loads(data)
+    except Exception:
+        return {"status": "ERROR", "error": "respuesta no JSON del central", "raw": data}
+
+
+def consultar_saldo(mensaje):
+    """CONSULTAR_CUENTA en la réplica más rápida; si ninguna responde, a través del central."""
+    if enrutador is not None:
+        try:
+            resp = enrutador.consultar(mensaje["account"])
+        except (KeyError, TypeError, ValueError):
+            resp = None
+        if resp is not None and resp.get("error") not in ERRORES_SIN_REPLICA:
+            return resp
+    return forward_to_central(mensaje)
+
+
+def consultar_cuentas(mensaje):
+    """Saldos de varias cuentas (`accounts`, o todas las de `id_cliente` según SQLite) en paralelo por partición."""
+    if enrutador is None:
+        return {"status": "ERROR", "error": "Lecturas directas desactivadas"}
+    cuentas = mensaje.get("accounts")
+    try:
+        if cuentas is None:
+            conn = conectar()
+            try:
+                cuentas = [fila[0] for fila in conn.execute(
+                    "SELECT id_cuenta FROM Cuentas WHERE id_cliente=? ORDER BY id_cuenta", (int(mensaje["id_cliente"]),))]
+            finally:
+                conn.close()
+        return enrutador.consultar_varias(cuentas)
+    except (KeyError, TypeError, ValueError) as e:
+        return {"status": "ERROR", "error": f"CONSULTAR_CUENTAS requiere accounts (lista) o id_cliente: {e}"}
+    except Exception as e:
+        return {"status": "ERROR", "error": f"BD no disponible: {e}"}
+
+
+def estadisticas():
+    with _lock_conexiones:
+        clientes = dict(conexiones_cliente)
+    stats = {"status": "OK", "pool_central": pool_central.estadisticas(), "cache": cache.estadisticas(),
+             "conexiones_cliente": clientes}
+    if enrutador is not None:
+        stats["enrutador_lecturas"] = enrutador.estadisticas()
+    return stats
 
 
 def registrar_aviso_local(id_cliente, tipo_aviso, contenido):
@@ -65,63 +142,148 @@ def registrar_mensaje_local(id_cliente_chat, mensaje, respuesta, tipo="chat"):
         print("[WARN] registrar_mensaje_local:", e)
 
 
+def paginas_transacciones(mensaje):
+    """Historial de una cuenta desde SQLite, de la transacción más reciente a la más antigua.
+
+    Paginación por clave: `cursor` es el último id_transaccion recibido (None
+    para empezar), `limite` las filas por página y `paginas` cuántas páginas
+    seguidas enviar. Genera una respuesta por página; la última lleva
+    `"fin": true` si no quedan más transacciones. Cada página es una búsqueda
+    en el índice (id_cuenta, id_transaccion), sin importar cuántas se hayan
+    leído antes.
+    """
+    try:
+        cuenta = int(mensaje["account"])
+        cursor = mensaje.get("cursor")
+        cursor = int(cursor) if cursor is not None else None
+        limite = min(max(int(mensaje.get("limite") or PAGINA_TRANSACCIONES), 1), MAX_PAGINA_TRANSACCIONES)
+        paginas = min(max(int(mensaje.get("paginas") or 1), 1), MAX_PAGINAS_POR_PETICION)
+    except (KeyError, TypeError, ValueError):
+        yield {"status": "ERROR", "error": "account, cursor, limite y paginas deben ser enteros", "fin": True}
+        return
+    try:
+        conn = conectar()
+    except Exception as e:
+        yield {"status": "ERROR", "error": f"BD no disponible: {e}", "fin": True}
+        return
+    try:
+        for _ in range(paginas):
+            filas = conn.execute(
+                "SELECT id_transaccion, tipo, monto, fecha FROM Transacciones "
+                "WHERE id_cuenta=? AND id_transaccion<? ORDER BY id_transaccion DESC LIMIT ?",
+                (cuenta, cursor if cursor is not None else 2 ** 63 - 1, limite + 1),
+            ).fetchall()
+            fin = len(filas) <= limite
+            filas = filas[:limite]
+            if filas:
+                cursor = filas[-1][0]
+            yield {"status": "OK", "account": cuenta, "cursor": cursor, "fin": fin,
+                   "data": [{"id_transaccion": i, "tipo": t, "monto": m, "fecha": f} for i, t, m, f in filas]}
+            if fin:
+                return
+    except Exception as e:
+        yield {"status": "ERROR", "error": str(e), "fin": True}
+    finally:
+        conn.close()
+
+
+def procesar_mensaje(mensaje):
+    if not isinstance(mensaje, dict):
+        return {"status": "ERROR", "error": "JSON mal formado"}
+
+    print("[DEBUG] Recibido:", mensaje)
+    tipo = (mensaje.get("type") or "").upper()
+
+    # Con "limite" el historial se pagina desde SQLite (varias líneas); sin él se consulta al central
+    if tipo == "CONSULTAR_TRANSACCIONES" and "limite" in mensaje:
+        return paginas_transacciones(mensaje)
+
+    # Tipos reenviados al ServidorCentral (Java)
+    if tipo in (
+        "CONSULTAR_CUENTA",
+        "TRANSFERIR_CUENTA",
+        "ESTADO_PAGO_PRESTAMO",
+        "CONSULTAR_TRANSACCIONES",  # 🔹 agregado
+        "ARQUEO",
+        "SUM_PARTITION",
+    ):
+        # Las lecturas por cuenta se sirven desde la cache mientras no venzan
+        clave = cache.clave(mensaje) if cache.cacheable(mensaje) else None
+        if clave:
+            cacheada, generacion = cache.obtener(clave)
+            if cacheada is not None:
+                return cacheada
+        central_resp = consultar_saldo(mensaje) if tipo == "CONSULTAR_CUENTA" else forward_to_central(mensaje)
+        if clave and central_resp.get("status") == "OK":
+            cache.guardar(clave, central_resp, generacion)
+        if tipo == "TRANSFERIR_CUENTA":
+            # También ante error: un timeout no garantiza que la transferencia no se aplicó
+            cache.invalidar_cuentas(mensaje.get("from"), mensaje.get("to"))
+        registrar_aviso_local(1, "REENVIO_CENTRAL", f"{mensaje} -> {central_resp}")
+        try:
+            if "message" in mensaje:
+                registrar_mensaje_local(
+                    mensaje.get("id_cliente_chat", 1),
+                    mensaje.get("message"),
+                    str(central_resp),
+                )
+        except Exception:
+            pass
+        return central_resp
+
+    if tipo == "CONSULTAR_CUENTAS":
+        return consultar_cuentas(mensaje)
+
+    if tipo == "CHAT_MESSAGE":
+        text = mensaje.get("message", "")
+        respuesta = {"status": "OK", "reply": "Recibido: " + text}
+        registrar_mensaje_local(mensaje.get("id_cliente_chat", 1), text, respuesta["reply"])
+        return respuesta
+
+    if tipo == "ESTADISTICAS":
+        return estadisticas()
+
+    return {"status": "ERROR", "error": f"Tipo desconocido: {tipo}"}
+
+
 def handle_connection(conn, addr):
+    """Atiende peticiones JSON (una por línea) hasta que el cliente cierra la conexión."""
     print(f"[SERVER] Nueva conexión desde {addr}")
-    with conn:
+    with _lock_conexiones:
+        conexiones_cliente["activas"] += 1
+        conexiones_cliente["totales"] += 1
+    conn.settimeout(INACTIVIDAD_CLIENTE)
+    with conn, conn.makefile('rb') as lector:
         try:
-            data = conn.recv(65536)
-            if not data:
-                return
-            raw = data.decode().strip()
-            try:
-                mensaje = json.loads(raw)
-            except Exception:
-                resp = {"status": "ERROR", "error": "JSON mal formado"}
-                conn.sendall((json.dumps(resp) + "\n").encode())
-                return
-
-            print("[DEBUG] Recibido:", mensaje)
-            tipo = (mensaje.get("type") or "").upper()
-
-            # Tipos reenviados al ServidorCentral (Java)
-            if tipo in (
-                "CONSULTAR_CUENTA",
-                "TRANSFERIR_CUENTA",
-                "ESTADO_PAGO_PRESTAMO",
-                "CONSULTAR_TRANSACCIONES",  # 🔹 agregado
-                "ARQUEO",
-                "SUM_PARTITION",
-            ):
-                central_resp = forward_to_central(mensaje)
-                registrar_aviso_local(1, "REENVIO_CENTRAL", f"{mensaje} -> {central_resp}")
+            for linea in lector:
+                raw = linea.decode().strip()
+                if not raw:
+                    continue
+                with _lock_conexiones:
+                    conexiones_cliente["peticiones"] += 1
                 try:
-                    if "message" in mensaje:
-                        registrar_mensaje_local(
-                            mensaje.get("id_cliente_chat", 1),
-                            mensaje.get("message"),
-                            str(central_resp),
-                        )
+                    mensaje = json.loads(raw)
                 except Exception:
-                    pass
-                conn.sendall((json.dumps(central_resp) + "\n").encode())
-                return
-
-            if tipo == "CHAT_MESSAGE":
-                text = mensaje.get("message", "")
-                respuesta = {"status": "OK", "reply": "Recibido: " + text}
-                registrar_mensaje_local(mensaje.get("id_cliente_chat", 1), text, respuesta["reply"])
-                conn.sendall((json.dumps(respuesta) + "\n").encode())
-                return
-
-            resp = {"status": "ERROR", "error": f"Tipo desconocido: {tipo}"}
-            conn.sendall((json.dumps(resp) + "\n").encode())
+                    mensaje = None
+                resp = procesar_mensaje(mensaje)
+                if isinstance(resp, dict):
+                    conn.sendall((json.dumps(resp) + "\n").encode())
+                else:
+                    # Respuesta en varias líneas (NDJSON): cada página sale en cuanto está lista
+                    for parte in resp:
+                        conn.sendall((json.dumps(parte) + "\n").encode())
 
+        except socket.timeout:
+            pass
         except Exception as e:
             print("[ERROR] handle_connection:", e)
             try:
                 conn.sendall((json.dumps({"status": "ERROR", "error": str(e)}) + "\n").encode())
             except:
                 pass
+        finally:
+            with _lock_conexiones:
+                conexiones_cliente["activas"] -= 1
 
 
 def start_server():
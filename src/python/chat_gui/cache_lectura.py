@@ -0,0 +1,106 @@
+"""Cache de lecturas del ChatServidor con vencimiento por tipo y desalojo LRU.
+
+Las claves son (tipo de petición, cuenta). Cada tipo tiene su propio tiempo
+máximo de vida, de modo que el saldo puede quedar desactualizado como mucho
+unos segundos mientras que el historial o los préstamos se guardan más.
+
+Las transferencias que pasan por el proxy invalidan las entradas de las
+cuentas afectadas. Para que una lectura que salió hacia el central antes de la
+invalidación no vuelva a guardar el valor viejo, cada cuenta lleva una
+generación: `obtener` la devuelve junto con el valor y `guardar` descarta la
+respuesta si la generación cambió mientras tanto.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLectura:
+    def __init__(self, ttl_por_tipo, capacidad=10000):
+        self.ttl_por_tipo = dict(ttl_por_tipo)
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # (tipo, cuenta) -> (vence, respuesta)
+        self._generaciones = {}
+        self._epoca = 0
+        self._stats = {"aciertos": 0, "fallos": 0, "vencidas": 0, "desalojadas": 0,
+                       "invalidadas": 0, "descartadas": 0}
+
+    @staticmethod
+    def clave(mensaje):
+        """(tipo, cuenta) si la petición se puede cachear con esta clave, si no None."""
+        tipo = (mensaje.get("type") or "").upper()
+        cuenta = mensaje.get("account")
+        if cuenta is None or set(mensaje) - {"type", "account"}:
+            return None
+        try:
+            return tipo, int(cuenta)
+        except (TypeError, ValueError):
+            return None
+
+    def cacheable(self, mensaje):
+        clave = self.clave(mensaje)
+        return clave is not None and self.ttl_por_tipo.get(clave[0], 0) > 0
+
+    def obtener(self, clave):
+        """Devuelve (respuesta o None, generación de la cuenta)."""
+        ahora = time.monotonic()
+        with self._lock:
+            generacion = (self._epoca, self._generaciones.get(clave[1], 0))
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                vence, respuesta = entrada
+                if vence > ahora:
+                    self._entradas.move_to_end(clave)
+                    self._stats["aciertos"] += 1
+                    return respuesta, generacion
+                del self._entradas[clave]
+                self._stats["vencidas"] += 1
+            self._stats["fallos"] += 1
+            return None, generacion
+
+    def guardar(self, clave, respuesta, generacion):
+        ttl = self.ttl_por_tipo.get(clave[0], 0)
+        if ttl <= 0:
+            return
+        with self._lock:
+            if (self._epoca, self._generaciones.get(clave[1], 0)) != generacion:
+                self._stats["descartadas"] += 1
+                return
+            self._entradas[clave] = (time.monotonic() + ttl, respuesta)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self._stats["desalojadas"] += 1
+
+    def invalidar_cuentas(self, *cuentas):
+        with self._lock:
+            for cuenta in cuentas:
+                try:
+                    cuenta = int(cuenta)
+                except (TypeError, ValueError):
+                    continue
+                self._generaciones[cuenta] = self._generaciones.get(cuenta, 0) + 1
+                for tipo in self.ttl_por_tipo:
+                    if self._entradas.pop((tipo, cuenta), None) is not None:
+                        self._stats["invalidadas"] += 1
+            # Las generaciones solo importan mientras hay lecturas en vuelo; se
+            # olvidan en bloque (cambiando de época) para que no crezcan sin límite.
+            if len(self._generaciones) > 4 * self.capacidad:
+                self._generaciones.clear()
+                self._epoca += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._generaciones.clear()
+            self._epoca += 1
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entradas"] = len(self._entradas)
+        consultas = stats["aciertos"] + stats["fallos"]
+        stats["tasa_aciertos"] = round(stats["aciertos"] / consultas, 4) if consultas else 0.0
+        stats["ttl_por_tipo"] = dict(self.ttl_por_tipo)
+        return stats
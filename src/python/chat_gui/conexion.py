@@ -1,25 +1,27 @@
 # python/cliente_gui/conexion.py
-import socket
 import json
 from . import db_sqlite   # asume paquete python/cliente_gui
 import os
+from src.python.common.cliente import PoolConexiones
 
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 6000
 
+servidor = PoolConexiones(SERVER_HOST, SERVER_PORT, max_conexiones=4)
+
 def enviar_request(payload: dict, timeout: float = 3.0) -> dict:
     """Envía payload (dict) al ServidorChat y devuelve dict de respuesta.
        Si falla la conexión, intenta dar fallback usando sqlite local."""
     try:
-        with socket.create_connection((SERVER_HOST, SERVER_PORT), timeout=timeout) as s:
-            s.sendall((json.dumps(payload) + "\n").encode("utf-8"))
-            data = s.recv(8192).decode("utf-8").strip()
-            if not data:
-                return {"status":"ERROR", "error":"SIN_RESPUESTA"}
-            try:
-                return json.loads(data)
-            except Exception:
-                return {"status":"ERROR", "error":"RESPUESTA_NO_JSON", "raw": data}
+        reintentable = payload.get("type","").upper() != "TRANSFERIR_CUENTA"
+        data = servidor.solicitar_linea((json.dumps(payload) + "\n").encode("utf-8"), timeout=timeout,
+                                        reintentable=reintentable).decode("utf-8").strip()
+        if not data:
+            return {"status":"ERROR", "error":"SIN_RESPUESTA"}
+        try:
+            return json.loads(data)
+        except Exception:
+            return {"status":"ERROR", "error":"RESPUESTA_NO_JSON", "raw": data}
     except Exception as e:
         # fallback: intenta interpretar pedido localmente
         t = payload.get("type","").upper()
@@ -1,8 +1,28 @@
-import socket
 import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Añadir el directorio raíz del proyecto al path para permitir imports absolutos desde src
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexiones
+from src.python.common.enrutador_lecturas import ERRORES_SIN_REPLICA, EnrutadorLecturas
+from src.python.common.particionado import Particionador
+from src.python.common.protocolo_binario import ClienteProtocolo
 
 HOST = '127.0.0.1'
 PORT = 6000
+CONFIG_PATH = os.path.join(ROOT_DIR, "config", "nodos_config.json")
+# Intentos por mensaje del 2PC: los nodos de Python responden el resultado previo a un reintento del mismo tx_id
+INTENTOS_2PC = 3
+ESPERA_REINTENTO = 0.2
+
+# Conexión persistente con el ServidorCentral para toda la sesión
+central = PoolConexiones(HOST, PORT, max_conexiones=2)
 
 def menu():
     print("\n--- CLIENTE BANCO ---")
@@ -10,14 +30,99 @@ def menu():
     print("2. Transferir dinero")
     print("3. Crear cuenta")
     print("4. Eliminar cuenta")
-    print("5. Salir")
+    print("5. Transferencias en lote (archivo CSV origen,destino,monto)")
+    print("6. Salir")
 
 def enviar(mensaje):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((HOST, PORT))
-        s.sendall((json.dumps(mensaje) + "\n").encode())
-        data = s.recv(4096).decode()
-        print("[Respuesta]:", data)
+    # Una transferencia que llegó al central antes de un corte no se repite
+    reintentable = mensaje.get("type") != "TRANSFERIR_CUENTA"
+    try:
+        data = central.solicitar_linea((json.dumps(mensaje) + "\n").encode(), reintentable=reintentable).decode()
+    except Exception as e:
+        data = f"ERROR de conexión: {e}"
+    print("[Respuesta]:", data.strip())
+
+def cargar_config(ruta=CONFIG_PATH):
+    with open(ruta) as f:
+        return json.load(f)
+
+_enrutador = None
+
+def consultar_cuenta(acc):
+    """Consulta el saldo directo en la réplica más rápida de la partición; si no hay ninguna, vía el central."""
+    global _enrutador
+    try:
+        if _enrutador is None:
+            _enrutador = EnrutadorLecturas(cargar_config())
+        resp = _enrutador.consultar(acc)
+    except (OSError, ValueError, KeyError):
+        resp = None
+    if resp is None or resp.get("error") in ERRORES_SIN_REPLICA:
+        enviar({"type":"CONSULTAR_CUENTA","account":acc})
+    else:
+        print("[Respuesta]:", json.dumps(resp))
+
+def transferir_lote(transferencias, config=None, timeout=10.0):
+    """Aplica varias transferencias como una sola transacción con 2PC directo contra los nodos.
+
+    `transferencias` es una lista de (origen, destino, monto). Cada partición
+    involucrada recibe en todas sus réplicas un PREPARE_BATCH con las
+    operaciones que la tocan; si todas responden READY se envía COMMIT, si no
+    ABORT. Solo los nodos de Python entienden PREPARE_BATCH: un nodo Java/Go
+    lo rechaza y el lote se aborta sin aplicar nada.
+
+    Un mensaje cuya respuesta se pierde (timeout, conexión cortada) se
+    reintenta con el mismo tx_id: el nodo recuerda el resultado de cada
+    transacción, así que un COMMIT repetido no se aplica dos veces.
+    """
+    config = config or cargar_config()
+    particionador = Particionador.desde_config(config)
+    por_particion = {}
+    for origen, destino, monto in transferencias:
+        op = {"type": "TRANSFER", "from": int(origen), "to": int(destino), "amount": float(monto)}
+        for p in {particionador.particion(origen), particionador.particion(destino)}:
+            por_particion.setdefault(p, []).append(op)
+
+    tx_id = f"lote_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+    destinos = [(nodo, ops) for p, ops in sorted(por_particion.items())
+                for nodo in config["partitions_map"][str(p)]]
+    if not destinos:
+        return {"status": "OK", "tx_id": tx_id, "operaciones": 0}
+
+    def enviar_nodo(nodo, req):
+        for intento in range(INTENTOS_2PC):
+            try:
+                with ClienteProtocolo(nodo["host"], nodo["port"], timeout=timeout) as cli:
+                    return cli.enviar(req)
+            except Exception as e:
+                error = str(e)
+                time.sleep(ESPERA_REINTENTO * (intento + 1))
+        return {"status": "ERROR", "error": error}
+
+    def fase(mensajes):
+        with ThreadPoolExecutor(max_workers=len(mensajes)) as ex:
+            return list(ex.map(lambda m: enviar_nodo(*m), mensajes))
+
+    preparados = fase([(nodo, {"type": "PREPARE_BATCH", "tx_id": tx_id, "ops": ops}) for nodo, ops in destinos])
+    fallidos = {f"{n['host']}:{n['port']}": r for (n, _), r in zip(destinos, preparados) if r.get("status") != "READY"}
+    decision = "ABORT" if fallidos else "COMMIT"
+    finales = fase([(nodo, {"type": decision, "tx_id": tx_id}) for nodo, _ in destinos])
+    if not fallidos:
+        fallidos = {f"{n['host']}:{n['port']}": r for (n, _), r in zip(destinos, finales)
+                    if r.get("status") != "COMMITTED"}
+        if fallidos:
+            return {"status": "ERROR", "tx_id": tx_id, "error": "COMMIT incompleto", "nodos": fallidos}
+        return {"status": "OK", "tx_id": tx_id, "operaciones": len(transferencias)}
+    return {"status": "ERROR", "tx_id": tx_id, "error": "PREPARE rechazado", "nodos": fallidos}
+
+def leer_lote(ruta):
+    transferencias = []
+    with open(ruta) as f:
+        for linea in f:
+            partes = linea.strip().split(",")
+            if len(partes) == 3 and partes[0].strip().isdigit():
+                transferencias.append((int(partes[0]), int(partes[1]), float(partes[2])))
+    return transferencias
 
 def main():
     while True:
@@ -25,7 +130,7 @@ def main():
         op = input("Seleccione: ")
         if op == "1":
             acc = input("Número de cuenta: ")
-            enviar({"type":"CONSULTAR_CUENTA","account":int(acc)})
+            consultar_cuenta(int(acc))
         elif op == "2":
             f = input("Cuenta origen: ")
             t = input("Cuenta destino: ")
@@ -39,6 +144,11 @@ def main():
             acc = input("Cuenta a eliminar: ")
             enviar({"type":"ELIMINAR_CUENTA","account":int(acc)})
         elif op == "5":
+            ruta = input("Archivo CSV: ")
+            transferencias = leer_lote(ruta)
+            print(f"Enviando {len(transferencias)} transferencias en una transacción...")
+            print("[Respuesta]:", transferir_lote(transferencias))
+        elif op == "6":
             break
         else:
             print("Opción inválida.")
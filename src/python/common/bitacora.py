@@ -0,0 +1,55 @@
+"""Logging con niveles y límite de frecuencia para los procesos del clúster.
+
+`configurar()` instala un handler en stderr con un `FiltroFrecuencia`: cada
+mensaje (por logger, nivel y plantilla, sin contar los argumentos) pasa como
+mucho `max_por_segundo` veces por segundo, y el siguiente que pasa informa
+cuántos se suprimieron. Con nivel "OFF" no se emite nada.
+"""
+import logging
+import threading
+import time
+
+NIVELES = ("DEBUG", "INFO", "WARNING", "ERROR", "OFF")
+
+
+class FiltroFrecuencia(logging.Filter):
+    def __init__(self, max_por_segundo=20):
+        super().__init__()
+        self.max_por_segundo = max_por_segundo
+        self._lock = threading.Lock()
+        self._ventanas = {}  # (logger, nivel, plantilla) -> [segundo, emitidos, suprimidos]
+
+    def filter(self, record):
+        if self.max_por_segundo <= 0:
+            return True
+        clave = (record.name, record.levelno, record.msg)
+        segundo = int(time.monotonic())
+        with self._lock:
+            ventana = self._ventanas.get(clave)
+            if ventana is None or ventana[0] != segundo:
+                suprimidos = ventana[2] if ventana is not None else 0
+                if len(self._ventanas) > 10000:
+                    self._ventanas.clear()
+                self._ventanas[clave] = ventana = [segundo, 0, 0]
+                if suprimidos:
+                    record.msg = f"{record.msg} ({suprimidos} mensajes similares suprimidos)"
+            if ventana[1] >= self.max_por_segundo:
+                ventana[2] += 1
+                return False
+            ventana[1] += 1
+            return True
+
+
+def configurar(nivel="INFO", max_por_segundo=20, formato="%(asctime)s %(levelname)s [%(name)s] %(message)s"):
+    """Configura el logger raíz del proceso; `nivel` es uno de NIVELES."""
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    if str(nivel).upper() == "OFF":
+        logging.disable(logging.CRITICAL)
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(formato))
+    handler.addFilter(FiltroFrecuencia(max_por_segundo))
+    raiz.addHandler(handler)
+    raiz.setLevel(getattr(logging, str(nivel).upper()))
@@ -0,0 +1,536 @@
+"""Cliente del protocolo JSON por líneas, compartido por todos los que hablan con el central, el chat y los nodos.
+
+Cada petición se envía como una línea JSON y la respuesta se lee hasta el
+salto de línea (no con un único `recv`, que puede devolver media respuesta):
+`LectorLineas` lee con `recv_into` sobre un bytearray preasignado y separa
+las líneas sin copiar más que la línea entregada.
+
+`PoolConexiones` (hilos) y `PoolConexionesAsync` (asyncio) mantienen
+conexiones persistentes hacia un servidor y limitan cuántas hay abiertas; si
+están todas en uso, el que pide espera. Antes de reutilizar una conexión
+inactiva se comprueba que el otro extremo no la haya cerrado, y una conexión
+que falla a mitad de una petición nunca se devuelve al pool.
+
+Reintentos, con espera exponencial con jitter entre uno y otro:
+* si no se pudo conectar, siempre (la petición no salió);
+* si falló una conexión reutilizada que el servidor había cerrado, o la
+  conexión se cortó después de enviar, solo con `reintentable`: una
+  transferencia que llegó al servidor antes del fallo no debe aplicarse dos
+  veces. Los timeouts no se reintentan: el servidor puede seguir con ella;
+* una respuesta BUSY (nodo saturado, no procesó la petición) se reintenta
+  tras el `retry_after` que sugiere.
+
+`solicitar_varias` envía muchas peticiones por una conexión sin esperar cada
+respuesta (pipelining). Cada una lleva un `id_peticion`; los servidores de
+Python lo devuelven y con él se ubica cada respuesta; con los que no lo
+devuelven vale el orden, en el que responden todos.
+
+`solicitar_flujo` atiende respuestas de varias líneas (p.ej. páginas NDJSON):
+entrega las líneas a medida que llegan y la conexión vuelve al pool solo si
+se leyó la respuesta completa.
+"""
+import asyncio
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+from collections import deque
+
+MAX_LINEA = 16 * 1024 * 1024
+TAMANO_BUFFER = 64 * 1024
+REINTENTOS = 2
+ESPERA_REINTENTO = 0.05
+ESPERA_REINTENTO_MAX = 2.0
+# Peticiones enviadas por delante de la última respuesta leída en `solicitar_varias`: con más, el servidor
+# podría bloquearse escribiendo respuestas que nadie lee mientras el cliente se bloquea enviando
+VENTANA_PIPELINE = 128
+CAMPO_ID = "id_peticion"
+
+_ids = itertools.count(1)
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de espera."""
+
+
+def espera_reintento(intento, base=ESPERA_REINTENTO, sugerida=None):
+    """Segundos antes del reintento número `intento` (1, 2, ...): exponencial, o la sugerida, con ±50% de jitter."""
+    espera = sugerida if sugerida else base * 2 ** (intento - 1)
+    return min(espera, ESPERA_REINTENTO_MAX) * random.uniform(0.5, 1.5)
+
+
+def _ocupado(respuesta):
+    return isinstance(respuesta, dict) and respuesta.get("status") == "BUSY"
+
+
+def _lineas_con_id(payloads):
+    """Líneas codificadas con un id_peticion nuevo cada una, y la posición de cada id."""
+    ids = [next(_ids) for _ in payloads]
+    lineas = [(json.dumps(dict(p, **{CAMPO_ID: i})) + "\n").encode() for p, i in zip(payloads, ids)]
+    return lineas, {i: n for n, i in enumerate(ids)}
+
+
+def _ubicar(respuestas, n, linea, posicion):
+    """Guarda la respuesta `n` (en orden de llegada) en la posición de su id_peticion, si lo trae."""
+    respuesta = json.loads(linea)
+    if isinstance(respuesta, dict) and CAMPO_ID in respuesta:
+        n = posicion.get(respuesta.pop(CAMPO_ID), n)
+    respuestas[n] = respuesta
+
+
+class LectorLineas:
+    """Separa líneas de un socket bloqueante leyendo con `recv_into` sobre un buffer reutilizado."""
+
+    __slots__ = ("sock", "buffer", "vista", "inicio", "fin", "buscado")
+
+    def __init__(self, sock, tamano=TAMANO_BUFFER):
+        self.sock = sock
+        self.buffer = bytearray(tamano)
+        self.vista = memoryview(self.buffer)
+        self.inicio = self.fin = 0
+        # Hasta dónde ya se buscó el salto de línea, para no recorrer dos veces una línea larga
+        self.buscado = 0
+
+    def pendiente(self):
+        """True si quedaron bytes recibidos sin entregar."""
+        return self.fin > self.inicio
+
+    def leer_linea(self, maximo=MAX_LINEA):
+        """Siguiente línea completa, con su salto de línea."""
+        while True:
+            i = self.buffer.find(b"\n", max(self.inicio, self.buscado), self.fin)
+            if i >= 0:
+                linea = bytes(self.vista[self.inicio:i + 1])
+                self.inicio = self.buscado = i + 1
+                if self.inicio == self.fin:
+                    self.inicio = self.fin = self.buscado = 0
+                return linea
+            self.buscado = self.fin
+            if self.fin - self.inicio >= maximo:
+                raise ValueError(f"línea de más de {maximo} bytes")
+            if self.fin == len(self.buffer):
+                self._hacer_lugar()
+            n = self.sock.recv_into(self.vista[self.fin:])
+            if n == 0:
+                raise ConnectionError("conexión cerrada antes de completar la respuesta")
+            self.fin += n
+
+    def _hacer_lugar(self):
+        """Mueve la línea parcial al principio del buffer, o lo duplica si ya empieza ahí."""
+        parcial = self.fin - self.inicio
+        if self.inicio > 0:
+            self.buffer[:parcial] = self.vista[self.inicio:self.fin]
+        else:
+            nuevo = bytearray(len(self.buffer) * 2)
+            nuevo[:parcial] = self.vista[:parcial]
+            self.vista.release()
+            self.buffer = nuevo
+            self.vista = memoryview(nuevo)
+        self.buscado -= self.inicio
+        self.inicio, self.fin = 0, parcial
+
+
+class _Conexion:
+    __slots__ = ("sock", "lector", "ultimo_uso", "usos")
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.lector = LectorLineas(sock)
+        self.ultimo_uso = time.monotonic()
+        self.usos = 0
+
+    def viva(self):
+        """True si el otro extremo no cerró la conexión y no quedaron bytes sin leer."""
+        if self.lector.pendiente():
+            return False
+        try:
+            self.sock.setblocking(False)
+            try:
+                datos = self.sock.recv(1, socket.MSG_PEEK)
+            finally:
+                self.sock.setblocking(True)
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            return False
+        # b'' es EOF; cualquier dato pendiente sería una respuesta huérfana
+        return False
+
+    def enviar(self, datos, timeout):
+        self.sock.settimeout(timeout)
+        self.sock.sendall(datos)
+
+    def solicitar(self, linea, timeout):
+        self.enviar(linea, timeout)
+        respuesta = self.leer_linea()
+        self.usos += 1
+        return respuesta
+
+    def leer_linea(self):
+        respuesta = self.lector.leer_linea()
+        self.ultimo_uso = time.monotonic()
+        return respuesta
+
+    def cerrar(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class PoolConexiones:
+    def __init__(self, host, port, max_conexiones=16, timeout=4.0, espera_max=2.0, max_inactividad=60.0,
+                 reintentos=REINTENTOS, espera_reintento=ESPERA_REINTENTO):
+        self.host = host
+        self.port = port
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.espera_max = espera_max
+        self.max_inactividad = max_inactividad
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self._cond = threading.Condition()
+        self._libres = deque()  # LIFO: se reutiliza la más reciente, las viejas quedan al fondo
+        self._abiertas = 0
+        self._cerrado = False
+        self._stats = {"peticiones": 0, "reutilizadas": 0, "creadas": 0, "esperas": 0, "descartadas": 0,
+                       "expiradas": 0, "errores": 0, "agotado": 0, "reintentos": 0, "ocupado": 0}
+
+    # --- préstamo y devolución ---
+
+    def _expirar_inactivas(self):
+        limite = time.monotonic() - self.max_inactividad
+        while self._libres and self._libres[0].ultimo_uso < limite:
+            self._libres.popleft().cerrar()
+            self._abiertas -= 1
+            self._stats["expiradas"] += 1
+
+    def _tomar(self):
+        """Devuelve (conexión, reutilizada). La conexión nueva se abre fuera del lock."""
+        fin = time.monotonic() + self.espera_max
+        with self._cond:
+            espero = False
+            while True:
+                if self._cerrado:
+                    raise PoolAgotado("pool cerrado")
+                self._expirar_inactivas()
+                while self._libres:
+                    con = self._libres.pop()
+                    if con.viva():
+                        self._stats["reutilizadas"] += 1
+                        return con, True
+                    con.cerrar()
+                    self._abiertas -= 1
+                    self._stats["descartadas"] += 1
+                if self._abiertas < self.max_conexiones:
+                    self._abiertas += 1
+                    break
+                restante = fin - time.monotonic()
+                if restante <= 0:
+                    self._stats["agotado"] += 1
+                    raise PoolAgotado(f"sin conexiones libres hacia {self.host}:{self.port}")
+                if not espero:
+                    espero = True
+                    self._stats["esperas"] += 1
+                self._cond.wait(restante)
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            self._liberar_cupo()
+            raise
+        with self._cond:
+            self._stats["creadas"] += 1
+        return _Conexion(sock), False
+
+    def _liberar_cupo(self):
+        with self._cond:
+            self._abiertas -= 1
+            self._cond.notify()
+
+    def _devolver(self, con):
+        with self._cond:
+            if self._cerrado:
+                con.cerrar()
+                self._abiertas -= 1
+            else:
+                self._libres.append(con)
+            self._cond.notify()
+
+    def _descartar(self, con):
+        con.cerrar()
+        self._liberar_cupo()
+
+    def _contar(self, clave):
+        with self._cond:
+            self._stats[clave] += 1
+
+    def _con_reintentos(self, operacion, reintentable):
+        """Ejecuta `operacion(con)` en una conexión del pool con la política de reintentos del módulo."""
+        intento = 0
+        while True:
+            try:
+                con, reutilizada = self._tomar()
+            except PoolAgotado:
+                raise
+            except OSError:
+                self._contar("errores")
+                if intento >= self.reintentos:
+                    raise
+                intento += 1
+                self._contar("reintentos")
+                time.sleep(espera_reintento(intento, self.espera_reintento))
+                continue
+            try:
+                resultado = operacion(con)
+            except (OSError, ValueError) as e:
+                self._descartar(con)
+                self._contar("errores")
+                if not reintentable or not isinstance(e, OSError) or isinstance(e, socket.timeout):
+                    raise
+                self._contar("reintentos")
+                # Una conexión inactiva que el servidor cerró no cuenta como intento: se prueba otra en el acto
+                if not reutilizada:
+                    if intento >= self.reintentos:
+                        raise
+                    intento += 1
+                    time.sleep(espera_reintento(intento, self.espera_reintento))
+                continue
+            self._devolver(con)
+            return resultado
+
+    # --- API ---
+
+    def solicitar_linea(self, linea, timeout=None, reintentable=False):
+        """Envía una línea (bytes terminados en \\n) y devuelve la línea de respuesta."""
+        timeout = self.timeout if timeout is None else timeout
+        self._contar("peticiones")
+        return self._con_reintentos(lambda con: con.solicitar(linea, timeout), reintentable)
+
+    def solicitar_flujo(self, linea, es_ultima, timeout=None):
+        """Envía una línea y entrega las líneas de respuesta hasta la primera que cumple `es_ultima`.
+
+        Es un generador: cada línea se entrega en cuanto llega. Si se abandona
+        antes de la última línea, la conexión se cierra en lugar de volver al
+        pool (tendría líneas pendientes). No se reintenta: las líneas ya
+        entregadas no se pueden deshacer.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._contar("peticiones")
+        con, _ = self._tomar()
+        completa = False
+        try:
+            respuesta = con.solicitar(linea, timeout)
+            while True:
+                # Se decide antes de entregarla: si quien consume abandona en la última, no queda nada pendiente
+                completa = es_ultima(respuesta)
+                yield respuesta
+                if completa:
+                    return
+                respuesta = con.leer_linea()
+        except (OSError, ValueError):
+            self._contar("errores")
+            raise
+        finally:
+            if completa:
+                self._devolver(con)
+            else:
+                self._descartar(con)
+
+    def solicitar(self, payload, timeout=None, reintentable=False):
+        """Envía un dict como JSON y devuelve la respuesta decodificada; un BUSY se reintenta tras su retry_after."""
+        linea = (json.dumps(payload) + "\n").encode()
+        intento = 0
+        while True:
+            respuesta = json.loads(self.solicitar_linea(linea, timeout, reintentable))
+            if not _ocupado(respuesta) or intento >= self.reintentos:
+                return respuesta
+            intento += 1
+            self._contar("ocupado")
+            time.sleep(espera_reintento(intento, self.espera_reintento, respuesta.get("retry_after")))
+
+    def solicitar_varias(self, payloads, timeout=None, reintentable=False):
+        """Envía los dicts por una misma conexión sin esperar cada respuesta; devuelve las respuestas en orden.
+
+        Con `reintentable`, un corte de la conexión repite todas. Las
+        respuestas BUSY se devuelven tal cual: quien llama decide qué reenviar.
+        """
+        if not payloads:
+            return []
+        timeout = self.timeout if timeout is None else timeout
+        lineas, posicion = _lineas_con_id(payloads)
+
+        def operacion(con):
+            respuestas = [None] * len(lineas)
+            enviadas = 0
+            for n in range(len(lineas)):
+                if enviadas < len(lineas) and enviadas - n < VENTANA_PIPELINE // 2:
+                    hasta = min(n + VENTANA_PIPELINE, len(lineas))
+                    con.enviar(b"".join(lineas[enviadas:hasta]), timeout)
+                    enviadas = hasta
+                _ubicar(respuestas, n, con.leer_linea(), posicion)
+            con.usos += len(lineas)
+            return respuestas
+
+        with self._cond:
+            self._stats["peticiones"] += len(payloads)
+        return self._con_reintentos(operacion, reintentable)
+
+    def estadisticas(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["abiertas"] = self._abiertas
+            stats["libres"] = len(self._libres)
+            stats["en_uso"] = self._abiertas - len(self._libres)
+        stats["tasa_reutilizacion"] = round(stats["reutilizadas"] / stats["peticiones"], 4) if stats["peticiones"] else 0.0
+        return stats
+
+    def cerrar(self):
+        with self._cond:
+            self._cerrado = True
+            while self._libres:
+                self._libres.pop().cerrar()
+                self._abiertas -= 1
+            self._cond.notify_all()
+
+
+class PoolConexionesAsync:
+    """`PoolConexiones` sobre asyncio, para el coordinador y las pruebas de carga.
+
+    Se usa desde un solo event loop. Con `max_ociosas=0` cada petición abre y
+    cierra su conexión. Un timeout o una cancelación (p.ej. un `wait_for` de
+    quien llama) cierran la conexión en uso.
+    """
+
+    def __init__(self, host, port, max_conexiones=64, timeout=4.0, timeout_conexion=1.0, max_ociosas=32,
+                 reintentos=REINTENTOS, espera_reintento=ESPERA_REINTENTO):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.timeout_conexion = timeout_conexion
+        self.max_ociosas = max_ociosas
+        self.reintentos = reintentos
+        self.espera_reintento = espera_reintento
+        self._cupo = asyncio.Semaphore(max_conexiones)
+        self._libres = []
+        self._abiertas = 0
+        self._stats = {"peticiones": 0, "reutilizadas": 0, "creadas": 0, "descartadas": 0, "errores": 0,
+                       "reintentos": 0, "ocupado": 0}
+
+    async def _tomar(self):
+        while self._libres:
+            reader, writer = self._libres.pop()
+            if reader.at_eof() or writer.is_closing():
+                self._cerrar(writer)
+                self._stats["descartadas"] += 1
+                continue
+            self._stats["reutilizadas"] += 1
+            return (reader, writer), True
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=MAX_LINEA), self.timeout_conexion)
+        self._abiertas += 1
+        self._stats["creadas"] += 1
+        return (reader, writer), False
+
+    def _devolver(self, con):
+        if len(self._libres) < self.max_ociosas:
+            self._libres.append(con)
+        else:
+            self._cerrar(con[1])
+
+    def _cerrar(self, writer):
+        self._abiertas -= 1
+        writer.close()
+
+    @staticmethod
+    async def _leer_linea(reader):
+        linea = await reader.readline()
+        if not linea.endswith(b"\n"):
+            raise ConnectionError("conexión cerrada antes de completar la respuesta")
+        return linea
+
+    async def _con_reintentos(self, operacion, reintentable):
+        intento = 0
+        while True:
+            async with self._cupo:
+                try:
+                    con, reutilizada = await self._tomar()
+                except OSError as e:
+                    # Incluye el timeout de conexión: la petición no salió
+                    self._stats["errores"] += 1
+                    if intento >= self.reintentos:
+                        raise
+                    error, reutilizada = e, False
+                else:
+                    try:
+                        resultado = await operacion(*con)
+                    except (OSError, ValueError) as e:
+                        self._cerrar(con[1])
+                        self._stats["errores"] += 1
+                        if not reintentable or not isinstance(e, OSError) or isinstance(e, asyncio.TimeoutError):
+                            raise
+                        error = e
+                    except BaseException:
+                        self._cerrar(con[1])
+                        raise
+                    else:
+                        self._devolver(con)
+                        return resultado
+            self._stats["reintentos"] += 1
+            if reutilizada:
+                continue
+            if intento >= self.reintentos:
+                raise error
+            intento += 1
+            await asyncio.sleep(espera_reintento(intento, self.espera_reintento))
+
+    async def solicitar_linea(self, linea, timeout=None, reintentable=False):
+        timeout = self.timeout if timeout is None else timeout
+        self._stats["peticiones"] += 1
+
+        async def operacion(reader, writer):
+            writer.write(linea)
+            return await asyncio.wait_for(self._leer_linea(reader), timeout)
+
+        return await self._con_reintentos(operacion, reintentable)
+
+    async def solicitar(self, payload, timeout=None, reintentable=False):
+        linea = (json.dumps(payload) + "\n").encode()
+        intento = 0
+        while True:
+            respuesta = json.loads(await self.solicitar_linea(linea, timeout, reintentable))
+            if not _ocupado(respuesta) or intento >= self.reintentos:
+                return respuesta
+            intento += 1
+            self._stats["ocupado"] += 1
+            await asyncio.sleep(espera_reintento(intento, self.espera_reintento, respuesta.get("retry_after")))
+
+    async def solicitar_varias(self, payloads, timeout=None, reintentable=False):
+        if not payloads:
+            return []
+        timeout = self.timeout if timeout is None else timeout
+        lineas, posicion = _lineas_con_id(payloads)
+        self._stats["peticiones"] += len(payloads)
+
+        async def operacion(reader, writer):
+            respuestas = [None] * len(lineas)
+            enviadas = 0
+            for n in range(len(lineas)):
+                if enviadas < len(lineas) and enviadas - n < VENTANA_PIPELINE // 2:
+                    hasta = min(n + VENTANA_PIPELINE, len(lineas))
+                    writer.write(b"".join(lineas[enviadas:hasta]))
+                    await writer.drain()
+                    enviadas = hasta
+                _ubicar(respuestas, n, await asyncio.wait_for(self._leer_linea(reader), timeout), posicion)
+            return respuestas
+
+        return await self._con_reintentos(operacion, reintentable)
+
+    def estadisticas(self):
+        return dict(self._stats, abiertas=self._abiertas, libres=len(self._libres))
+
+    def cerrar(self):
+        while self._libres:
+            self._cerrar(self._libres.pop()[1])
@@ -6,11 +6,98 @@ import os
 
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "db", "banco_chat.db"))
 
-def conectar():
-    return sqlite3.connect(DB_PATH)
+# Espera máxima (segundos) cuando otro proceso tiene la BD bloqueada para escritura
+TIMEOUT_OCUPADA = 10.0
+# Lecturas por mmap hasta este tamaño en lugar de read() a la caché de páginas de SQLite
+MMAP_BYTES = 256 * 1024 * 1024
 
-def inicializar_bd():
-    conn = conectar()
+def conectar(ruta=DB_PATH, timeout=TIMEOUT_OCUPADA):
+    """Conexión compartida por el nodo, el ChatServidor y los scripts.
+
+    WAL permite leer mientras otro proceso escribe y, con synchronous=NORMAL,
+    cada commit escribe en el WAL sin fsync (el fsync se hace en los
+    checkpoints). `timeout` es el busy timeout: con varios nodos escribiendo
+    en la misma BD se espera el lock en lugar de fallar con "database is locked".
+    """
+    conn = sqlite3.connect(ruta, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def _agregar_tx_id(conn):
+    """Columna tx_id y deduplicación de la auditoría para BD anteriores a ellas."""
+    columnas = [r[1] for r in conn.execute("PRAGMA table_info(Transacciones)")]
+    if "tx_id" not in columnas:
+        conn.execute("ALTER TABLE Transacciones ADD COLUMN tx_id TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_transacciones_tx ON Transacciones(tx_id, id_cuenta, tipo)")
+
+def _crear_indices(conn):
+    """Índices de CONSULTAR_TRANSACCIONES, CONSULTAR_PRESTAMOS y del historial del chat."""
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_transacciones_cuenta_fecha ON Transacciones(id_cuenta, fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_prestamos_cliente ON Prestamos(id_cliente)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_mensajes_fecha ON MensajesChat(fecha_envio)")
+
+def _indice_paginacion(conn):
+    """Historial por cuenta paginado por id_transaccion (cursor) en lugar de por fecha."""
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_transacciones_cuenta_id ON Transacciones(id_cuenta, id_transaccion)")
+
+def _indice_cuentas_cliente(conn):
+    """Cuentas de un cliente (CONSULTAR_CUENTAS con id_cliente en el ChatServidor)."""
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_cuentas_cliente ON Cuentas(id_cliente)")
+
+def _agregar_indice_mov(conn):
+    """Posición del movimiento dentro de su transacción, parte de la clave de deduplicación.
+
+    Sin ella, un PREPARE_BATCH que debita o acredita dos veces la misma cuenta
+    dejaba una sola fila. Las filas anteriores quedan con 0 y siguen siendo
+    únicas porque lo eran con la clave vieja.
+    """
+    columnas = [r[1] for r in conn.execute("PRAGMA table_info(Transacciones)")]
+    if "indice_mov" not in columnas:
+        conn.execute("ALTER TABLE Transacciones ADD COLUMN indice_mov INTEGER NOT NULL DEFAULT 0")
+    conn.execute("DROP INDEX IF EXISTS ux_transacciones_tx")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_transacciones_tx_mov "
+                 "ON Transacciones(tx_id, id_cuenta, tipo, indice_mov)")
+
+# Migraciones del esquema, en orden: aplicar la n-ésima deja PRAGMA user_version en n.
+# Solo se agregan al final; una migración ya publicada no se modifica.
+MIGRACIONES = (
+    _agregar_tx_id,
+    _crear_indices,
+    _indice_paginacion,
+    _indice_cuentas_cliente,
+    _agregar_indice_mov,
+)
+
+def migrar(conn):
+    """Aplica las migraciones pendientes y devuelve la versión resultante.
+
+    Cada migración corre en su propia transacción (BEGIN IMMEDIATE), así que
+    si varios procesos arrancan a la vez solo uno la aplica y los demás la
+    ven ya hecha al releer user_version.
+    """
+    nivel = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version >= len(MIGRACIONES):
+                    conn.execute("COMMIT")
+                    return version
+                MIGRACIONES[version](conn)
+                conn.execute(f"PRAGMA user_version={version + 1}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = nivel
+
+def crear_tablas(conn):
     cur = conn.cursor()
 
     cur.execute("""
@@ -56,6 +143,8 @@ def inicializar_bd():
             tipo TEXT,
             monto REAL,
             fecha TEXT,
+            tx_id TEXT,
+            indice_mov INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY(id_cuenta) REFERENCES Cuentas(id_cuenta)
         )
     """)
@@ -71,6 +160,12 @@ def inicializar_bd():
     """)
 
     conn.commit()
+
+def inicializar_bd(ruta=DB_PATH):
+    """Crea las tablas que falten y aplica las migraciones pendientes."""
+    conn = conectar(ruta)
+    crear_tablas(conn)
+    migrar(conn)
     conn.close()
 
 # Si ejecutas este archivo directamente, inicializa
@@ -0,0 +1,21 @@
+"""Conversión de montos entre unidades (como viajan en JSON y en los .txt) y centavos enteros.
+
+Los nodos Python guardan los saldos en centavos (int) para que las sumas no
+acumulen error de punto flotante.
+"""
+
+
+def a_centavos(monto):
+    """Convierte un monto en unidades (float, int o texto "123.45") a centavos."""
+    return int(round(float(monto) * 100))
+
+
+def a_unidades(centavos):
+    return centavos / 100
+
+
+def formato_centavos(centavos):
+    """Texto con dos decimales exactos, sin pasar por float."""
+    signo = "-" if centavos < 0 else ""
+    centavos = abs(centavos)
+    return f"{signo}{centavos // 100}.{centavos % 100:02d}"
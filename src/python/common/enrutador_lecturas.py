@@ -0,0 +1,309 @@
+"""Enrutador de lecturas: CONSULTAR_CUENTA directo a la réplica más rápida, con peticiones de cobertura.
+
+Cualquier réplica de una partición puede responder un saldo, así que el
+enrutador no pasa por el ServidorCentral: elige la réplica sana con menor
+latencia media (EWMA) y le envía la consulta. Si no respondió cuando ya pasó
+el percentil `percentil_cobertura` de las latencias recientes de la
+partición, envía la misma consulta a la siguiente réplica (petición de
+cobertura, "hedged request") y se queda con la primera respuesta. Una
+réplica que falla (conexión rechazada, timeout) se pasa por alto durante un
+tiempo que crece con los fallos seguidos; mientras tanto la consulta sigue en
+la siguiente réplica.
+
+Una respuesta de error del nodo (p.ej. NO_EXISTE_CUENTA o CUENTA_MIGRADA) es
+una respuesta válida y se devuelve tal cual. Es seguro usarlo desde varios
+hilos; la cobertura solo se aplica a lecturas, que se pueden repetir.
+
+`consultar_varias` agrupa las cuentas por partición y envía un
+CONSULTAR_CUENTAS por grupo (en tandas de `CUENTAS_POR_CONSULTA`), todas las
+particiones a la vez, y junta las respuestas. Una réplica que no conoce
+CONSULTAR_CUENTAS (Java/Go) se consulta cuenta por cuenta.
+
+Uso:
+    enrutador = EnrutadorLecturas.desde_archivo()
+    enrutador.consultar(1001)  # {"status": "OK", "account": 1001, "balance": ...}
+    enrutador.consultar_varias([1001, 1002, 1003])  # {"status": "OK", "saldos": {1001: ..., ...}, ...}
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.python.common.particionado import Particionador
+from src.python.common.cliente import PoolConexiones
+
+CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..", "config", "nodos_config.json"))
+TIMEOUT = 2.0
+# Peso de cada muestra nueva en la latencia media exponencial
+ALFA_EWMA = 0.2
+# La cobertura se envía cuando la primera réplica tarda más que este percentil de la partición
+PERCENTIL_COBERTURA = 95.0
+# Nunca antes de esto (segundos), para no duplicar consultas que responden en microsegundos
+COBERTURA_MINIMA = 0.002
+VENTANA_LATENCIAS = 512
+# Fracción de consultas que van a una réplica al azar para mantener al día la EWMA de las demás
+EXPLORACION = 0.02
+# Tiempo fuera de una réplica que falló: se duplica con cada fallo seguido hasta el máximo
+PENALIZACION = 0.5
+PENALIZACION_MAX = 30.0
+# Cuentas por CONSULTAR_CUENTAS (el nodo acepta hasta MAX_CUENTAS_CONSULTA)
+CUENTAS_POR_CONSULTA = 5000
+# Errores propios del enrutador (ninguna réplica respondió); cualquier otro error es la respuesta del nodo
+ERRORES_SIN_REPLICA = ("particion inalcanzable", "particion no configurada", "timeout")
+
+
+class _Replica:
+    __slots__ = ("host", "port", "pool", "ewma", "fallos", "fuera_hasta", "respuestas", "errores")
+
+    def __init__(self, host, port, max_conexiones, timeout):
+        self.host = host
+        self.port = port
+        # Sin reintentos con espera: ante un fallo el enrutador pasa a otra réplica
+        self.pool = PoolConexiones(host, port, max_conexiones=max_conexiones, timeout=timeout, reintentos=0)
+        self.ewma = None  # segundos; None hasta la primera respuesta
+        self.fallos = 0
+        self.fuera_hasta = 0.0
+        self.respuestas = 0
+        self.errores = 0
+
+    @property
+    def nombre(self):
+        return f"{self.host}:{self.port}"
+
+
+class _Particion:
+    def __init__(self, replicas):
+        self.replicas = replicas
+        self.latencias = deque(maxlen=VENTANA_LATENCIAS)
+        self.umbral = None  # segundos; se recalcula cada tanto a partir de `latencias`
+        self.muestras = 0
+
+
+class EnrutadorLecturas:
+    def __init__(self, config, timeout=TIMEOUT, cobertura=True, percentil_cobertura=PERCENTIL_COBERTURA,
+                 cobertura_minima=COBERTURA_MINIMA, alfa=ALFA_EWMA, exploracion=EXPLORACION,
+                 max_conexiones=8, hilos=32):
+        self.particionador = Particionador.desde_config(config)
+        self.timeout = timeout
+        self.cobertura = cobertura
+        self.percentil_cobertura = percentil_cobertura
+        self.cobertura_minima = cobertura_minima
+        self.alfa = alfa
+        self.exploracion = exploracion
+        self._lock = threading.Lock()
+        self._particiones = {
+            int(p): _Particion([_Replica(n["host"], int(n["port"]), max_conexiones, timeout) for n in nodos])
+            for p, nodos in config.get("partitions_map", {}).items()
+        }
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="enrutador")
+        # Aparte: sus tareas esperan a las de `_executor` y no deben ocupar sus hilos
+        self._dispersion = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="enrutador-dispersion")
+        self._stats = {"consultas": 0, "coberturas": 0, "ganadas_por_cobertura": 0, "reintentos": 0, "fallidas": 0,
+                       "consultas_varias": 0, "sin_consulta_multiple": 0}
+
+    @classmethod
+    def desde_archivo(cls, ruta=CONFIG_PATH, **opciones):
+        with open(ruta) as f:
+            return cls(json.load(f), **opciones)
+
+    # --- selección y registro ---
+
+    def _candidatas(self, particion):
+        """Réplicas en el orden en que se intentan: sanas por EWMA (sin medir primero), luego las penalizadas."""
+        ahora = time.monotonic()
+        with self._lock:
+            sanas = [r for r in particion.replicas if r.fuera_hasta <= ahora]
+            fuera = sorted((r for r in particion.replicas if r.fuera_hasta > ahora), key=lambda r: r.fuera_hasta)
+            sanas.sort(key=lambda r: -1.0 if r.ewma is None else r.ewma)
+        if len(sanas) > 1 and random.random() < self.exploracion:
+            i = random.randrange(1, len(sanas))
+            sanas[0], sanas[i] = sanas[i], sanas[0]
+        return sanas + fuera
+
+    def _umbral(self, particion):
+        with self._lock:
+            if particion.umbral is None or particion.muestras >= 64:
+                if len(particion.latencias) < 20:
+                    return None
+                ordenadas = sorted(particion.latencias)
+                particion.umbral = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * self.percentil_cobertura / 100))]
+                particion.muestras = 0
+            return max(particion.umbral, self.cobertura_minima)
+
+    def _registrar_exito(self, particion, replica, segundos):
+        with self._lock:
+            replica.ewma = segundos if replica.ewma is None else (1 - self.alfa) * replica.ewma + self.alfa * segundos
+            replica.fallos = 0
+            replica.fuera_hasta = 0.0
+            replica.respuestas += 1
+            particion.latencias.append(segundos)
+            particion.muestras += 1
+
+    def _registrar_fallo(self, replica):
+        with self._lock:
+            replica.fallos += 1
+            replica.errores += 1
+            replica.fuera_hasta = time.monotonic() + min(PENALIZACION * 2 ** (replica.fallos - 1), PENALIZACION_MAX)
+
+    def _solicitar(self, particion, replica, linea, medir):
+        """(respuesta, None) o (None, error). Corre en el pool de hilos."""
+        inicio = time.perf_counter()
+        try:
+            respuesta = json.loads(replica.pool.solicitar_linea(linea, timeout=self.timeout, reintentable=True))
+        except Exception as e:
+            self._registrar_fallo(replica)
+            return None, f"{replica.nombre}: {e}"
+        if respuesta.get("status") == "BUSY":
+            # Nodo saturado: se prueba otra réplica y a esta no se le manda nada durante retry_after
+            with self._lock:
+                replica.errores += 1
+                replica.fuera_hasta = time.monotonic() + min(respuesta.get("retry_after", PENALIZACION), PENALIZACION_MAX)
+            return None, f"{replica.nombre}: ocupada"
+        if medir:
+            self._registrar_exito(particion, replica, time.perf_counter() - inicio)
+        else:
+            with self._lock:
+                replica.fallos = 0
+                replica.fuera_hasta = 0.0
+        return respuesta, None
+
+    def _solicitar_particion(self, particion, mensaje, timeout=None, cobertura=True, medir=True):
+        """Respuesta a `mensaje` de la primera réplica de `particion` que responda.
+
+        Las consultas de varias cuentas no se cubren (duplicarían una petición
+        grande) ni se miden (su latencia no dice nada de la de un saldo).
+        """
+        if particion is None or not particion.replicas:
+            return {"status": "ERROR", "error": "particion no configurada"}
+        linea = (json.dumps(mensaje) + "\n").encode()
+        candidatas = self._candidatas(particion)
+        fin = time.monotonic() + (self.timeout if timeout is None else timeout)
+        umbral = self._umbral(particion) if self.cobertura and cobertura else None
+
+        en_vuelo = {}
+        errores = []
+        cubierta = False
+
+        def lanzar():
+            replica = candidatas[len(en_vuelo) + len(errores)]
+            en_vuelo[self._executor.submit(self._solicitar, particion, replica, linea, medir)] = replica
+
+        with self._lock:
+            self._stats["consultas"] += 1
+        lanzar()
+        primera = next(iter(en_vuelo))
+        while en_vuelo:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                break
+            quedan = len(en_vuelo) + len(errores) < len(candidatas)
+            espera = min(umbral, restante) if umbral is not None and not cubierta and quedan else restante
+            hechas, _ = wait(en_vuelo, timeout=espera, return_when=FIRST_COMPLETED)
+            if not hechas:
+                if umbral is not None and not cubierta and quedan:
+                    # La primera réplica se demora: se cubre con la siguiente sin cancelar la primera
+                    cubierta = True
+                    with self._lock:
+                        self._stats["coberturas"] += 1
+                    lanzar()
+                continue
+            for futuro in hechas:
+                en_vuelo.pop(futuro)
+                respuesta, error = futuro.result()
+                if error is None:
+                    if futuro is not primera:
+                        with self._lock:
+                            self._stats["ganadas_por_cobertura" if cubierta else "reintentos"] += 1
+                    return respuesta
+                errores.append(error)
+            if not en_vuelo and len(errores) < len(candidatas):
+                lanzar()
+        with self._lock:
+            self._stats["fallidas"] += 1
+        return {"status": "ERROR", "error": "particion inalcanzable" if errores else "timeout",
+                "detalle": errores}
+
+    # --- API ---
+
+    def consultar(self, cuenta, timeout=None):
+        """Saldo de `cuenta` según la primera réplica de su partición que responda."""
+        particion = self._particiones.get(self.particionador.particion(int(cuenta)))
+        return self._solicitar_particion(particion, {"type": "CONSULTAR_CUENTA", "account": int(cuenta)}, timeout)
+
+    def _consultar_grupo(self, p, cuentas, timeout):
+        """Respuesta de CONSULTAR_CUENTAS de la partición `p`, o la equivalente armada cuenta por cuenta."""
+        particion = self._particiones.get(p)
+        resp = self._solicitar_particion(particion, {"type": "CONSULTAR_CUENTAS", "accounts": cuentas}, timeout,
+                                         cobertura=False, medir=False)
+        if resp.get("status") == "OK" or resp.get("error") in ERRORES_SIN_REPLICA:
+            return resp
+        # La réplica elegida no conoce CONSULTAR_CUENTAS (nodos Java/Go)
+        with self._lock:
+            self._stats["sin_consulta_multiple"] += 1
+        saldos, no_existen, migradas = {}, [], {}
+        for acc in cuentas:
+            r = self._solicitar_particion(particion, {"type": "CONSULTAR_CUENTA", "account": acc}, timeout)
+            if r.get("status") == "OK":
+                saldos[str(acc)] = r["balance"]
+            elif r.get("error") == "CUENTA_MIGRADA":
+                migradas[str(acc)] = r.get("particion")
+            elif r.get("error") == "NO_EXISTE_CUENTA":
+                no_existen.append(acc)
+            else:
+                return r
+        return {"status": "OK", "saldos": saldos, "no_existen": no_existen, "migradas": migradas}
+
+    def consultar_varias(self, cuentas, timeout=None):
+        """Saldos de `cuentas` consultando todas sus particiones en paralelo.
+
+        Devuelve `saldos` y `migradas` con claves enteras, `no_existen`, y en
+        `errores` las particiones que no respondieron (entonces el status es
+        ERROR y el resto de los datos vale para las demás particiones).
+        """
+        grupos = {}
+        for acc in dict.fromkeys(int(a) for a in cuentas):
+            grupos.setdefault(self.particionador.particion(acc), []).append(acc)
+        partes = [(p, ids[i:i + CUENTAS_POR_CONSULTA])
+                  for p, ids in sorted(grupos.items()) for i in range(0, len(ids), CUENTAS_POR_CONSULTA)]
+        with self._lock:
+            self._stats["consultas_varias"] += 1
+        futuros = [(p, self._dispersion.submit(self._consultar_grupo, p, ids, timeout)) for p, ids in partes]
+        saldos, no_existen, migradas, errores = {}, [], {}, {}
+        for p, futuro in futuros:
+            resp = futuro.result()
+            if resp.get("status") != "OK":
+                errores[p] = resp.get("error")
+                continue
+            saldos.update((int(acc), saldo) for acc, saldo in resp.get("saldos", {}).items())
+            no_existen.extend(resp.get("no_existen", []))
+            migradas.update((int(acc), destino) for acc, destino in resp.get("migradas", {}).items())
+        resultado = {"status": "ERROR" if errores else "OK", "saldos": saldos, "no_existen": no_existen,
+                     "migradas": migradas}
+        if errores:
+            resultado.update(error="particiones sin respuesta", errores=errores)
+        return resultado
+
+    def estadisticas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["replicas"] = {
+                r.nombre: {"particion": p, "ewma_ms": None if r.ewma is None else round(r.ewma * 1e3, 3),
+                           "sana": r.fuera_hasta <= ahora, "respuestas": r.respuestas, "errores": r.errores}
+                for p, particion in sorted(self._particiones.items()) for r in particion.replicas
+            }
+            stats["umbral_cobertura_ms"] = {
+                p: None if particion.umbral is None else round(particion.umbral * 1e3, 3)
+                for p, particion in sorted(self._particiones.items())
+            }
+        return stats
+
+    def cerrar(self):
+        self._dispersion.shutdown(wait=False)
+        self._executor.shutdown(wait=False)
+        for particion in self._particiones.values():
+            for replica in particion.replicas:
+                replica.pool.cerrar()
@@ -0,0 +1,97 @@
+"""Histograma de latencias log-lineal al estilo HDR.
+
+Los valores (enteros, p.ej. microsegundos) menores que 2**bits se guardan
+exactos; por encima, cada potencia de dos se divide en 2**(bits-1) cubetas
+iguales, así que el error relativo de cualquier percentil es menor que
+1 / 2**(bits-1) (0.8% con bits=8) sin importar el rango. Registrar es O(1) y
+la memoria crece con el logaritmo del valor máximo, no con la cantidad de
+muestras, por lo que se pueden registrar millones de latencias y combinar
+histogramas de distintos hilos o intervalos.
+
+No es thread-safe: cada hilo o tarea usa el suyo y se combinan con `combinar`.
+"""
+import math
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class Histograma:
+    def __init__(self, bits=8):
+        self.bits = bits
+        self._completa = 1 << bits
+        self._mitad = 1 << (bits - 1)
+        self._cuentas = [0] * self._completa
+        self.total = 0
+        self.suma = 0
+        self.minimo = None
+        self.maximo = None
+
+    def _indice(self, valor):
+        if valor < self._completa:
+            return valor
+        corrimiento = valor.bit_length() - self.bits
+        return self._completa + (corrimiento - 1) * self._mitad + ((valor >> corrimiento) - self._mitad)
+
+    def _limite_superior(self, indice):
+        """Mayor valor que cae en la cubeta `indice`."""
+        if indice < self._completa:
+            return indice
+        k = indice - self._completa
+        corrimiento = k // self._mitad + 1
+        mantisa = k % self._mitad + self._mitad
+        return ((mantisa + 1) << corrimiento) - 1
+
+    def registrar(self, valor, veces=1):
+        valor = max(0, int(valor))
+        i = self._indice(valor)
+        if i >= len(self._cuentas):
+            self._cuentas.extend([0] * (i + 1 - len(self._cuentas)))
+        self._cuentas[i] += veces
+        self.total += veces
+        self.suma += valor * veces
+        if self.minimo is None or valor < self.minimo:
+            self.minimo = valor
+        if self.maximo is None or valor > self.maximo:
+            self.maximo = valor
+
+    def combinar(self, otro):
+        if otro.bits != self.bits:
+            raise ValueError("no se pueden combinar histogramas con distinta precisión")
+        if len(otro._cuentas) > len(self._cuentas):
+            self._cuentas.extend([0] * (len(otro._cuentas) - len(self._cuentas)))
+        for i, c in enumerate(otro._cuentas):
+            if c:
+                self._cuentas[i] += c
+        self.total += otro.total
+        self.suma += otro.suma
+        if otro.minimo is not None and (self.minimo is None or otro.minimo < self.minimo):
+            self.minimo = otro.minimo
+        if otro.maximo is not None and (self.maximo is None or otro.maximo > self.maximo):
+            self.maximo = otro.maximo
+        return self
+
+    def percentil(self, p):
+        if not self.total:
+            return 0
+        objetivo = max(1, math.ceil(self.total * p / 100.0))
+        acumulado = 0
+        for i, c in enumerate(self._cuentas):
+            acumulado += c
+            if acumulado >= objetivo:
+                return min(self._limite_superior(i), self.maximo)
+        return self.maximo
+
+    def media(self):
+        return self.suma / self.total if self.total else 0.0
+
+    def resumen(self, percentiles=PERCENTILES, escala=1.0):
+        """Dict con cantidad, media, mínimo, máximo y percentiles; `escala` convierte unidades (p.ej. 1e-3 µs→ms)."""
+        datos = {
+            "cantidad": self.total,
+            "media": round(self.media() * escala, 3),
+            "min": round((self.minimo or 0) * escala, 3),
+            "max": round((self.maximo or 0) * escala, 3),
+        }
+        for p in percentiles:
+            datos[f"p{p:g}".replace(".", "")] = round(self.percentil(p) * escala, 3)
+        return datos
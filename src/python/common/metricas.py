@@ -0,0 +1,174 @@
+"""Métricas en el formato de texto de Prometheus, sin dependencias externas.
+
+`RegistroMetricas` crea contadores, medidores e histogramas con etiquetas y
+los expone juntos con `exponer()`; `servir_http` los publica en `/metrics`.
+Registrar un valor toma un lock propio de la métrica por un instante, así que
+se puede llamar desde cualquier hilo en el camino caliente.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Límites de las cubetas de latencia, en segundos (de 50 µs a 10 s)
+LIMITES_SEGUNDOS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _formatear(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+def _etiquetas(nombres, valores, extra=""):
+    partes = [f'{n}="{str(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def _clave(self, etiquetas):
+        return tuple(etiquetas.get(n, "") for n in self.etiquetas)
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            valores = list(self._valores.items())
+        for clave, valor in sorted(valores):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_formatear(valor)}")
+        return lineas
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+
+class Medidor(_Metrica):
+    """Valor instantáneo; con `funcion` se calcula al exponer en lugar de mantenerse."""
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), funcion=None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def set(self, valor, **etiquetas):
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+    def exponer(self):
+        if self.funcion is not None:
+            with self._lock:
+                self._valores[()] = self.funcion()
+        return super().exponer()
+
+
+class HistogramaTiempos(_Metrica):
+    """Histograma acumulativo de duraciones en segundos (`_bucket`, `_sum`, `_count`)."""
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+
+    def observar(self, segundos, **etiquetas):
+        clave = self._clave(etiquetas)
+        # Búsqueda lineal: con ~17 límites es más rápida que bisect para los valores pequeños habituales
+        i = 0
+        for limite in self.limites:
+            if segundos <= limite:
+                break
+            i += 1
+        with self._lock:
+            datos = self._valores.get(clave)
+            if datos is None:
+                datos = self._valores[clave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            datos[0][i] += 1
+            datos[1] += segundos
+            datos[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            valores = [(clave, (list(c), s, n)) for clave, (c, s, n) in self._valores.items()]
+        for clave, (cubetas, suma, cantidad) in sorted(valores):
+            acumulado = 0
+            for limite, c in zip(self.limites + (float("inf"),), cubetas):
+                acumulado += c
+                le = _etiquetas(self.etiquetas, clave, f'le="{_formatear(float(limite))}"')
+                lineas.append(f"{self.nombre}_bucket{le} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_formatear(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {cantidad}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas = []
+
+    def _agregar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._agregar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre, ayuda, etiquetas=(), funcion=None):
+        return self._agregar(Medidor(nombre, ayuda, etiquetas, funcion))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        return self._agregar(HistogramaTiempos(nombre, ayuda, etiquetas, limites))
+
+    def exponer(self):
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+def servir_http(registro, puerto, host="127.0.0.1"):
+    """Publica `registro` en http://host:puerto/metrics desde un hilo daemon y devuelve el servidor."""
+    class MetricasHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            cuerpo = registro.exponer().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, puerto), MetricasHandler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
@@ -0,0 +1,56 @@
+"""Asignación de cuentas a particiones: módulo o hashing consistente con nodos virtuales.
+
+`config/nodos_config.json` elige el esquema con `"partitioner"`:
+
+* `"modulo"` (por defecto): `cuenta % partitions`, el esquema original.
+* `"hash"`: un anillo de hashing consistente con `"vnodes"` puntos por
+  partición. Agregar una partición solo mueve las cuentas que caen en los
+  tramos del anillo que toma la nueva (~1/N del total), en lugar de casi
+  todas como con el módulo.
+
+La posición en el anillo son los primeros 4 bytes (big-endian) del MD5 de
+`"p<partición>-v<i>"` para los puntos y de `"<cuenta>"` para las cuentas; el
+ServidorCentral de Java calcula exactamente lo mismo.
+"""
+import bisect
+import hashlib
+
+PARTICIONADORES = ("modulo", "hash")
+VNODES = 64
+
+
+def _posicion(texto):
+    return int.from_bytes(hashlib.md5(texto.encode()).digest()[:4], "big")
+
+
+class Particionador:
+    def __init__(self, particiones, tipo="modulo", vnodes=VNODES):
+        if tipo not in PARTICIONADORES:
+            raise ValueError(f"particionador desconocido: {tipo}")
+        self.particiones = int(particiones)
+        self.tipo = tipo
+        self.vnodes = int(vnodes)
+        if tipo == "hash":
+            puntos = sorted((_posicion(f"p{p}-v{v}"), p) for p in range(self.particiones) for v in range(self.vnodes))
+            self._posiciones = [pos for pos, _ in puntos]
+            self._duenos = [p for _, p in puntos]
+
+    @classmethod
+    def desde_config(cls, config):
+        return cls(config["partitions"], config.get("partitioner", "modulo"), config.get("vnodes", VNODES))
+
+    def descripcion(self):
+        """Parámetros del esquema, en el formato de los campos del config."""
+        return {"partitions": self.particiones, "partitioner": self.tipo, "vnodes": self.vnodes}
+
+    def particion(self, cuenta):
+        cuenta = int(cuenta)
+        if self.tipo == "modulo":
+            return cuenta % self.particiones
+        i = bisect.bisect_left(self._posiciones, _posicion(str(cuenta)))
+        return self._duenos[i % len(self._duenos)]
+
+
+def particion_de(config, cuenta):
+    """Partición de `cuenta` según el esquema del config (para llamadas sueltas; en bucles, crear un Particionador)."""
+    return Particionador.desde_config(config).particion(cuenta)
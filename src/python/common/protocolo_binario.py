@@ -0,0 +1,222 @@
+"""Protocolo binario con prefijo de longitud entre coordinador, clientes y nodos.
+
+Convive con el protocolo de JSON por líneas. Una conexión arranca siempre en
+JSON; el cliente que quiera binario envía
+
+    {"type": "HELLO", "proto": ["bin1", "json"]}
+
+y si el servidor responde {"status": "OK", "proto": "bin1"} ambos pasan a
+intercambiar frames. Un servidor que no conoce HELLO responde un error en
+JSON y el cliente sigue en JSON, así que los nodos Java/Go y el
+ServidorCentral no necesitan cambios.
+
+Frame: longitud del payload (uint32, big endian) + payload.
+
+Petición:  op u8 | flags u8 | len(tx_id) u16 | a i64 | b i64 | monto i64 | tx_id
+Respuesta: status u8 | tipo u8 | len(tx_id) u16 | len(error) u16 | a i64 | b i64 | tx_id | error
+
+Los montos viajan en centavos enteros. Las peticiones o respuestas que no
+encajan en la estructura fija (estadísticas, lotes, campos extra) viajan con
+op/status 0xFF y el JSON original como cuerpo, de modo que cualquier mensaje
+del protocolo JSON se puede enviar por una conexión binaria.
+"""
+import asyncio
+import json
+import socket
+import struct
+
+from src.python.common.dinero import a_centavos
+
+PROTO_BINARIO = "bin1"
+HELLO = {"type": "HELLO", "proto": [PROTO_BINARIO, "json"]}
+
+MAX_FRAME = 16 * 1024 * 1024
+
+_LONGITUD = struct.Struct('!I')
+_PETICION = struct.Struct('!BBHqqq')
+_RESPUESTA = struct.Struct('!BBHHqq')
+
+OP_JSON = 0xFF
+OPS = {
+    "PREPARE_TRANSFER": 1,
+    "PREPARE_CREATE": 2,
+    "PREPARE_DELETE": 3,
+    "COMMIT": 4,
+    "ABORT": 5,
+    "CONSULTAR_CUENTA": 6,
+    "SUM_PARTITION": 7,
+}
+_NOMBRES_OP = {v: k for k, v in OPS.items()}
+# Campos que cada op puede llevar en la estructura fija; cualquier otro obliga a usar JSON
+_CAMPOS_OP = {
+    1: {"type", "tx_id", "from", "to", "amount"},
+    2: {"type", "tx_id", "account", "initial"},
+    3: {"type", "tx_id", "account"},
+    4: {"type", "tx_id"},
+    5: {"type", "tx_id"},
+    6: {"type", "account"},
+    7: {"type"},
+}
+
+ESTADO_JSON = 0xFF
+ESTADOS = {"OK": 0, "READY": 1, "COMMITTED": 2, "ABORTED": 3, "ERROR": 4}
+_NOMBRES_ESTADO = {v: k for k, v in ESTADOS.items()}
+_TIPO_VACIO, _TIPO_SALDO, _TIPO_SUMA = 0, 1, 2
+
+
+def _frame(payload):
+    return _LONGITUD.pack(len(payload)) + payload
+
+
+def codificar_peticion(req):
+    """Codifica un dict del protocolo JSON como frame binario."""
+    op = OPS.get(str(req.get("type", "")).upper())
+    if op is None or not set(req) <= _CAMPOS_OP[op]:
+        return _frame(_PETICION.pack(OP_JSON, 0, 0, 0, 0, 0) + json.dumps(req, separators=(',', ':')).encode())
+    tx = (req.get("tx_id") or "").encode()
+    a = b = monto = 0
+    if op == 1:
+        a, b, monto = int(req["from"]), int(req["to"]), a_centavos(req["amount"])
+    elif op == 2:
+        a, monto = int(req["account"]), a_centavos(req["initial"])
+    elif op in (3, 6):
+        a = int(req["account"])
+    return _frame(_PETICION.pack(op, 0, len(tx), a, b, monto) + tx)
+
+
+def decodificar_peticion(payload):
+    """Inverso de `codificar_peticion`: devuelve el dict equivalente del protocolo JSON."""
+    if len(payload) < _PETICION.size:
+        raise ValueError("frame de petición demasiado corto")
+    op, _, tx_len, a, b, monto = _PETICION.unpack_from(payload)
+    if op == OP_JSON:
+        return json.loads(payload[_PETICION.size:])
+    tipo = _NOMBRES_OP.get(op)
+    if tipo is None:
+        raise ValueError(f"op binaria desconocida: {op}")
+    req = {"type": tipo}
+    if tx_len:
+        req["tx_id"] = payload[_PETICION.size:_PETICION.size + tx_len].decode()
+    if op == 1:
+        req.update({"from": a, "to": b, "amount": monto / 100})
+    elif op == 2:
+        req.update({"account": a, "initial": monto / 100})
+    elif op in (3, 6):
+        req["account"] = a
+    return req
+
+
+def codificar_respuesta(resp):
+    """Codifica una respuesta (dict) como frame binario."""
+    claves = set(resp)
+    estado = ESTADOS.get(resp.get("status"))
+    tipo = _TIPO_VACIO
+    a = b = 0
+    if estado is not None and claves <= {"status", "tx_id", "error"}:
+        pass
+    elif estado is not None and claves == {"status", "account", "balance"}:
+        tipo, a, b = _TIPO_SALDO, int(resp["account"]), a_centavos(resp["balance"])
+    elif estado is not None and claves == {"status", "sum"}:
+        tipo, b = _TIPO_SUMA, a_centavos(resp["sum"])
+    else:
+        cuerpo = json.dumps(resp, separators=(',', ':')).encode()
+        return _frame(_RESPUESTA.pack(ESTADO_JSON, 0, 0, 0, 0, 0) + cuerpo)
+    tx = str(resp["tx_id"]).encode() if resp.get("tx_id") is not None else b""
+    error = str(resp["error"]).encode() if "error" in resp else b""
+    return _frame(_RESPUESTA.pack(estado, tipo, len(tx), len(error), a, b) + tx + error)
+
+
+def decodificar_respuesta(payload):
+    if len(payload) < _RESPUESTA.size:
+        raise ValueError("frame de respuesta demasiado corto")
+    estado, tipo, tx_len, err_len, a, b = _RESPUESTA.unpack_from(payload)
+    if estado == ESTADO_JSON:
+        return json.loads(payload[_RESPUESTA.size:])
+    resp = {"status": _NOMBRES_ESTADO.get(estado, "ERROR")}
+    pos = _RESPUESTA.size
+    if tx_len:
+        resp["tx_id"] = payload[pos:pos + tx_len].decode()
+        pos += tx_len
+    if err_len:
+        resp["error"] = payload[pos:pos + err_len].decode()
+    if tipo == _TIPO_SALDO:
+        resp.update({"account": a, "balance": b / 100})
+    elif tipo == _TIPO_SUMA:
+        resp["sum"] = b / 100
+    return resp
+
+
+def leer_frame(lector):
+    """Lee un payload de un archivo binario (socket.makefile('rb')). None si se cerró la conexión."""
+    cabecera = lector.read(_LONGITUD.size)
+    if len(cabecera) < _LONGITUD.size:
+        return None
+    (n,) = _LONGITUD.unpack(cabecera)
+    if n > MAX_FRAME:
+        raise ValueError(f"frame de {n} bytes excede el máximo")
+    payload = lector.read(n)
+    if len(payload) < n:
+        return None
+    return payload
+
+
+async def leer_frame_async(reader):
+    """Versión asyncio de `leer_frame` sobre un StreamReader."""
+    try:
+        cabecera = await reader.readexactly(_LONGITUD.size)
+        (n,) = _LONGITUD.unpack(cabecera)
+        if n > MAX_FRAME:
+            raise ValueError(f"frame de {n} bytes excede el máximo")
+        return await reader.readexactly(n)
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class ClienteProtocolo:
+    """Cliente con conexión persistente que negocia binario y cae a JSON si el servidor no lo soporta."""
+
+    def __init__(self, host, port, binario=True, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.lector = self.sock.makefile('rb')
+        self.binario = False
+        if binario:
+            self.binario = self._enviar_json([HELLO])[0].get("proto") == PROTO_BINARIO
+
+    def _enviar_json(self, reqs):
+        self.sock.sendall(b''.join((json.dumps(r) + "\n").encode() for r in reqs))
+        respuestas = []
+        for _ in reqs:
+            linea = self.lector.readline()
+            if not linea:
+                raise ConnectionError("conexión cerrada por el servidor")
+            respuestas.append(json.loads(linea))
+        return respuestas
+
+    def enviar_varios(self, reqs):
+        """Envía varias peticiones en pipeline y devuelve las respuestas en el mismo orden."""
+        if not self.binario:
+            return self._enviar_json(reqs)
+        self.sock.sendall(b''.join(codificar_peticion(r) for r in reqs))
+        respuestas = []
+        for _ in reqs:
+            payload = leer_frame(self.lector)
+            if payload is None:
+                raise ConnectionError("conexión cerrada por el servidor")
+            respuestas.append(decodificar_respuesta(payload))
+        return respuestas
+
+    def enviar(self, req):
+        return self.enviar_varios([req])[0]
+
+    def cerrar(self):
+        try:
+            self.lector.close()
+        finally:
+            self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,160 @@
+"""Formatos de snapshot de una partición: texto (`id,saldo` por línea) y binario.
+
+Binario (little endian, columnar):
+
+    cabecera (32 bytes): magic "BNKS" | versión u16 | reservado u16 | cuentas u64 | seq u64 | crc32 u32 | relleno
+    ids:    int64[cuentas]  (ordenados de menor a mayor)
+    saldos: int64[cuentas]  (centavos)
+
+El crc32 cubre ids y saldos. Como cada columna es un arreglo de enteros de
+ancho fijo, cargar el archivo es copiar memoria (`array.frombytes`) o, con
+`mapear`, leerlo directamente del mmap sin copiar nada.
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from src.python.common.dinero import a_centavos, formato_centavos
+
+MAGIC = b"BNKS"
+VERSION = 1
+_CABECERA = struct.Struct('<4sHHQQI4x')
+
+
+def es_binario(ruta):
+    try:
+        with open(ruta, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _escribir_atomico(ruta, escribir):
+    tmp = ruta + '.tmp'
+    with open(tmp, 'wb') as f:
+        escribir(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, ruta)
+
+
+def _arreglos(pares):
+    pares = list(pares)
+    if any(pares[i][0] >= pares[i + 1][0] for i in range(len(pares) - 1)):
+        pares = sorted(dict(pares).items())
+    return array('q', (acc for acc, _ in pares)), array('q', (saldo for _, saldo in pares))
+
+
+def _a_little_endian(arr):
+    if sys.byteorder != 'little':
+        arr = array('q', arr)
+        arr.byteswap()
+    return arr
+
+
+def escribir_binario(ruta, pares=None, seq=0, ids=None, saldos=None):
+    """Escribe un snapshot binario a partir de pares (cuenta, centavos) o de dos arreglos ya ordenados."""
+    if ids is None:
+        ids, saldos = _arreglos(pares)
+    ids, saldos = _a_little_endian(ids), _a_little_endian(saldos)
+    crc = zlib.crc32(saldos, zlib.crc32(ids))
+
+    def escribir(f):
+        f.write(_CABECERA.pack(MAGIC, VERSION, 0, len(ids), seq, crc))
+        ids.tofile(f)
+        saldos.tofile(f)
+
+    _escribir_atomico(ruta, escribir)
+
+
+def _leer_cabecera(buf, ruta):
+    magic, version, _, n, seq, crc = _CABECERA.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError(f"{ruta}: no es un snapshot binario")
+    if version != VERSION:
+        raise ValueError(f"{ruta}: versión de snapshot {version} no soportada")
+    if len(buf) < _CABECERA.size + 16 * n:
+        raise ValueError(f"{ruta}: archivo truncado")
+    return n, seq, crc
+
+
+def leer_binario(ruta, verificar=True):
+    """Carga un snapshot binario. Devuelve (ids, saldos, seq) como `array('q')`."""
+    with open(ruta, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        n, seq, crc = _leer_cabecera(mm, ruta)
+        inicio = _CABECERA.size
+        ids, saldos = array('q'), array('q')
+        ids.frombytes(mm[inicio:inicio + 8 * n])
+        saldos.frombytes(mm[inicio + 8 * n:inicio + 16 * n])
+    if verificar and zlib.crc32(saldos, zlib.crc32(ids)) != crc:
+        raise ValueError(f"{ruta}: checksum inválido")
+    if sys.byteorder != 'little':
+        ids.byteswap()
+        saldos.byteswap()
+    return ids, saldos, seq
+
+
+def mapear(ruta):
+    """Abre el snapshot sin copiarlo: devuelve (mmap, ids, saldos, seq) con memoryviews de solo lectura.
+
+    El llamador debe liberar las memoryviews y cerrar el mmap al terminar.
+    Solo en máquinas little endian, que es el orden del archivo.
+    """
+    with open(ruta, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    n, seq, _ = _leer_cabecera(mm, ruta)
+    vista = memoryview(mm)[_CABECERA.size:_CABECERA.size + 16 * n].cast('q')
+    return mm, vista[:n], vista[n:], seq
+
+
+def leer_texto(ruta, al_invalida=None):
+    """Carga un snapshot de texto. Devuelve (pares (cuenta, centavos), seq).
+
+    `al_invalida(linea, error)` se llama por cada línea que no se puede interpretar.
+    """
+    pares = []
+    seq = 0
+    with open(ruta, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                # Cabecera escrita por el checkpoint del nodo: "#seq=<n>"
+                if line.startswith('#seq='):
+                    seq = int(line[5:])
+                continue
+            try:
+                parts = line.split(',')
+                pares.append((int(parts[0]), a_centavos(parts[1])))
+            except (ValueError, IndexError) as e:
+                if al_invalida:
+                    al_invalida(line, e)
+    return pares, seq
+
+
+def escribir_texto(ruta, pares, seq=None):
+    def escribir(f):
+        if seq is not None:
+            f.write(f"#seq={seq}\n".encode())
+        lote = []
+        for acc, saldo in pares:
+            lote.append(f"{acc},{formato_centavos(saldo)}\n")
+            if len(lote) >= 65536:
+                f.write("".join(lote).encode())
+                lote = []
+        f.write("".join(lote).encode())
+
+    _escribir_atomico(ruta, escribir)
+
+
+def leer(ruta):
+    """Carga un snapshot en cualquiera de los dos formatos. Devuelve (ids, saldos, seq)."""
+    if es_binario(ruta):
+        return leer_binario(ruta)
+    pares, seq = leer_texto(ruta)
+    ids, saldos = _arreglos(pares)
+    return ids, saldos, seq
@@ -0,0 +1,295 @@
+"""Coordinador de Python: reemplazo del ServidorCentral para pruebas y benchmarks locales.
+
+Habla el mismo protocolo de clientes que el ServidorCentral de Java (una
+petición JSON por línea en el puerto 6000): CONSULTAR_CUENTA,
+TRANSFERIR_CUENTA, CREAR_CUENTA, ELIMINAR_CUENTA, ARQUEO y RECARGAR_CONFIG.
+Enruta con `config/nodos_config.json` y el mismo particionador
+(`src/python/common/particionado.py`), así que `load_tester.py`,
+`arqueo.py`, `test_suite.py`, `BancoCliente.py` y el ChatServidor funcionan
+sin el stack de Java.
+
+Cada fase del 2PC se envía a todas las réplicas involucradas a la vez
+(`asyncio.gather`), con un timeout por nodo; un nodo que no responde a tiempo
+cuenta como fallido en esa fase. Las conexiones a los nodos se reutilizan.
+La latencia de cada fase (PREPARE, COMMIT, ABORT) y de cada tipo de
+petición se acumula en histogramas que devuelve `{"type": "ESTADISTICAS"}`
+y que se imprimen cada `--reporte` segundos.
+
+Uso:
+    python3 src/python/coordinador/coordinador.py 6000 config/nodos_config.json --reporte 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import CAMPO_ID, PoolConexionesAsync
+from src.python.common.histograma import Histograma
+from src.python.common.particionado import Particionador
+
+CONFIG_PATH = os.path.join(ROOT_DIR, "config", "nodos_config.json")
+TIMEOUT_CONEXION = 1.0
+TIMEOUT_NODO = 5.0
+# Conexiones ociosas que se conservan por nodo, y abiertas a la vez
+MAX_OCIOSAS = 32
+MAX_CONEXIONES_NODO = 256
+# Reintentos del COMMIT en un nodo que no confirmó (el nodo responde el resultado previo a un reintento)
+INTENTOS_COMMIT = 3
+TIPOS_2PC = {"TRANSFERIR_CUENTA", "CREAR_CUENTA", "ELIMINAR_CUENTA"}
+
+
+def cargar_config(ruta=CONFIG_PATH):
+    with open(ruta) as f:
+        return json.load(f)
+
+
+class Topologia:
+    """Particiones, sus réplicas y el particionador; se reemplaza entera con RECARGAR_CONFIG."""
+
+    def __init__(self, config):
+        self.particionador = Particionador.desde_config(config)
+        self.particiones = self.particionador.particiones
+        self.nodos = {int(p): [(n["host"], int(n["port"])) for n in nodos]
+                      for p, nodos in config.get("partitions_map", {}).items()}
+
+    def replicas(self, cuenta):
+        return self.nodos.get(self.particionador.particion(int(cuenta)), [])
+
+
+class ConexionesNodos:
+    """Un `PoolConexionesAsync` por nodo; los errores se devuelven como respuestas ERROR."""
+
+    def __init__(self, timeout=TIMEOUT_NODO, timeout_conexion=TIMEOUT_CONEXION):
+        self.timeout = timeout
+        self.timeout_conexion = timeout_conexion
+        self._pools = {}  # (host, port) -> PoolConexionesAsync
+
+    async def enviar(self, nodo, mensaje):
+        """Respuesta del nodo a `mensaje`, o un ERROR si no se pudo conectar o no respondió a tiempo."""
+        pool = self._pools.get(nodo)
+        if pool is None:
+            # Sin reintentos con espera: un nodo caído cuenta como fallido en la fase y el 2PC decide.
+            # Una conexión ociosa que el nodo cerró (p.ej. al reiniciarse) sí se reintenta en una nueva.
+            pool = self._pools[nodo] = PoolConexionesAsync(
+                *nodo, max_conexiones=MAX_CONEXIONES_NODO, timeout=self.timeout,
+                timeout_conexion=self.timeout_conexion, max_ociosas=MAX_OCIOSAS, reintentos=0)
+        try:
+            return await pool.solicitar(mensaje, reintentable=True)
+        except asyncio.TimeoutError:
+            return {"status": "ERROR", "error": "timeout"}
+        except (OSError, ValueError) as e:
+            return {"status": "ERROR", "error": f"nodo inalcanzable: {e}"}
+
+    def cerrar(self):
+        for pool in self._pools.values():
+            pool.cerrar()
+        self._pools.clear()
+
+
+class Coordinador:
+    def __init__(self, port, config_path=CONFIG_PATH, host="127.0.0.1", timeout_nodo=TIMEOUT_NODO):
+        self.port = port
+        self.host = host
+        self.config_path = config_path
+        self.topologia = Topologia(cargar_config(config_path))
+        self.nodos = ConexionesNodos(timeout_nodo)
+        # Latencias en microsegundos por fase del 2PC y por tipo de petición; todo corre en el mismo loop
+        self.fases = {}
+        self.peticiones = {}
+        self.resultados = {}
+
+    def _registrar(self, histogramas, clave, inicio):
+        histogramas.setdefault(clave, Histograma()).registrar((time.perf_counter() - inicio) * 1e6)
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._atender, self.host, self.port, backlog=1024)
+        print(f"[Coordinador] Escuchando en puerto {self.port} ({self.topologia.particiones} particiones, "
+              f"{self.topologia.particionador.tipo})")
+        async with server:
+            await server.serve_forever()
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                if not linea.strip():
+                    continue
+                try:
+                    req = json.loads(linea)
+                    if not isinstance(req, dict):
+                        raise ValueError("se esperaba un objeto")
+                except ValueError:
+                    resp = {"status": "ERROR", "error": "JSON mal formado"}
+                else:
+                    resp = await self.procesar(req)
+                    if CAMPO_ID in req:
+                        resp = dict(resp, **{CAMPO_ID: req[CAMPO_ID]})
+                writer.write((json.dumps(resp) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def procesar(self, req):
+        tipo = str(req.get("type", "")).upper()
+        inicio = time.perf_counter()
+        try:
+            if tipo == "CONSULTAR_CUENTA":
+                resp = await self._consultar(req)
+            elif tipo in TIPOS_2PC:
+                resp = await self._transaccion(tipo, req)
+            elif tipo == "ARQUEO":
+                resp = await self._arqueo()
+            elif tipo == "RECARGAR_CONFIG":
+                return self._recargar_config()
+            elif tipo == "ESTADISTICAS":
+                return self.estadisticas()
+            else:
+                return {"status": "ERROR", "error": "Tipo desconocido"}
+        except (KeyError, ValueError, TypeError) as e:
+            resp = {"status": "ERROR", "error": f"Petición {tipo} inválida: {e}"}
+        self._registrar(self.peticiones, tipo, inicio)
+        clave = (tipo, resp.get("status"))
+        self.resultados[clave] = self.resultados.get(clave, 0) + 1
+        return resp
+
+    async def _consultar(self, req):
+        """La primera réplica que responda, en el orden de la configuración (como el ServidorCentral)."""
+        particion = self.topologia.particionador.particion(int(req["account"]))
+        inicio = time.perf_counter()
+        resp = await self._consultar_particion(particion, dict(req, type="CONSULTAR_CUENTA"))
+        self._registrar(self.fases, "lectura", inicio)
+        return resp
+
+    def _preparar_mensaje(self, tipo, req, tx_id):
+        """(mensaje PREPARE, réplicas participantes) para una petición de escritura del cliente."""
+        t = self.topologia
+        if tipo == "TRANSFERIR_CUENTA":
+            origen, destino = int(req["from"]), int(req["to"])
+            mensaje = {"type": "PREPARE_TRANSFER", "tx_id": tx_id, "from": origen, "to": destino,
+                       "amount": float(req["amount"])}
+            participantes = list(dict.fromkeys(t.replicas(origen) + t.replicas(destino)))
+        elif tipo == "CREAR_CUENTA":
+            cuenta = int(req["account"])
+            mensaje = {"type": "PREPARE_CREATE", "tx_id": tx_id, "account": cuenta, "initial": float(req["initial"])}
+            participantes = t.replicas(cuenta)
+        else:
+            cuenta = int(req["account"])
+            mensaje = {"type": "PREPARE_DELETE", "tx_id": tx_id, "account": cuenta}
+            participantes = t.replicas(cuenta)
+        return mensaje, participantes
+
+    async def _fase(self, fase, participantes, mensaje):
+        """Envía `mensaje` a todos los participantes a la vez y devuelve sus respuestas en orden."""
+        inicio = time.perf_counter()
+        respuestas = await asyncio.gather(*(self.nodos.enviar(n, mensaje) for n in participantes))
+        self._registrar(self.fases, fase, inicio)
+        return respuestas
+
+    async def _transaccion(self, tipo, req):
+        # El tx_id debe ser único: los nodos responden el resultado previo a un tx_id repetido
+        tx_id = f"tx_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+        prepare, participantes = self._preparar_mensaje(tipo, req, tx_id)
+        if not participantes:
+            return {"status": "ERROR", "tx_id": tx_id, "error": "particion no configurada"}
+
+        preparados = await self._fase("prepare", participantes, prepare)
+        rechazos = {f"{h}:{p}": r.get("error", r.get("status")) for (h, p), r in zip(participantes, preparados)
+                    if r.get("status") != "READY"}
+        if rechazos:
+            # También a los que no respondieron: su PREPARE pudo aplicarse después del timeout
+            await self._fase("abort", participantes, {"type": "ABORT", "tx_id": tx_id})
+            return {"status": "ERROR", "tx_id": tx_id, "error": "PREPARE rechazado", "nodos": rechazos}
+
+        pendientes = participantes
+        commit = {"type": "COMMIT", "tx_id": tx_id}
+        for _ in range(INTENTOS_COMMIT):
+            respuestas = await self._fase("commit", pendientes, commit)
+            pendientes = [n for n, r in zip(pendientes, respuestas) if r.get("status") != "COMMITTED"]
+            if not pendientes:
+                return {"status": "OK", "tx_id": tx_id}
+        # La decisión ya es COMMIT: un ABORT no deshace lo confirmado en las demás réplicas
+        print(f"[WARN] TX {tx_id} sin confirmar en {', '.join(f'{h}:{p}' for h, p in pendientes)}")
+        return {"status": "ERROR", "tx_id": tx_id, "error": "COMMIT incompleto",
+                "nodos": [f"{h}:{p}" for h, p in pendientes]}
+
+    async def _arqueo(self):
+        """Suma de todas las particiones, consultadas en paralelo."""
+        particiones = range(self.topologia.particiones)
+        inicio = time.perf_counter()
+        respuestas = await asyncio.gather(*(self._consultar_particion(p, {"type": "SUM_PARTITION"})
+                                            for p in particiones))
+        self._registrar(self.fases, "suma_particiones", inicio)
+        if any(r.get("status") != "OK" for r in respuestas):
+            return {"status": "ERROR", "error": "Fallo el arqueo en alguna particion"}
+        return {"status": "OK", "total_balance": round(sum(float(r["sum"]) for r in respuestas), 2)}
+
+    async def _consultar_particion(self, particion, mensaje):
+        nodos = self.topologia.nodos.get(particion)
+        if not nodos:
+            return {"status": "ERROR", "error": "particion no configurada"}
+        for nodo in nodos:
+            resp = await self.nodos.enviar(nodo, mensaje)
+            if not str(resp.get("error", "")).startswith(("nodo inalcanzable", "timeout")):
+                return resp
+        return {"status": "ERROR", "error": "particion inalcanzable"}
+
+    def _recargar_config(self):
+        try:
+            self.topologia = Topologia(cargar_config(self.config_path))
+        except (OSError, ValueError, KeyError) as e:
+            return {"status": "ERROR", "error": str(e)}
+        return {"status": "OK", "partitions": self.topologia.particiones,
+                "partitioner": self.topologia.particionador.tipo}
+
+    def estadisticas(self):
+        """Latencias (ms) por fase del 2PC y por tipo de petición, y cantidad de respuestas por estado."""
+        return {
+            "status": "OK",
+            "fases": {f: h.resumen(escala=1e-3) for f, h in sorted(self.fases.items())},
+            "peticiones": {t: h.resumen(escala=1e-3) for t, h in sorted(self.peticiones.items())},
+            "resultados": {f"{t}:{s}": n for (t, s), n in sorted(self.resultados.items(), key=str)},
+        }
+
+    async def reportar(self, intervalo):
+        while True:
+            await asyncio.sleep(intervalo)
+            datos = self.estadisticas()
+            for grupo in ("fases", "peticiones"):
+                for nombre, r in datos[grupo].items():
+                    print(f"[Coordinador] {nombre:<20} n={r['cantidad']:<8} media={r['media']:.3f}ms "
+                          f"p50={r['p50']:.3f}ms p99={r['p99']:.3f}ms max={r['max']:.3f}ms")
+
+
+async def main(args):
+    coordinador = Coordinador(args.port, args.config, args.host, args.timeout_nodo)
+    if args.reporte:
+        asyncio.create_task(coordinador.reportar(args.reporte))
+    try:
+        await coordinador.serve_forever()
+    finally:
+        coordinador.nodos.cerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coordinador de Python compatible con el ServidorCentral")
+    parser.add_argument("port", nargs="?", type=int, default=6000)
+    parser.add_argument("config", nargs="?", default=CONFIG_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--timeout-nodo", type=float, default=TIMEOUT_NODO,
+                        help="segundos que se espera la respuesta de cada nodo en cada fase")
+    parser.add_argument("--reporte", type=float, default=0,
+                        help="imprime las latencias por fase cada N segundos (0 para no imprimir)")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,161 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+# COMMIT y ABORT liberan locks de transacciones ya preparadas: van primero y nunca
+# se rechazan, porque rechazarlos solo alarga la saturación
+TIPOS_PRIORITARIOS = ("COMMIT", "ABORT", "ESTADISTICAS")
+PRIORIDAD_ALTA = 0
+PRIORIDAD_NORMAL = 1
+
+HILOS = 32
+HILOS_RESERVADOS = 2
+CAPACIDAD_COLA = 1024
+ESPERA_MAX_COLA = 0.5
+ALFA_SERVICIO = 0.1
+RETRY_AFTER_MIN = 0.01
+RETRY_AFTER_MAX = 2.0
+
+
+class PoolAdmision:
+    """Pool de hilos de tamaño fijo con una cola acotada y con prioridades.
+
+    `enviar` nunca bloquea: si la cola de peticiones normales está llena, la
+    respuesta es inmediatamente BUSY con un `retry_after` estimado a partir de
+    la profundidad de la cola y del tiempo de servicio medio. Una petición que
+    esperó en la cola más que `espera_max` se descarta sin procesarla (el
+    cliente ya la habrá dado por perdida) y también recibe BUSY.
+
+    COMMIT/ABORT se atienden antes que cualquier PREPARE o consulta en cola y
+    `hilos_reservados` de los hilos solo toman esas peticiones, así que siguen
+    avanzando aunque el resto de los hilos esté bloqueado esperando locks de
+    cuentas que precisamente esos COMMIT van a liberar.
+    """
+
+    def __init__(self, procesar, hilos=HILOS, capacidad=CAPACIDAD_COLA, espera_max=ESPERA_MAX_COLA,
+                 hilos_reservados=HILOS_RESERVADOS, al_rechazar=None, al_desencolar=None, nombre="admision"):
+        if hilos_reservados >= hilos:
+            raise ValueError("hilos_reservados debe ser menor que hilos")
+        self._procesar = procesar
+        self.hilos = hilos
+        self.hilos_reservados = hilos_reservados
+        self.capacidad = capacidad
+        self.espera_max = espera_max
+        # al_rechazar(motivo) y al_desencolar(segundos_en_cola), para las métricas del nodo
+        self.al_rechazar = al_rechazar
+        self.al_desencolar = al_desencolar
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Condition(self._lock)
+        self._hay_prioritaria = threading.Condition(self._lock)
+        self._cola = []  # (prioridad, orden, encolada, req, futuro)
+        self._orden = itertools.count()
+        self._normales = 0
+        self._en_proceso = 0
+        self._servicio = None  # EWMA del tiempo de servicio en segundos
+        self._stats = {"admitidas": 0, "procesadas": 0, "rechazadas_cola_llena": 0, "vencidas_en_cola": 0}
+        for i in range(hilos):
+            threading.Thread(target=self._trabajar, args=(i < hilos_reservados,), daemon=True,
+                             name=f"{nombre}-{i}").start()
+
+    @staticmethod
+    def prioridad(req):
+        tipo = str(req.get("type", "")).upper() if isinstance(req, dict) else ""
+        return PRIORIDAD_ALTA if tipo in TIPOS_PRIORITARIOS else PRIORIDAD_NORMAL
+
+    def enviar(self, req):
+        """Encola `req` y devuelve un concurrent.futures.Future con la respuesta (dict)."""
+        futuro = Future()
+        prioridad = self.prioridad(req)
+        with self._lock:
+            if prioridad != PRIORIDAD_ALTA and self._normales >= self.capacidad:
+                self._stats["rechazadas_cola_llena"] += 1
+                futuro.set_result(self._ocupado("COLA_LLENA"))
+                rechazada = True
+            else:
+                heapq.heappush(self._cola, (prioridad, next(self._orden), time.monotonic(), req, futuro))
+                self._stats["admitidas"] += 1
+                if prioridad == PRIORIDAD_ALTA:
+                    self._hay_prioritaria.notify()
+                else:
+                    self._normales += 1
+                self._hay_trabajo.notify()
+                rechazada = False
+        if rechazada and self.al_rechazar:
+            self.al_rechazar("cola_llena")
+        return futuro
+
+    def rechazo(self, req):
+        """Control de admisión de una petición que se atiende fuera del pool.
+
+        Devuelve la respuesta BUSY si `enviar` la rechazaría por cola llena, o
+        None si puede procesarse. La usan las lecturas del modo asyncio, que
+        se resuelven en el event loop sin ocupar hilos ni lugar en la cola.
+        """
+        if self.prioridad(req) == PRIORIDAD_ALTA:
+            return None
+        with self._lock:
+            if self._normales < self.capacidad:
+                return None
+            self._stats["rechazadas_cola_llena"] += 1
+            respuesta = self._ocupado("COLA_LLENA")
+        if self.al_rechazar:
+            self.al_rechazar("cola_llena")
+        return respuesta
+
+    def _ocupado(self, motivo):
+        """Respuesta BUSY; se llama con `_lock` tomado."""
+        servicio = self._servicio or 0.001
+        espera = self._normales * servicio / (self.hilos - self.hilos_reservados)
+        return {"status": "BUSY", "error": motivo,
+                "retry_after": round(min(max(espera, RETRY_AFTER_MIN), RETRY_AFTER_MAX), 3)}
+
+    def _trabajar(self, reservado):
+        esperar = self._hay_prioritaria if reservado else self._hay_trabajo
+        while True:
+            with self._lock:
+                while not self._cola or (reservado and self._cola[0][0] != PRIORIDAD_ALTA):
+                    esperar.wait()
+                prioridad, _, encolada, req, futuro = heapq.heappop(self._cola)
+                en_cola = time.monotonic() - encolada
+                vencida = False
+                if prioridad != PRIORIDAD_ALTA:
+                    self._normales -= 1
+                    if en_cola > self.espera_max:
+                        vencida = True
+                        self._stats["vencidas_en_cola"] += 1
+                        respuesta = self._ocupado("VENCIDA_EN_COLA")
+                if not vencida:
+                    self._en_proceso += 1
+            if self.al_desencolar:
+                self.al_desencolar(en_cola)
+            if vencida:
+                if self.al_rechazar:
+                    self.al_rechazar("vencida_en_cola")
+                futuro.set_result(respuesta)
+                continue
+            inicio = time.perf_counter()
+            try:
+                respuesta = self._procesar(req)
+            except Exception as e:
+                respuesta = {"status": "ERROR", "error": f"Excepción en el nodo: {e}"}
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                self._en_proceso -= 1
+                self._stats["procesadas"] += 1
+                if self._servicio is None:
+                    self._servicio = duracion
+                else:
+                    self._servicio += ALFA_SERVICIO * (duracion - self._servicio)
+            futuro.set_result(respuesta)
+
+    def en_cola(self):
+        with self._lock:
+            return len(self._cola)
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._stats, en_cola=len(self._cola), en_proceso=self._en_proceso, hilos=self.hilos,
+                        capacidad=self.capacidad, espera_max=self.espera_max,
+                        servicio_ms=round((self._servicio or 0.0) * 1e3, 3))
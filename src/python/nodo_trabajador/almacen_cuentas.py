@@ -0,0 +1,154 @@
+"""Almacenes de cuentas del NodoWorker: id de cuenta -> saldo en centavos.
+
+Ambas implementaciones exponen la misma interfaz de mapeo (`in`, `[]`,
+`get`, `pop`, `del`, `len`, `items`) más `total()` e `instantanea()`, así que
+el nodo puede usar cualquiera de las dos.
+"""
+import bisect
+import threading
+from array import array
+
+
+class AlmacenDict(dict):
+    """Un dict normal: búsquedas O(1), ~100+ bytes por cuenta."""
+
+    def cargar(self, pares):
+        self.update(pares)
+
+    def cargar_arreglos(self, ids, saldos):
+        self.update(zip(ids, saldos))
+
+    def total(self):
+        return sum(self.values())
+
+    def instantanea(self):
+        """Copia (cuenta, saldo) consistente para escribir un snapshot fuera del lock."""
+        return list(self.items())
+
+
+class AlmacenCompacto:
+    """Ids ordenados en un `array('q')` y saldos en otro, en paralelo: 16 bytes por cuenta.
+
+    La búsqueda es binaria (O(log n), en C vía `bisect`). Insertar al final
+    es O(1) amortizado, que es el caso normal al cargar un archivo ordenado o
+    al crear cuentas con ids crecientes; insertar en el medio o borrar mueve
+    la cola del arreglo (memmove), aceptable para CREAR/ELIMINAR.
+
+    A diferencia del dict, una inserción desplaza posiciones en dos arreglos,
+    así que las lecturas concurrentes se protegen con un lock interno.
+    """
+
+    def __init__(self, pares=()):
+        self._lock = threading.Lock()
+        self._ids = array('q')
+        self._saldos = array('q')
+        for acc, saldo in pares:
+            self[acc] = saldo
+
+    @classmethod
+    def desde_arreglos(cls, ids, saldos):
+        """Construye el almacén adoptando dos arreglos ya ordenados por id (sin copiar)."""
+        almacen = cls()
+        almacen._ids = ids
+        almacen._saldos = saldos
+        return almacen
+
+    def cargar(self, pares):
+        """Carga masiva: ordena una sola vez en lugar de insertar cuenta por cuenta."""
+        pares = sorted(dict(list(self.items()) + list(pares)).items())
+        with self._lock:
+            self._ids = array('q', (acc for acc, _ in pares))
+            self._saldos = array('q', (saldo for _, saldo in pares))
+
+    def cargar_arreglos(self, ids, saldos):
+        """Adopta dos arreglos ordenados (p.ej. de un snapshot binario) si el almacén está vacío."""
+        if len(self):
+            self.cargar(zip(ids, saldos))
+            return
+        with self._lock:
+            self._ids = ids
+            self._saldos = saldos
+
+    def _indice(self, acc):
+        i = bisect.bisect_left(self._ids, acc)
+        if i < len(self._ids) and self._ids[i] == acc:
+            return i
+        return -1
+
+    def __contains__(self, acc):
+        with self._lock:
+            return self._indice(acc) >= 0
+
+    def __getitem__(self, acc):
+        with self._lock:
+            i = self._indice(acc)
+            if i < 0:
+                raise KeyError(acc)
+            return self._saldos[i]
+
+    def get(self, acc, default=None):
+        with self._lock:
+            i = self._indice(acc)
+            return self._saldos[i] if i >= 0 else default
+
+    def __setitem__(self, acc, saldo):
+        with self._lock:
+            ids = self._ids
+            if not ids or acc > ids[-1]:
+                ids.append(acc)
+                self._saldos.append(saldo)
+                return
+            i = bisect.bisect_left(ids, acc)
+            if ids[i] == acc:
+                self._saldos[i] = saldo
+            else:
+                ids.insert(i, acc)
+                self._saldos.insert(i, saldo)
+
+    def __delitem__(self, acc):
+        self.pop(acc)
+
+    def pop(self, acc, *default):
+        with self._lock:
+            i = self._indice(acc)
+            if i < 0:
+                if default:
+                    return default[0]
+                raise KeyError(acc)
+            saldo = self._saldos[i]
+            del self._ids[i]
+            del self._saldos[i]
+            return saldo
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self.instantanea_ids())
+
+    def instantanea_ids(self):
+        with self._lock:
+            return self._ids[:]
+
+    def items(self):
+        return self.instantanea()
+
+    def values(self):
+        with self._lock:
+            return iter(self._saldos[:])
+
+    def total(self):
+        # sum() sobre un array('q') recorre el buffer en C, sin diccionarios de por medio
+        with self._lock:
+            return sum(self._saldos)
+
+    def instantanea(self):
+        # Copiar un array es un memcpy, mucho más barato que materializar tuplas
+        with self._lock:
+            return zip(self._ids[:], self._saldos[:])
+
+    def memoria(self):
+        return self._ids.buffer_info()[1] * self._ids.itemsize + self._saldos.buffer_info()[1] * self._saldos.itemsize
+
+
+ALMACENES = {"dict": AlmacenDict, "compacto": AlmacenCompacto}
@@ -0,0 +1,107 @@
+import logging
+import queue
+import threading
+import time
+
+from src.python.common.db_utils import conectar, migrar
+
+log = logging.getLogger("auditoria")
+
+
+class AuditorTransacciones:
+    """Escritor asíncrono de la tabla Transacciones.
+
+    Los COMMIT solo encolan filas (sin tocar SQLite) y un único hilo las
+    inserta por lotes con `executemany` usando una conexión que vive todo el
+    proceso. Las filas llevan el tx_id y la posición del movimiento dentro de
+    la transacción y se insertan con `INSERT OR IGNORE` sobre un índice único
+    (tx_id, id_cuenta, tipo, indice_mov), de modo que las réplicas de una
+    misma partición que comparten la BD dejan una sola fila por movimiento en
+    lugar de una por réplica, y un lote que mueve dos veces la misma cuenta
+    deja las dos.
+
+    Si la cola está llena la fila se descarta y se cuenta: la auditoría nunca
+    debe frenar la confirmación de una transacción.
+    """
+
+    def __init__(self, db_path, capacidad=10000, tam_lote=500, espera_lote=0.05, al_escribir=None):
+        self.db_path = db_path
+        # Callback opcional (segundos, filas) tras cada lote insertado en SQLite
+        self.al_escribir = al_escribir
+        self.tam_lote = tam_lote
+        self.espera_lote = espera_lote
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.escritas = 0
+        self.descartadas = 0
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def registrar(self, tx_id, id_cuenta, tipo, monto, fecha, indice_mov=0):
+        """Encola una fila sin bloquear. Devuelve False si se descartó por cola llena."""
+        try:
+            self.cola.put_nowait((tx_id, id_cuenta, tipo, monto, fecha, indice_mov))
+            return True
+        except queue.Full:
+            self.descartadas += 1
+            return False
+
+    def estadisticas(self):
+        return {"pendientes": self.cola.qsize(), "escritas": self.escritas, "descartadas": self.descartadas}
+
+    def cerrar(self, timeout=5.0):
+        """Escribe lo que quede en la cola y detiene el hilo escritor."""
+        self.cola.put(None)
+        self._hilo.join(timeout)
+
+    def _conectar(self):
+        conn = conectar(self.db_path)
+        # Columna tx_id, índice de deduplicación e índices de consulta si la BD es anterior a ellos
+        migrar(conn)
+        return conn
+
+    def _tomar_lote(self):
+        """Bloquea hasta tener al menos una fila y luego junta hasta `tam_lote`."""
+        primero = self.cola.get()
+        lote = [primero]
+        if primero is None:
+            return lote
+        while len(lote) < self.tam_lote:
+            try:
+                fila = self.cola.get(timeout=self.espera_lote)
+            except queue.Empty:
+                break
+            lote.append(fila)
+            if fila is None:
+                break
+        return lote
+
+    def _bucle(self):
+        conn = None
+        while True:
+            lote = self._tomar_lote()
+            fin = lote[-1] is None
+            filas = [f for f in lote if f is not None]
+            if filas:
+                try:
+                    inicio = time.perf_counter()
+                    if conn is None:
+                        conn = self._conectar()
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO Transacciones(tx_id, id_cuenta, tipo, monto, fecha, indice_mov) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        filas,
+                    )
+                    conn.commit()
+                    self.escritas += len(filas)
+                    if self.al_escribir is not None:
+                        self.al_escribir(time.perf_counter() - inicio, len(filas))
+                except Exception as e:
+                    log.warning("No se pudieron registrar %d transacciones en SQLite: %s", len(filas), e)
+                    self.descartadas += len(filas)
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+            if fin:
+                if conn is not None:
+                    conn.close()
+                return
@@ -0,0 +1,74 @@
+import threading
+import time
+
+
+class GestorBloqueos:
+    """Locks exclusivos por cuenta y retenciones de saldo para el 2PC.
+
+    El dueño de un lock es la transacción (tx_id), no el hilo: PREPARE los
+    toma y COMMIT/ABORT los suelta, aunque lleguen por conexiones distintas.
+    Las cuentas se bloquean siempre en orden ascendente, por lo que dos
+    transacciones del mismo nodo nunca se esperan en ciclo; la espera tiene
+    además un timeout para cortar los ciclos entre réplicas distintas (cada
+    réplica puede recibir los PREPARE en otro orden).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._duenos = {}        # cuenta -> tx_id
+        self._por_tx = {}        # tx_id -> [cuentas, instante de adquisición]
+        self._retenciones = {}   # cuenta -> monto retenido por débitos preparados
+        self._por_tx_ret = {}    # tx_id -> [(cuenta, monto)]
+
+    def adquirir(self, tx_id, cuentas, timeout):
+        """Bloquea todas las cuentas para `tx_id` o ninguna si vence el timeout."""
+        limite = time.monotonic() + timeout
+        tomadas = []
+        with self._cond:
+            for acc in sorted(set(cuentas)):
+                while self._duenos.get(acc, tx_id) != tx_id:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        for a in tomadas:
+                            del self._duenos[a]
+                        self._cond.notify_all()
+                        return False
+                    self._cond.wait(restante)
+                if acc not in self._duenos:
+                    self._duenos[acc] = tx_id
+                    tomadas.append(acc)
+            entrada = self._por_tx.setdefault(tx_id, [[], time.monotonic()])
+            entrada[0].extend(tomadas)
+        return True
+
+    def retener(self, tx_id, acc, monto):
+        with self._cond:
+            self._retenciones[acc] = self._retenciones.get(acc, 0) + monto
+            self._por_tx_ret.setdefault(tx_id, []).append((acc, monto))
+
+    def retenido(self, acc):
+        return self._retenciones.get(acc, 0)
+
+    def liberar(self, tx_id):
+        """Suelta los locks y las retenciones de `tx_id` (COMMIT, ABORT o vencimiento)."""
+        with self._cond:
+            for acc, monto in self._por_tx_ret.pop(tx_id, []):
+                restante = self._retenciones.get(acc, 0) - monto
+                if restante:
+                    self._retenciones[acc] = restante
+                else:
+                    self._retenciones.pop(acc, None)
+            cuentas, _ = self._por_tx.pop(tx_id, ([], 0))
+            for acc in cuentas:
+                if self._duenos.get(acc) == tx_id:
+                    del self._duenos[acc]
+            self._cond.notify_all()
+
+    def vencidas(self, max_edad):
+        """tx_ids que tienen locks desde hace más de `max_edad` segundos."""
+        limite = time.monotonic() - max_edad
+        with self._cond:
+            return [tx for tx, (_, desde) in self._por_tx.items() if desde < limite]
+
+    def bloqueadas(self):
+        return len(self._duenos)
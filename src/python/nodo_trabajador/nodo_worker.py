@@ -1,231 +1,1119 @@
 
+import argparse
+import asyncio
 import socket
 import threading
 import json
+import logging
 import sys
 import os
-import sqlite3
+import time
+import uuid
+from collections import deque
 from datetime import datetime
 
+# Añadir el directorio raíz del proyecto al path para permitir imports absolutos desde src
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common import bitacora
+from src.python.common import protocolo_binario
+from src.python.common import snapshots
+from src.python.common.cliente import CAMPO_ID, PoolConexiones
+from src.python.common.dinero import a_centavos, a_unidades
+from src.python.common.metricas import RegistroMetricas, servir_http
+from src.python.common.particionado import Particionador
+from src.python.nodo_trabajador.admision import CAPACIDAD_COLA, ESPERA_MAX_COLA, HILOS, PoolAdmision
+from src.python.nodo_trabajador.almacen_cuentas import ALMACENES
+from src.python.nodo_trabajador.auditoria import AuditorTransacciones
+from src.python.nodo_trabajador.bloqueos import GestorBloqueos
+from src.python.nodo_trabajador.replicacion import (
+    TX_RECIENTES, VENTANA_POSICION, LogTruncado, RegistroReplicacion, buscar_pares, guardar_tx_recientes, leer_tx_recientes)
+from src.python.nodo_trabajador.resultados import ABORTED, COMMITTED, RegistroResultados
+from src.python.nodo_trabajador.wal import WriteAheadLog
+
 # --- Configuración ---
 # Ruta a la base de datos SQLite, asumimos que el script se corre desde la raíz del proyecto
 DB_PATH = "db/banco_chat.db"
+# Cada cuánto (segundos) se compacta el WAL en el archivo de datos, o antes si crece demasiado
+CHECKPOINT_INTERVAL = 30.0
+CHECKPOINT_MAX_WAL_BYTES = 8 * 1024 * 1024
+# Espera máxima por el lock de una cuenta en PREPARE, y vida máxima de una transacción preparada
+LOCK_TIMEOUT = 1.0
+PREPARED_TIMEOUT = 30.0
+# Operaciones máximas en un PREPARE_BATCH y cuentas máximas en un CONSULTAR_CUENTAS
+MAX_OPS_LOTE = 100000
+MAX_CUENTAS_CONSULTA = 10000
+# Conexiones simultáneas en el modo por hilos; las que sobran reciben BUSY y se cierran
+MAX_CONEXIONES = 1024
+CONFIG_PATH = os.path.join(ROOT_DIR, "config", "nodos_config.json")
+# Registros por FETCH_LOG y cuentas por FETCH_SNAPSHOT al ponerse al día con un par
+LOTE_LOG = 2000
+LOTE_SNAPSHOT = 50000
+# Segundos que se conserva una foto servida por FETCH_SNAPSHOT entre una parte y la siguiente
+VIDA_SNAPSHOT_SERVIDO = 120.0
+# Tipos con etiqueta propia en las métricas; el resto se agrupa en OTRO
+TIPOS_METRICAS = ("PREPARE_TRANSFER", "PREPARE_CREATE", "PREPARE_DELETE", "PREPARE_BATCH", "COMMIT", "ABORT",
+                  "CONSULTAR_CUENTA", "CONSULTAR_CUENTAS", "SUM_PARTITION", "ESTADISTICAS", "HELLO",
+                  "FETCH_LOG", "LOG_POSITION", "FETCH_SNAPSHOT", "MIGRATE_OUT", "MIGRATE_IN")
+
+
+class ErrorValidacion(Exception):
+    """Una operación de un PREPARE no se puede aplicar sobre los saldos de la partición."""
+
 
 class NodoWorker:
-    def __init__(self, port, data_file_path):
+    def __init__(self, port, data_file_path, db_path=DB_PATH, almacen="dict"):
         self.port = port
+        self.log = logging.getLogger(f"nodo.{port}")
         self.data_file = data_file_path
-        self.cuentas = {}
+        self.wal_file = data_file_path + ".wal"
+        # Saldos en centavos enteros; la conversión a unidades se hace solo en las respuestas
+        self.almacen = almacen
+        self.cuentas = ALMACENES[almacen]()
+        self.saldo_total = 0
         self.prepared_ops = {}
+        # Operaciones pedidas (ver _firma_ops) de cada transacción preparada: un PREPARE
+        # repetido solo es un reintento si pide exactamente lo mismo
+        self.firmas_preparadas = {}
+        # PREPARE en curso por tx_id: un reintento concurrente del mismo PREPARE se rechaza
+        self._preparando = set()
+        self._preparando_lock = threading.Lock()
+        # migracion_id -> cuentas bloqueadas por un MIGRATE_OUT preparado
+        self.migraciones = {}
+        # Cuentas que salieron hacia otra partición -> destino. Un PREPARE que las
+        # toque viene de un coordinador con la asignación vieja y se rechaza, en
+        # lugar de tratarlas como "de otra partición" y perder el crédito. Se
+        # guardan en el checkpoint (.txs) y el WAL las reconstruye al arrancar.
+        self.migradas = {}
+        self.bloqueos = GestorBloqueos()
+        # Protege la aplicación de un COMMIT en memoria y su orden en el WAL; los
+        # PREPARE concurrentes se coordinan con los locks por cuenta de `bloqueos`
         self.lock = threading.Lock()
+        self.checkpoint_lock = threading.Lock()
+        self.seq_snapshot = 0
+        # Los archivos .bin (o con cabecera binaria) se cargan y guardan en el formato binario
+        self.formato_snapshot = "bin" if data_file_path.endswith(".bin") else "txt"
+        self.conexiones = 0
+        self._conexiones_lock = threading.Lock()
+        self.max_conexiones = MAX_CONEXIONES
+        # Pool acotado por el que pasan las peticiones (ver activar_admision); None las procesa en el hilo de la conexión
+        self.admision = None
+        self._crear_metricas()
+        self.auditor = AuditorTransacciones(
+            db_path, al_escribir=lambda s, filas: self.m_persistencia.observar(s, operacion="auditoria_sqlite"))
+        # Commits recientes para servir FETCH_LOG, y tx_id propios para ubicarse en el log de un par
+        self.replicacion = RegistroReplicacion()
+        tx_recientes, resultados, migradas = leer_tx_recientes(self.data_file + ".txs")
+        self.migradas.update((int(acc), int(destino)) for acc, destino in migradas)
+        self.tx_recientes = deque(tx_recientes, maxlen=TX_RECIENTES)
+        # Resultado de los tx_id recientes (del último checkpoint; el WAL agrega los commits posteriores)
+        self.resultados = RegistroResultados()
+        self.resultados.cargar(resultados)
+        # snapshot_id -> (vence, seq, cuentas) de las fotos servidas por partes con FETCH_SNAPSHOT
+        self.snapshots_servidos = {}
+        self._snapshots_lock = threading.Lock()
         self._load_data()
+        # Suma de la partición (centavos), mantenida en cada COMMIT bajo `lock`
+        self.saldo_total = self.cuentas.total()
+        # Débito/crédito neto de cada transacción preparada, para el arqueo
+        self.netos_preparados = {}
+        # Commits registrados en el WAL que todavía no son durables: seq -> (tx_id, cambios del WAL).
+        # Se aplican en memoria recién después del fsync (ver _aplicar_durable)
+        self._por_aplicar = {}
+        self.wal = WriteAheadLog(self.wal_file, seq_inicial=self.seq_snapshot,
+                                 al_sincronizar=lambda s, n: self.m_persistencia.observar(s, operacion="fsync_wal"),
+                                 al_fallar=self._fallo_wal)
+        # Se compacta al arrancar para no volver a reproducir el mismo log en el próximo reinicio
+        self._checkpoint()
+        threading.Thread(target=self._checkpoint_loop, daemon=True).start()
+        threading.Thread(target=self._expirar_preparadas, daemon=True).start()
+
+    def _crear_metricas(self):
+        self.metricas = RegistroMetricas()
+        self.m_peticiones = self.metricas.contador(
+            "nodo_peticiones_total", "Peticiones atendidas por tipo y estado de la respuesta", ("tipo", "estado"))
+        self.m_duracion = self.metricas.histograma(
+            "nodo_peticion_segundos", "Tiempo de proceso de cada petición por tipo", ("tipo",))
+        self.m_espera_lock = self.metricas.histograma(
+            "nodo_espera_lock_segundos", "Espera por los locks de cuentas (PREPARE) y por el lock de COMMIT", ("lock",))
+        self.m_persistencia = self.metricas.histograma(
+            "nodo_persistencia_segundos", "Escritura a disco: fsync del WAL, snapshot y lotes de auditoría en SQLite",
+            ("operacion",))
+        self.metricas.medidor("nodo_conexiones_abiertas", "Conexiones de clientes abiertas",
+                              funcion=lambda: self.conexiones)
+        self.metricas.medidor("nodo_cola_peticiones", "Peticiones esperando un hilo del pool de admisión",
+                              funcion=lambda: self.admision.en_cola() if self.admision else 0)
+        self.m_rechazadas = self.metricas.contador(
+            "nodo_peticiones_rechazadas_total", "Peticiones respondidas con BUSY sin procesarlas", ("motivo",))
+        self.m_espera_cola = self.metricas.histograma(
+            "nodo_espera_cola_segundos", "Tiempo de cada petición en la cola del pool de admisión")
+        self.metricas.medidor("nodo_prepared_ops", "Transacciones preparadas sin COMMIT/ABORT",
+                              funcion=lambda: len(self.prepared_ops))
+        self.metricas.medidor("nodo_cuentas", "Cuentas en memoria", funcion=lambda: len(self.cuentas))
+        self.metricas.medidor("nodo_cuentas_bloqueadas", "Cuentas con lock de una transacción",
+                              funcion=lambda: self.bloqueos.bloqueadas())
+        self.metricas.medidor("nodo_wal_seq", "Seq del último commit", funcion=lambda: self.wal.seq)
+        self.metricas.medidor("nodo_auditoria_pendientes", "Filas de auditoría en cola",
+                              funcion=lambda: self.auditor.cola.qsize())
+        self.metricas.medidor("nodo_auditoria_descartadas", "Filas de auditoría descartadas",
+                              funcion=lambda: self.auditor.descartadas)
 
     def _load_data(self):
-        """Carga las cuentas desde el archivo de datos a memoria."""
-        print(f"[Nodo-{self.port}] Cargando datos desde {self.data_file}...")
+        """Carga el snapshot a memoria y reproduce encima el WAL de los commits posteriores."""
+        self.log.info("Cargando datos desde %s...", self.data_file)
         try:
             if not os.path.exists(self.data_file):
-                print(f"[Nodo-{self.port}] Archivo de datos no encontrado, se creará uno nuevo.")
+                self.log.info("Archivo de datos no encontrado, se creará uno nuevo.")
                 os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-                with open(self.data_file, 'w') as f:
-                    pass # Crear archivo vacío
-                return
-
-            with open(self.data_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        parts = line.split(',')
-                        acc_id = int(parts[0])
-                        balance = float(parts[1])
-                        self.cuentas[acc_id] = balance
-                    except (ValueError, IndexError) as e:
-                        print(f"[Nodo-{self.port}] [WARN] Línea inválida ignorada: {line} - {e}")
-            print(f"[Nodo-{self.port}] {len(self.cuentas)} cuentas cargadas en memoria.")
+                self._persist_to_disk([], 0)
+            else:
+                self._load_snapshot()
+            self._replay_wal()
+            self.log.info("%d cuentas cargadas en memoria (seq %d).", len(self.cuentas), self.seq_snapshot)
         except Exception as e:
-            print(f"[Nodo-{self.port}] [ERROR] Fallo al cargar datos: {e}")
+            self.log.error("Fallo al cargar datos: %s", e)
             sys.exit(1)
 
-    def _persist_to_disk(self):
-        """Guarda el estado actual de las cuentas en memoria al archivo de datos."""
+    def _load_snapshot(self):
+        if snapshots.es_binario(self.data_file):
+            self.formato_snapshot = "bin"
+            ids, saldos, self.seq_snapshot = snapshots.leer_binario(self.data_file)
+            self.cuentas.cargar_arreglos(ids, saldos)
+            return
+        pares, self.seq_snapshot = snapshots.leer_texto(
+            self.data_file,
+            al_invalida=lambda line, e: self.log.warning("Línea inválida ignorada: %s - %s", line, e),
+        )
+        self.cuentas.cargar(pares)
+
+    def _replay_wal(self):
+        """Aplica los registros del WAL (incluido el de un checkpoint interrumpido).
+
+        Los registros guardan saldos absolutos, así que reaplicar uno que ya
+        estaba incluido en el snapshot no cambia el resultado.
+        """
+        aplicados = 0
+        self.replicacion.reiniciar(self.seq_snapshot)
+        for ruta in (self.wal_file + '.old', self.wal_file):
+            for reg in WriteAheadLog.leer_registros(ruta):
+                ops = self._aplicar_cambios(reg["ops"])
+                if reg["seq"] > self.replicacion.ultimo():
+                    self.replicacion.agregar(reg["seq"], reg.get("tx"), ops)
+                    self.tx_recientes.append(reg.get("tx"))
+                self.resultados.registrar(reg.get("tx"), COMMITTED, instante=reg.get("t"))
+                self.seq_snapshot = max(self.seq_snapshot, reg["seq"])
+                aplicados += 1
+        if aplicados:
+            self.log.info("%d registros del WAL reproducidos.", aplicados)
+
+    def _aplicar_cambios(self, ops):
+        """Aplica cambios absolutos del WAL (propio o de un par) y devuelve los mismos en centavos.
+
+        Un "del" con partición destino es la salida de una cuenta por
+        migración y la anota en `migradas`; un "set" posterior (la cuenta
+        volvió) la quita.
+        """
+        normalizados = []
+        for op in ops:
+            acc = int(op[1])
+            if op[0] == "set":
+                # Registros anteriores al paso a centavos guardaban el saldo como float
+                saldo = op[2] if isinstance(op[2], int) else a_centavos(op[2])
+                self.saldo_total += saldo - self.cuentas.get(acc, 0)
+                self.cuentas[acc] = saldo
+                self.migradas.pop(acc, None)
+                normalizados.append(["set", acc, saldo])
+            elif op[0] == "del":
+                self.saldo_total -= self.cuentas.pop(acc, 0)
+                if len(op) > 2:
+                    self.migradas[acc] = int(op[2])
+                    normalizados.append(["del", acc, int(op[2])])
+                else:
+                    normalizados.append(["del", acc])
+        return normalizados
+
+    def _registrar_commit(self, tx_id, cambios):
+        """Agrega un commit al WAL, a la retención para réplicas y a los resultados. Debe llamarse con `lock` tomado."""
+        seq = self.wal.registrar(tx_id, cambios)
+        self.replicacion.agregar(seq, tx_id, cambios)
+        self.tx_recientes.append(tx_id)
+        self.resultados.registrar(tx_id, COMMITTED, seq)
+        return seq
+
+    def _registrar_por_aplicar(self, tx_id, cambios):
+        """Registra un commit en el WAL sin aplicarlo todavía en memoria. Debe llamarse con `lock` tomado.
+
+        Quien llama debe tener bloqueadas las cuentas que toca hasta después
+        de `_confirmar_durable`, para que nadie valide contra los saldos viejos.
+        """
+        seq = self._registrar_commit(tx_id, cambios)
+        self._por_aplicar[seq] = (tx_id, cambios)
+        return seq
+
+    def _confirmar_durable(self, seq, tx_id):
+        """Espera el fsync de `seq` (fuera de `lock`) y aplica el commit. False si el WAL falló.
+
+        Ante un fallo no se aplica nada ni se deben soltar los locks: el nodo
+        se detiene (ver _fallo_wal).
+        """
+        try:
+            self.wal.esperar_durable(seq)
+        except Exception as e:
+            self.log.error("WAL en el commit de %s: %s", tx_id, e)
+            return False
         with self.lock:
+            self._aplicar_durable(seq)
+        return True
+
+    def _aplicar_durable(self, seq):
+        """Aplica en memoria un commit cuyo registro ya es durable. Debe llamarse con `lock` tomado.
+
+        Puede haberlo aplicado antes un checkpoint, que rota el WAL (y con eso
+        lo sincroniza) antes de sacar la foto de las cuentas.
+        """
+        pendiente = self._por_aplicar.pop(seq, None)
+        if pendiente is None:
+            return
+        tx_id, cambios = pendiente
+        self._aplicar_cambios(cambios)
+        self.netos_preparados.pop(tx_id, None)
+
+    def _fallo_wal(self, error):
+        """Un error de escritura del WAL detiene el nodo (el supervisor lo reinicia).
+
+        Los registros no durables no se pueden dar por confirmados ni
+        descartar sin dejar un hueco en la secuencia que ven las réplicas: al
+        reiniciar, el nodo reproduce solo lo que llegó a disco.
+        """
+        self.log.critical("Error de escritura en el WAL (%s): el nodo se detiene.", error)
+        logging.shutdown()
+        os._exit(1)
+
+    def _persist_to_disk(self, cuentas, seq):
+        """Escribe un snapshot completo de forma atómica (archivo temporal + rename), en el formato de origen."""
+        if self.formato_snapshot == "bin":
+            snapshots.escribir_binario(self.data_file, cuentas, seq)
+        else:
+            snapshots.escribir_texto(self.data_file, cuentas, seq)
+
+    def _checkpoint(self):
+        """Compacta el WAL en el archivo de datos sin bloquear los COMMIT mientras se escribe."""
+        with self.checkpoint_lock:
+            with self.lock:
+                ruta_old = self.wal.rotar()
+                # rotar() sincronizó todo lo registrado: los COMMIT que esperan su fsync ya son durables
+                for seq in sorted(self._por_aplicar):
+                    self._aplicar_durable(seq)
+                cuentas = self.cuentas.instantanea()
+                seq = self.wal.seq
+                tx_recientes = list(self.tx_recientes)
+                resultados = self.resultados.instantanea()
+                migradas = list(self.migradas.items())
             try:
-                with open(self.data_file, 'w') as f:
-                    for acc_id, balance in self.cuentas.items():
-                        f.write(f"{acc_id},{balance:.2f}\n")
+                with self.m_persistencia.medir(operacion="snapshot"):
+                    self._persist_to_disk(cuentas, seq)
+                guardar_tx_recientes(self.data_file + ".txs", tx_recientes, seq, resultados, migradas)
+                os.remove(ruta_old)
             except Exception as e:
-                print(f"[Nodo-{self.port}] [ERROR] Fallo al persistir datos a disco: {e}")
+                # El log antiguo se conserva y el próximo checkpoint lo vuelve a intentar
+                self.log.error("Fallo al persistir datos a disco: %s", e)
 
+    def _checkpoint_loop(self):
+        ultimo = time.monotonic()
+        while True:
+            time.sleep(1.0)
+            if (time.monotonic() - ultimo >= CHECKPOINT_INTERVAL
+                    or self.wal.tamano() >= CHECKPOINT_MAX_WAL_BYTES):
+                if self.wal.tamano() > 0:
+                    self._checkpoint()
+                ultimo = time.monotonic()
 
-    def _registrar_transaccion_db(self, id_cuenta, tipo, monto):
-        """Registra una transacción en la base de datos central de SQLite."""
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO Transacciones(id_cuenta, tipo, monto, fecha) VALUES (?, ?, ?, ?)",
-                (id_cuenta, tipo, monto, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            )
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"[Nodo-{self.port}] [WARN] No se pudo registrar la transacción en SQLite: {e}")
+
+    def _registrar_transaccion_db(self, tx_id, movimientos):
+        """Encola los movimientos de una transacción para el registro de auditoría en SQLite.
+
+        La posición de cada movimiento sale del orden de las operaciones del
+        PREPARE, que es el mismo en todas las réplicas.
+        """
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for indice, (id_cuenta, tipo, monto) in enumerate(movimientos):
+            self.auditor.registrar(tx_id, id_cuenta, tipo, monto, fecha, indice)
 
     def _json_response(self, data):
         """Codifica un diccionario a una cadena JSON para la respuesta."""
         return (json.dumps(data) + '\n').encode()
 
+    @staticmethod
+    def _ops_de(req):
+        """Operaciones de un PREPARE: la propia petición o la lista "ops" de un PREPARE_BATCH."""
+        if "batch" not in req.get("type", "").lower():
+            return [req]
+        ops = req["ops"]
+        if not isinstance(ops, list) or not ops:
+            raise ValueError("el lote no tiene operaciones")
+        if len(ops) > MAX_OPS_LOTE:
+            raise ValueError(f"el lote supera {MAX_OPS_LOTE} operaciones")
+        return ops
+
+    @staticmethod
+    def _cuentas_de(ops):
+        """Cuentas que un PREPARE necesita bloquear."""
+        cuentas = []
+        for op in ops:
+            op_type = op.get("type", "").lower()
+            if "transfer" in op_type:
+                cuentas += [int(op["from"]), int(op["to"])]
+            elif "create" in op_type or "delete" in op_type:
+                cuentas.append(int(op["account"]))
+            else:
+                raise ValueError(f"operación desconocida: {op.get('type')}")
+        return cuentas
+
+    @staticmethod
+    def _firma_ops(ops):
+        """Forma normalizada de las operaciones pedidas, que no depende de cómo se codificaron (JSON o binario)."""
+        firma = []
+        for op in ops:
+            op_type = op.get("type", "").lower()
+            if "transfer" in op_type:
+                firma.append(("transfer", int(op["from"]), int(op["to"]), a_centavos(op["amount"])))
+            elif "create" in op_type:
+                firma.append(("create", int(op["account"]), a_centavos(op["initial"])))
+            else:
+                firma.append(("delete", int(op["account"])))
+        return tuple(firma)
+
+    def _validar_ops(self, ops):
+        """Valida las operaciones en orden contra los saldos disponibles y devuelve las que tocan a este nodo.
+
+        Un lote se simula sobre una copia de los saldos que involucra, así que
+        una operación ve el efecto de las anteriores del mismo lote (un crédito
+        puede cubrir un débito posterior, una cuenta creada puede recibir
+        fondos). Lanza `ErrorValidacion` con el índice de la primera que falla.
+        """
+        disponibles = {}  # cuenta -> saldo disponible simulado; None si no existe en el nodo
+        eliminadas = set()
+
+        def disponible(acc):
+            if acc in self.migradas:
+                raise ErrorValidacion(f"CUENTA_MIGRADA: la cuenta {acc} está ahora en la partición {self.migradas[acc]}")
+            if acc not in disponibles:
+                saldo = self.cuentas.get(acc)
+                disponibles[acc] = None if saldo is None else saldo - self.bloqueos.retenido(acc)
+            return disponibles[acc]
+
+        preparadas = []
+        for i, op in enumerate(ops):
+            prefijo = f"op {i}: " if len(ops) > 1 else ""
+            op_type = op.get("type", "").lower()
+
+            if "transfer" in op_type:
+                from_acc = int(op["from"])
+                to_acc = int(op["to"])
+                amount = a_centavos(op["amount"])
+                if amount <= 0 and len(ops) > 1:
+                    raise ErrorValidacion(prefijo + "Monto inválido")
+                # Una cuenta eliminada antes en el lote no es "de otra partición": el lote es inválido
+                if from_acc in eliminadas or to_acc in eliminadas:
+                    raise ErrorValidacion(prefijo + "Cuenta eliminada en el mismo lote")
+
+                # Validar y preparar débito si este nodo maneja la cuenta de origen
+                if disponible(from_acc) is not None:
+                    if disponibles[from_acc] < amount:
+                        raise ErrorValidacion(prefijo + "Saldo insuficiente")
+                    disponibles[from_acc] -= amount
+                    preparadas.append(("debit", from_acc, amount))
+
+                # Preparar crédito si este nodo maneja la cuenta de destino
+                if disponible(to_acc) is not None:
+                    disponibles[to_acc] += amount
+                    preparadas.append(("credit", to_acc, amount))
+
+            elif "create" in op_type:
+                acc = int(op["account"])
+                initial = a_centavos(op["initial"])
+                if disponible(acc) is not None:
+                    raise ErrorValidacion(prefijo + "Cuenta ya existe")
+                disponibles[acc] = initial
+                eliminadas.discard(acc)
+                preparadas.append(("create", acc, initial))
+
+            elif "delete" in op_type:
+                acc = int(op["account"])
+                if disponible(acc) is None:
+                    raise ErrorValidacion(prefijo + "Cuenta no existe")
+                disponibles[acc] = None
+                eliminadas.add(acc)
+                preparadas.append(("delete", acc, 0))
+
+        return preparadas
+
     def _handle_prepare(self, req):
-        """Lógica para la fase de PREPARE del 2PC."""
+        """Lógica para la fase de PREPARE del 2PC (una operación o un PREPARE_BATCH).
+
+        Bloquea las cuentas involucradas hasta el COMMIT/ABORT y retiene el
+        monto a debitar, de modo que dos PREPARE no pueden validar contra el
+        mismo saldo. Un tx_id que ya se confirmó o abortó no se vuelve a
+        preparar: se responde su resultado. Un PREPARE de un tx_id ya
+        preparado es un reintento solo si pide las mismas operaciones; si no,
+        es otra transacción con el mismo id y se rechaza.
+        """
         tx_id = req.get("tx_id")
         if not tx_id:
-            return self._json_response({"status": "ERROR", "error": "Falta tx_id"})
+            return {"status": "ERROR", "error": "Falta tx_id"}
+        previo = self.resultados.obtener(tx_id)
+        if previo is not None:
+            return {"status": previo[0], "tx_id": tx_id, "duplicada": True}
 
-        with self.lock:
-            try:
-                req_type = req.get("type", "").lower()
-                ops_to_prepare = []
-
-                if "transfer" in req_type:
-                    from_acc = int(req["from"])
-                    to_acc = int(req["to"])
-                    amount = float(req["amount"])
-
-                    # Validar y preparar débito si este nodo maneja la cuenta de origen
-                    if from_acc in self.cuentas:
-                        if self.cuentas[from_acc] < amount:
-                            return self._json_response({"status": "ERROR", "tx_id": tx_id, "error": "Saldo insuficiente"})
-                        ops_to_prepare.append(("debit", from_acc, amount))
-                    
-                    # Preparar crédito si este nodo maneja la cuenta de destino
-                    if to_acc in self.cuentas:
-                        ops_to_prepare.append(("credit", to_acc, amount))
-
-                elif "create" in req_type:
-                    acc = int(req["account"])
-                    initial = float(req["initial"])
-                    if acc in self.cuentas:
-                        return self._json_response({"status": "ERROR", "tx_id": tx_id, "error": "Cuenta ya existe"})
-                    ops_to_prepare.append(("create", acc, initial))
-
-                elif "delete" in req_type:
-                    acc = int(req["account"])
-                    if acc not in self.cuentas:
-                        return self._json_response({"status": "ERROR", "tx_id": tx_id, "error": "Cuenta no existe"})
-                    ops_to_prepare.append(("delete", acc, 0))
-                
-                self.prepared_ops[tx_id] = ops_to_prepare
-                return self._json_response({"status": "READY", "tx_id": tx_id})
+        try:
+            ops = self._ops_de(req)
+            cuentas = self._cuentas_de(ops)
+            firma = self._firma_ops(ops)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            return {"status": "ERROR", "tx_id": tx_id, "error": f"Petición PREPARE inválida: {e}"}
+        preparada = self.firmas_preparadas.get(tx_id)
+        if preparada is not None:
+            if preparada != firma:
+                return {"status": "ERROR", "tx_id": tx_id, "error": "tx_id reutilizado con otras operaciones"}
+            # Reintento de un PREPARE que ya está listo
+            return {"status": "READY", "tx_id": tx_id}
 
-            except Exception as e:
-                print(f"[Nodo-{self.port}] [ERROR] en PREPARE: {e}")
-                return self._json_response({"status": "ERROR", "tx_id": tx_id, "error": str(e)})
+        with self._preparando_lock:
+            if tx_id in self._preparando:
+                return {"status": "ERROR", "tx_id": tx_id, "error": "PREPARE en curso para esta transacción"}
+            self._preparando.add(tx_id)
+        try:
+            return self._preparar(tx_id, ops, cuentas, firma)
+        finally:
+            with self._preparando_lock:
+                self._preparando.discard(tx_id)
 
-    def _handle_commit(self, req):
-        """Lógica para la fase de COMMIT del 2PC."""
-        tx_id = req.get("tx_id")
-        if not tx_id or tx_id not in self.prepared_ops:
-            return self._json_response({"status": "ERROR", "tx_id": tx_id, "error": "COMMIT_FAIL: Transacción no preparada"})
+    def _preparar(self, tx_id, ops, cuentas, firma):
+        inicio = time.perf_counter()
+        adquiridos = self.bloqueos.adquirir(tx_id, cuentas, LOCK_TIMEOUT)
+        self.m_espera_lock.observar(time.perf_counter() - inicio, lock="cuentas")
+        if not adquiridos:
+            return {"status": "ERROR", "tx_id": tx_id, "error": "Cuenta bloqueada por otra transacción"}
 
-        with self.lock:
-            ops = self.prepared_ops.get(tx_id, [])
-            for op in ops:
-                op_type, acc, amount = op
+        try:
+            ops_to_prepare = self._validar_ops(ops)
+
+            # Se retiene el débito neto de cada cuenta en toda la transacción
+            netos = {}
+            for op_type, acc, amount in ops_to_prepare:
                 if op_type == "debit":
-                    self.cuentas[acc] -= amount
-                    self._registrar_transaccion_db(acc, "Débito", -amount)
+                    netos[acc] = netos.get(acc, 0) + amount
                 elif op_type == "credit":
-                    self.cuentas[acc] = self.cuentas.get(acc, 0.0) + amount
-                    self._registrar_transaccion_db(acc, "Crédito", amount)
-                elif op_type == "create":
-                    self.cuentas[acc] = amount
-                    self._registrar_transaccion_db(acc, "Creación de cuenta", amount)
-                elif op_type == "delete":
-                    del self.cuentas[acc]
-                    self._registrar_transaccion_db(acc, "Eliminación de cuenta", 0)
-            
-            self._persist_to_disk()
-            del self.prepared_ops[tx_id]
-        
-        return self._json_response({"status": "COMMITTED", "tx_id": tx_id})
+                    netos[acc] = netos.get(acc, 0) - amount
+            for acc, neto in netos.items():
+                if neto > 0:
+                    self.bloqueos.retener(tx_id, acc, neto)
+            # Un ABORT (o COMMIT) del mismo tx_id pudo resolverse mientras se esperaban los locks
+            with self.lock:
+                previo = self.resultados.obtener(tx_id)
+                if previo is None:
+                    self.netos_preparados[tx_id] = self._efecto_neto(ops_to_prepare)
+                    self.firmas_preparadas[tx_id] = firma
+                    self.prepared_ops[tx_id] = ops_to_prepare
+            if previo is not None:
+                self.bloqueos.liberar(tx_id)
+                return {"status": previo[0], "tx_id": tx_id, "duplicada": True}
+            return {"status": "READY", "tx_id": tx_id}
+
+        except ErrorValidacion as e:
+            self.bloqueos.liberar(tx_id)
+            return {"status": "ERROR", "tx_id": tx_id, "error": str(e)}
+        except Exception as e:
+            self.bloqueos.liberar(tx_id)
+            self.log.error("Error en PREPARE %s: %s", tx_id, e)
+            return {"status": "ERROR", "tx_id": tx_id, "error": str(e)}
+
+    def _handle_commit(self, req):
+        """Lógica para la fase de COMMIT del 2PC.
+
+        Un COMMIT repetido de una transacción ya confirmada responde COMMITTED
+        sin volver a aplicarla, una vez que su registro del WAL es durable.
+
+        Los saldos nuevos se calculan y se registran en el WAL bajo `lock`, pero
+        se aplican en memoria recién cuando el registro es durable: ninguna
+        lectura ve un commit que una caída podría perder. Mientras tanto la
+        transacción conserva sus locks de cuentas, así que ningún PREPARE valida
+        contra los saldos anteriores, y su efecto sigue en `netos_preparados`.
+        """
+        tx_id = req.get("tx_id")
+        inicio = time.perf_counter()
+        previo = None
+        with self.lock:
+            self.m_espera_lock.observar(time.perf_counter() - inicio, lock="commit")
+            ops = self.prepared_ops.pop(tx_id, None) if tx_id else None
+            if ops is None:
+                previo = self.resultados.obtener(tx_id) if tx_id else None
+            else:
+                self.firmas_preparadas.pop(tx_id, None)
+                cambios = {}  # cuenta -> valor final (None si se elimina): un lote toca cada cuenta una sola vez en el WAL
+                movimientos = []
+                for op in ops:
+                    op_type, acc, amount = op
+                    actual = cambios[acc] if acc in cambios else self.cuentas.get(acc)
+                    actual = actual or 0
+                    if op_type == "debit":
+                        cambios[acc] = actual - amount
+                        movimientos.append((acc, "Débito", -a_unidades(amount)))
+                    elif op_type == "credit":
+                        cambios[acc] = actual + amount
+                        movimientos.append((acc, "Crédito", a_unidades(amount)))
+                    elif op_type == "create":
+                        cambios[acc] = amount
+                        movimientos.append((acc, "Creación de cuenta", a_unidades(amount)))
+                    elif op_type == "delete":
+                        cambios[acc] = None
+                        movimientos.append((acc, "Eliminación de cuenta", 0))
+
+                seq = self._registrar_por_aplicar(tx_id, [["del", acc] if saldo is None else ["set", acc, saldo]
+                                                          for acc, saldo in cambios.items()])
+
+        if ops is None:
+            if previo is None:
+                return {"status": "ERROR", "tx_id": tx_id, "error": "COMMIT_FAIL: Transacción no preparada"}
+            return self._commit_repetido(tx_id, previo)
+
+        # La espera del fsync se hace fuera del lock para que varios COMMIT compartan el mismo
+        if not self._confirmar_durable(seq, tx_id):
+            return {"status": "ERROR", "tx_id": tx_id, "error": "COMMIT_FAIL: no se pudo persistir"}
+        self.bloqueos.liberar(tx_id)
+
+        # La auditoría solo registra lo que ya es durable en el nodo
+        self._registrar_transaccion_db(tx_id, movimientos)
+        return {"status": "COMMITTED", "tx_id": tx_id}
+
+    def _commit_repetido(self, tx_id, previo):
+        """Respuesta a un COMMIT de una transacción ya resuelta (reintento del coordinador)."""
+        resultado, _, seq = previo
+        if resultado == COMMITTED and seq:
+            # El COMMIT original puede seguir esperando su fsync: no se confirma antes que él
+            try:
+                self.wal.esperar_durable(seq)
+            except Exception as e:
+                self.log.error("WAL en COMMIT repetido %s: %s", tx_id, e)
+                return {"status": "ERROR", "tx_id": tx_id, "error": "COMMIT_FAIL: no se pudo persistir"}
+        return {"status": resultado, "tx_id": tx_id, "duplicada": True}
 
     def _handle_abort(self, req):
-        """Lógica para la fase de ABORT del 2PC."""
+        """Lógica para la fase de ABORT del 2PC.
+
+        Un ABORT de un tx_id desconocido queda registrado, así que un PREPARE
+        atrasado de esa transacción ya no la prepara. Un ABORT de una
+        transacción ya confirmada no la deshace y responde COMMITTED.
+        """
         tx_id = req.get("tx_id")
-        if tx_id in self.prepared_ops:
-            with self.lock:
-                del self.prepared_ops[tx_id]
-        return self._json_response({"status": "ABORTED", "tx_id": tx_id})
+        if not tx_id:
+            return {"status": "ABORTED", "tx_id": tx_id}
+        with self.lock:
+            ops = self.prepared_ops.pop(tx_id, None)
+            self.firmas_preparadas.pop(tx_id, None)
+            previo = self.resultados.obtener(tx_id) if ops is None else None
+            if previo is None:
+                self.resultados.registrar(tx_id, ABORTED)
+        if ops is not None:
+            self.netos_preparados.pop(tx_id, None)
+            self.bloqueos.liberar(tx_id)
+        if previo is not None and previo[0] == COMMITTED:
+            return {"status": COMMITTED, "tx_id": tx_id, "duplicada": True}
+        return {"status": "ABORTED", "tx_id": tx_id}
+
+    def _expirar_preparadas(self):
+        """Aborta las transacciones preparadas cuyo coordinador nunca envió COMMIT ni ABORT."""
+        while True:
+            time.sleep(1.0)
+            self.resultados.expirar()
+            for tx_id in self.bloqueos.vencidas(PREPARED_TIMEOUT):
+                # Si el COMMIT ya la tomó, es él quien suelta los locks
+                with self.lock:
+                    ops = self.prepared_ops.pop(tx_id, None)
+                    if ops is not None:
+                        self.firmas_preparadas.pop(tx_id, None)
+                        self.resultados.registrar(tx_id, ABORTED)
+                if ops is not None:
+                    self.log.warning("Transacción %s abandonada, se aborta por timeout.", tx_id)
+                    self.netos_preparados.pop(tx_id, None)
+                    self.bloqueos.liberar(tx_id)
+                elif self.migraciones.pop(tx_id, None) is not None:
+                    self.log.warning("Migración %s abandonada, se cancela por timeout.", tx_id)
+                    self.bloqueos.liberar(tx_id)
 
     def _handle_query(self, req):
         """Maneja una consulta de saldo."""
         try:
             acc = int(req["account"])
-            if acc in self.cuentas:
-                balance = self.cuentas[acc]
-                return self._json_response({"status": "OK", "account": acc, "balance": balance})
+            balance = self.cuentas.get(acc)
+            if balance is not None:
+                return {"status": "OK", "account": acc, "balance": a_unidades(balance)}
+            elif acc in self.migradas:
+                return {"status": "ERROR", "error": "CUENTA_MIGRADA", "particion": self.migradas[acc]}
             else:
-                return self._json_response({"status": "ERROR", "error": "NO_EXISTE_CUENTA"})
+                return {"status": "ERROR", "error": "NO_EXISTE_CUENTA"}
         except (KeyError, ValueError) as e:
-            return self._json_response({"status": "ERROR", "error": f"Petición de consulta inválida: {e}"})
+            return {"status": "ERROR", "error": f"Petición de consulta inválida: {e}"}
+
+    def _handle_multi_query(self, req):
+        """Saldos de varias cuentas en una respuesta, leídos en un mismo corte (bajo `lock`).
+
+        `saldos` mapea cada cuenta existente (como texto, por JSON) a su saldo;
+        las que no están en la partición van en `no_existen`, salvo las que se
+        migraron, que van en `migradas` con su partición nueva.
+        """
+        try:
+            cuentas = [int(acc) for acc in req["accounts"]]
+        except (KeyError, ValueError, TypeError) as e:
+            return {"status": "ERROR", "error": f"Petición CONSULTAR_CUENTAS inválida: {e}"}
+        if len(cuentas) > MAX_CUENTAS_CONSULTA:
+            return {"status": "ERROR", "error": f"Más de {MAX_CUENTAS_CONSULTA} cuentas por consulta"}
+        saldos, no_existen, migradas = {}, [], {}
+        with self.lock:
+            for acc in cuentas:
+                saldo = self.cuentas.get(acc)
+                if saldo is not None:
+                    saldos[str(acc)] = a_unidades(saldo)
+                elif acc in self.migradas:
+                    migradas[str(acc)] = self.migradas[acc]
+                else:
+                    no_existen.append(acc)
+            seq = self.replicacion.ultimo()
+        return {"status": "OK", "saldos": saldos, "no_existen": no_existen, "migradas": migradas, "seq": seq}
+
+    @staticmethod
+    def _efecto_neto(ops):
+        """Cambio en la suma de la partición que produciría aplicar `ops` (centavos).
+
+        Un DELETE no se cuenta: su efecto depende del saldo al momento del COMMIT.
+        """
+        neto = 0
+        for op_type, _, amount in ops:
+            if op_type == "debit":
+                neto -= amount
+            elif op_type in ("credit", "create"):
+                neto += amount
+        return neto
 
     def _handle_sum(self, req):
-        """Maneja una petición de suma de partición para el arqueo."""
-        total = sum(self.cuentas.values())
-        return self._json_response({"status": "OK", "sum": total})
+        """Suma de la partición para el arqueo, en O(1).
+
+        Se lee bajo el mismo lock que aplica los COMMIT, así que nunca incluye
+        un commit a medias, y se devuelve con el `seq` del último commit
+        aplicado: dos lecturas con el mismo seq vieron exactamente el mismo
+        estado. `pendiente` es el efecto neto de las transacciones preparadas
+        todavía sin COMMIT/ABORT; en una transferencia entre particiones los
+        pendientes de los participantes se compensan con lo ya confirmado, así
+        que suma + pendiente no varía mientras el 2PC está a medio camino.
+        """
+        with self.lock:
+            total = self.saldo_total
+            seq = self.wal.seq
+            pendientes = list(self.netos_preparados.values())
+        return {"status": "OK", "sum": a_unidades(total), "seq": seq,
+                "pendiente": a_unidades(sum(pendientes)), "preparadas": len(pendientes)}
+
+    def _handle_fetch_log(self, req):
+        """Commits con seq > `since` retenidos en memoria, para que una réplica se ponga al día."""
+        try:
+            since = int(req.get("since", 0))
+            maximo = max(1, min(int(req.get("max", LOTE_LOG)), 10 * LOTE_LOG))
+        except (TypeError, ValueError) as e:
+            return {"status": "ERROR", "error": f"Petición FETCH_LOG inválida: {e}"}
+        try:
+            registros = self.replicacion.leer(since, maximo)
+        except LogTruncado as e:
+            return {"status": "ERROR", "error": "LOG_TRUNCADO", "desde": e.desde}
+        return {"status": "OK", "registros": registros, "seq": self.replicacion.ultimo()}
+
+    def _handle_log_position(self, req):
+        """Seq desde el que pedir FETCH_LOG para una réplica cuyos últimos commits son `tx_ids`."""
+        tx_ids = req.get("tx_ids") or []
+        if not isinstance(tx_ids, list):
+            return {"status": "ERROR", "error": "tx_ids debe ser una lista"}
+        primero, encontrados = self.replicacion.posicion(tx_ids)
+        return {"status": "OK", "since": None if primero is None else primero - 1,
+                "encontrados": encontrados, "base": self.replicacion.base, "seq": self.replicacion.ultimo()}
+
+    def _handle_fetch_snapshot(self, req):
+        """Foto completa de la partición (centavos) servida por partes.
+
+        La primera parte captura los saldos y el seq bajo `lock`; las
+        siguientes piden la misma foto por `snapshot_id` mientras no venza.
+        """
+        try:
+            offset = int(req.get("offset", 0))
+            limite = max(1, min(int(req.get("limite", LOTE_SNAPSHOT)), 10 * LOTE_SNAPSHOT))
+        except (TypeError, ValueError) as e:
+            return {"status": "ERROR", "error": f"Petición FETCH_SNAPSHOT inválida: {e}"}
+        ahora = time.monotonic()
+        with self._snapshots_lock:
+            for viejo in [k for k, (vence, _, _) in self.snapshots_servidos.items() if vence < ahora]:
+                del self.snapshots_servidos[viejo]
+
+        snapshot_id = req.get("snapshot_id")
+        if snapshot_id is None:
+            with self.lock:
+                cuentas = list(self.cuentas.instantanea())
+                seq = self.replicacion.ultimo()
+            snapshot_id = f"{self.port}-{seq}-{uuid.uuid4().hex[:8]}"
+            with self._snapshots_lock:
+                self.snapshots_servidos[snapshot_id] = (ahora + VIDA_SNAPSHOT_SERVIDO, seq, cuentas)
+        else:
+            with self._snapshots_lock:
+                servido = self.snapshots_servidos.get(snapshot_id)
+            if servido is None:
+                return {"status": "ERROR", "error": "SNAPSHOT_VENCIDO"}
+            _, seq, cuentas = servido
+        parte = cuentas[offset:offset + limite]
+        siguiente = offset + len(parte) if offset + len(parte) < len(cuentas) else None
+        if siguiente is None:
+            with self._snapshots_lock:
+                self.snapshots_servidos.pop(snapshot_id, None)
+        return {"status": "OK", "snapshot_id": snapshot_id, "seq": seq, "total": len(cuentas),
+                "cuentas": [[acc, saldo] for acc, saldo in parte], "siguiente": siguiente}
+
+    def _handle_migrate_out(self, req):
+        """Salida de cuentas hacia otras particiones al cambiar el particionado, en fases como el 2PC.
+
+        - contar: cuántas cuentas de `particion` pertenecen a otra según `particionado`, por destino.
+        - preparar: bloquea hasta `limite` de esas cuentas y las devuelve con su saldo (centavos).
+        - confirmar: las elimina de este nodo (queda en el WAL, con su destino) y, ya durable, suelta los locks.
+        - cancelar: solo suelta los locks.
+        """
+        migracion_id = req.get("migracion_id")
+        fase = req.get("fase", "preparar")
+        if not migracion_id:
+            return {"status": "ERROR", "error": "Falta migracion_id"}
+
+        if fase == "confirmar":
+            cuentas = self.migraciones.pop(migracion_id, None)
+            if cuentas is None:
+                return {"status": "ERROR", "migracion_id": migracion_id, "error": "MIGRACION_DESCONOCIDA"}
+            with self.lock:
+                seq = self._registrar_por_aplicar(f"{migracion_id}:out",
+                                                  [["del", acc, destino] for acc, destino in cuentas])
+            if not self._confirmar_durable(seq, f"{migracion_id}:out"):
+                return {"status": "ERROR", "migracion_id": migracion_id, "error": "COMMIT_FAIL: no se pudo persistir"}
+            self.bloqueos.liberar(migracion_id)
+            return {"status": "COMMITTED", "migracion_id": migracion_id, "cuentas": len(cuentas)}
+        if fase == "cancelar":
+            if self.migraciones.pop(migracion_id, None) is not None:
+                self.bloqueos.liberar(migracion_id)
+            return {"status": "ABORTED", "migracion_id": migracion_id}
+        if fase not in ("contar", "preparar"):
+            return {"status": "ERROR", "error": f"Fase de migración desconocida: {fase}"}
+
+        try:
+            particion = int(req["particion"])
+            particionador = Particionador.desde_config(req["particionado"])
+            limite = int(req.get("limite", LOTE_SNAPSHOT))
+        except (KeyError, TypeError, ValueError) as e:
+            return {"status": "ERROR", "error": f"Petición MIGRATE_OUT inválida: {e}"}
+        if migracion_id in self.migraciones:
+            return {"status": "ERROR", "migracion_id": migracion_id, "error": "Migración ya preparada"}
+
+        with self.lock:
+            ids = [acc for acc, _ in self.cuentas.instantanea()]
+        salen = [(acc, destino) for acc, destino in zip(ids, map(particionador.particion, ids)) if destino != particion]
+        if fase == "contar":
+            por_destino = {}
+            for _, destino in salen:
+                por_destino[destino] = por_destino.get(destino, 0) + 1
+            return {"status": "OK", "cuentas": len(salen), "por_destino": por_destino}
+
+        lote = salen[:limite]
+        if not self.bloqueos.adquirir(migracion_id, [acc for acc, _ in lote], LOCK_TIMEOUT):
+            return {"status": "ERROR", "migracion_id": migracion_id, "error": "Cuenta bloqueada por otra transacción"}
+        por_destino = {}
+        with self.lock:
+            for acc, destino in lote:
+                saldo = self.cuentas.get(acc)
+                if saldo is not None:  # pudo eliminarse entre la lectura de ids y el lock
+                    por_destino.setdefault(str(destino), []).append([acc, saldo])
+        self.migraciones[migracion_id] = [(acc, int(destino)) for destino, cuentas in por_destino.items()
+                                          for acc, _ in cuentas]
+        return {"status": "READY", "migracion_id": migracion_id, "cuentas": por_destino,
+                "restantes": len(salen) - len(lote)}
+
+    def _handle_migrate_in(self, req):
+        """Entrada de cuentas migradas desde otra partición (saldos en centavos).
+
+        Es idempotente: una cuenta que ya existe con el mismo saldo se ignora.
+        Con `fase: deshacer` elimina las cuentas de una entrada que la
+        migración terminó cancelando. Las cuentas quedan bloqueadas hasta que
+        el registro del WAL es durable y el cambio se aplica en memoria.
+        """
+        migracion_id = req.get("migracion_id")
+        try:
+            cuentas = [(int(acc), int(saldo)) for acc, saldo in req["cuentas"]]
+        except (KeyError, TypeError, ValueError) as e:
+            return {"status": "ERROR", "error": f"Petición MIGRATE_IN inválida: {e}"}
+        if not migracion_id:
+            return {"status": "ERROR", "error": "Falta migracion_id"}
+
+        deshacer = req.get("fase") == "deshacer"
+        dueno = f"{migracion_id}:{'deshacer' if deshacer else 'in'}"
+        if not self.bloqueos.adquirir(dueno, [acc for acc, _ in cuentas], LOCK_TIMEOUT):
+            return {"status": "ERROR", "migracion_id": migracion_id, "error": "Cuenta bloqueada por otra transacción"}
+        persistido = True
+        try:
+            with self.lock:
+                if deshacer:
+                    cambios = [["del", acc] for acc, saldo in cuentas if self.cuentas.get(acc) == saldo]
+                else:
+                    conflictos = [acc for acc, saldo in cuentas if self.cuentas.get(acc, saldo) != saldo]
+                    if conflictos:
+                        return {"status": "ERROR", "migracion_id": migracion_id,
+                                "error": f"Cuentas ya existentes con otro saldo: {conflictos[:10]}"}
+                    # Aplicar el "set" también saca la cuenta de `migradas` (volvió a esta partición)
+                    cambios = [["set", acc, saldo] for acc, saldo in cuentas if acc not in self.cuentas]
+                if not cambios:
+                    return {"status": "COMMITTED", "migracion_id": migracion_id, "cuentas": 0}
+                seq = self._registrar_por_aplicar(dueno, cambios)
+            persistido = self._confirmar_durable(seq, dueno)
+            if not persistido:
+                return {"status": "ERROR", "migracion_id": migracion_id, "error": "COMMIT_FAIL: no se pudo persistir"}
+        finally:
+            # Si el WAL falló los locks quedan tomados: el nodo se detiene (ver _fallo_wal)
+            if persistido:
+                self.bloqueos.liberar(dueno)
+        return {"status": "COMMITTED", "migracion_id": migracion_id, "cuentas": len(cambios)}
+
+    def _aplicar_registro_remoto(self, reg):
+        """Aplica un commit recibido de un par y lo registra en el WAL propio."""
+        with self.lock:
+            ops = self._aplicar_cambios(reg["ops"])
+            return self._registrar_commit(reg.get("tx"), ops)
+
+    def ponerse_al_dia(self, config):
+        """Al arrancar, trae de otra réplica de la partición los commits que este nodo se perdió.
+
+        Se ubica en el log del par con los tx_id de sus últimos commits; si el
+        par ya no retiene esa parte, baja una foto completa y sigue desde su seq.
+        """
+        particion, pares = buscar_pares(config, self.port)
+        if not pares:
+            return False
+        recientes = list(self.tx_recientes)[-VENTANA_POSICION:]
+        for par in pares:
+            nombre = f"{par['host']}:{par['port']}"
+            cliente = PoolConexiones(par["host"], int(par["port"]), max_conexiones=1, timeout=10.0)
+            try:
+                pos = cliente.solicitar({"type": "LOG_POSITION", "tx_ids": recientes})
+                if pos.get("status") != "OK":
+                    continue  # un nodo Java/Go no implementa el envío de log
+                if pos.get("since") is not None:
+                    since = pos["since"]
+                elif not recientes and pos.get("base") == 0:
+                    since = 0
+                elif recientes and pos.get("base") == 0:
+                    # El par nunca vio nuestros commits: reemplazar el estado local podría perder datos
+                    self.log.warning("%s no conoce los últimos commits locales, no se sincroniza.", nombre)
+                    continue
+                else:
+                    since = self._descargar_snapshot(cliente, nombre)
+                aplicados = self._traer_log(cliente, since)
+                if aplicados is None:
+                    aplicados = self._traer_log(cliente, self._descargar_snapshot(cliente, nombre))
+                self.log.info("Partición %s: %d commits recibidos de %s.", particion, aplicados, nombre)
+                return True
+            except (OSError, ValueError, KeyError) as e:
+                self.log.warning("No se pudo sincronizar con %s: %s", nombre, e)
+            finally:
+                cliente.cerrar()
+        return False
+
+    def _traer_log(self, cliente, since):
+        """FETCH_LOG desde `since` hasta alcanzar al par; None si el par ya truncó esa parte."""
+        aplicados = 0
+        seq = None
+        while True:
+            resp = cliente.solicitar({"type": "FETCH_LOG", "since": since, "max": LOTE_LOG})
+            if resp.get("status") != "OK":
+                if resp.get("error") == "LOG_TRUNCADO":
+                    return None
+                raise ValueError(resp.get("error"))
+            for reg in resp["registros"]:
+                seq = self._aplicar_registro_remoto(reg)
+                since = reg["seq"]
+                aplicados += 1
+            if not resp["registros"] or since >= resp["seq"]:
+                break
+        if seq is not None:
+            self.wal.esperar_durable(seq)
+        return aplicados
+
+    def _descargar_snapshot(self, cliente, nombre):
+        """Reemplaza el estado local por una foto del par y devuelve su seq."""
+        self.log.info("Descargando la partición completa desde %s...", nombre)
+        pares = []
+        req = {"type": "FETCH_SNAPSHOT", "offset": 0, "limite": LOTE_SNAPSHOT}
+        while True:
+            resp = cliente.solicitar(req)
+            if resp.get("status") != "OK":
+                raise ValueError(resp.get("error"))
+            pares.extend((int(acc), int(saldo)) for acc, saldo in resp["cuentas"])
+            if resp["siguiente"] is None:
+                break
+            req = {"type": "FETCH_SNAPSHOT", "snapshot_id": resp["snapshot_id"],
+                   "offset": resp["siguiente"], "limite": LOTE_SNAPSHOT}
+        cuentas = ALMACENES[self.almacen]()
+        cuentas.cargar(pares)
+        with self.lock:
+            self.cuentas = cuentas
+            self.saldo_total = cuentas.total()
+            self.replicacion.reiniciar(self.wal.seq)
+            self.tx_recientes.clear()
+        # El WAL anterior ya no describe este estado: se compacta en un snapshot nuevo
+        self._checkpoint()
+        self.log.info("%d cuentas recibidas (seq %d en %s).", len(pares), resp["seq"], nombre)
+        return resp["seq"]
+
+    def _handle_stats(self, req):
+        """Devuelve contadores internos del nodo (cuentas, ops preparadas, resultados, auditoría, WAL)."""
+        return {
+            "status": "OK",
+            "port": self.port,
+            "cuentas": len(self.cuentas),
+            "conexiones": self.conexiones,
+            "prepared_ops": len(self.prepared_ops),
+            "cuentas_bloqueadas": self.bloqueos.bloqueadas(),
+            "wal_seq": self.wal.seq,
+            "log_retenido": {"base": self.replicacion.base, "ultimo": self.replicacion.ultimo()},
+            "resultados": self.resultados.estadisticas(),
+            "auditoria": self.auditor.estadisticas(),
+            "admision": self.admision.estadisticas() if self.admision else None,
+        }
+
+    def _handle_hello(self, req):
+        """Negociación de protocolo: acepta el binario si el cliente lo ofrece."""
+        proto = protocolo_binario.PROTO_BINARIO if protocolo_binario.PROTO_BINARIO in (req.get("proto") or []) else "json"
+        return {"status": "OK", "proto": proto}
+
+    def procesar(self, req):
+        """Despacha una petición ya decodificada al handler de su tipo y devuelve la respuesta como dict."""
+        if not isinstance(req, dict):
+            return {"status": "ERROR", "error": "Petición inválida"}
+        tipo = str(req.get("type", "")).upper()
+        if tipo not in TIPOS_METRICAS:
+            tipo = "OTRO"
+        inicio = time.perf_counter()
+        try:
+            resp = self._despachar(req)
+        except Exception as e:
+            self.log.error("Inesperado procesando petición: %s", e)
+            resp = {"status": "ERROR", "error": "Excepción en el nodo"}
+        self.m_duracion.observar(time.perf_counter() - inicio, tipo=tipo)
+        self.m_peticiones.inc(tipo=tipo, estado=resp.get("status", ""))
+        if CAMPO_ID in req:
+            # Correlación de peticiones en pipeline (ver common/cliente.py)
+            resp = dict(resp, **{CAMPO_ID: req[CAMPO_ID]})
+        return resp
+
+    def activar_admision(self, hilos=HILOS, capacidad=CAPACIDAD_COLA, espera_max=ESPERA_MAX_COLA):
+        """Procesa las peticiones en un pool de `hilos` con cola acotada en lugar de en el hilo de cada conexión."""
+        self.admision = PoolAdmision(
+            self.procesar, hilos=hilos, capacidad=capacidad, espera_max=espera_max, nombre=f"nodo-{self.port}",
+            al_rechazar=lambda motivo: self.m_rechazadas.inc(motivo=motivo),
+            al_desencolar=lambda segundos: self.m_espera_cola.observar(segundos))
+
+    def atender(self, req):
+        """Como `procesar`, pero pasando por el control de admisión si está activo."""
+        if self.admision is None or (isinstance(req, dict) and str(req.get("type", "")).upper() == "HELLO"):
+            return self.procesar(req)
+        return self.admision.enviar(req).result()
+
+    def atender_en_linea(self, req):
+        """Procesa `req` en el hilo que llama, rechazándola con BUSY si la cola de admisión está llena."""
+        if self.admision is not None and not (isinstance(req, dict) and str(req.get("type", "")).upper() == "HELLO"):
+            rechazo = self.admision.rechazo(req)
+            if rechazo is not None:
+                return rechazo
+        return self.procesar(req)
+
+    def conexion_abierta(self, delta):
+        with self._conexiones_lock:
+            self.conexiones += delta
+
+    def _despachar(self, req):
+        req_type = str(req.get("type", "")).upper()
+        if "PREPARE" in req_type:
+            return self._handle_prepare(req)
+        elif req_type == "COMMIT":
+            return self._handle_commit(req)
+        elif req_type == "ABORT":
+            return self._handle_abort(req)
+        elif req_type == "CONSULTAR_CUENTA":
+            return self._handle_query(req)
+        elif req_type == "CONSULTAR_CUENTAS":
+            return self._handle_multi_query(req)
+        elif req_type == "SUM_PARTITION":
+            return self._handle_sum(req)
+        elif req_type == "ESTADISTICAS":
+            return self._handle_stats(req)
+        elif req_type == "FETCH_LOG":
+            return self._handle_fetch_log(req)
+        elif req_type == "LOG_POSITION":
+            return self._handle_log_position(req)
+        elif req_type == "FETCH_SNAPSHOT":
+            return self._handle_fetch_snapshot(req)
+        elif req_type == "MIGRATE_OUT":
+            return self._handle_migrate_out(req)
+        elif req_type == "MIGRATE_IN":
+            return self._handle_migrate_in(req)
+        elif req_type == "HELLO":
+            return self._handle_hello(req)
+        return {"status": "ERROR", "error": "TIPO_DESCONOCIDO"}
+
+    def procesar_linea(self, line):
+        """Decodifica una línea JSON y devuelve la respuesta (dict), sin codificar."""
+        try:
+            req = json.loads(line)
+        except json.JSONDecodeError:
+            return {"status": "ERROR", "error": "JSON mal formado"}
+        return self.atender(req)
+
+    def procesar_frame(self, payload):
+        """Decodifica un frame del protocolo binario y devuelve la respuesta ya codificada como frame."""
+        try:
+            req = protocolo_binario.decodificar_peticion(payload)
+        except ValueError as e:
+            return protocolo_binario.codificar_respuesta({"status": "ERROR", "error": f"Frame inválido: {e}"})
+        return protocolo_binario.codificar_respuesta(self.atender(req))
 
     def handle_connection(self, conn, addr):
         """Maneja una conexión de cliente en un hilo."""
-        print(f"[Nodo-{self.port}] Conexión aceptada desde {addr}")
+        self.log.debug("Conexión aceptada desde %s", addr)
+        # El texto de cada línea solo se decodifica si se va a registrar
+        depurar = self.log.isEnabledFor(logging.DEBUG)
+        self.conexion_abierta(1)
         try:
-            with conn:
-                # Usamos un buffer para leer líneas completas
-                buffer = ""
-                while True:
-                    data = conn.recv(1024)
-                    if not data:
+            with conn, conn.makefile('rb') as lector:
+                for line in lector:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if depurar:
+                        self.log.debug("Recibido: %s", line.decode('utf-8', 'replace'))
+                    response = self.procesar_linea(line)
+                    conn.sendall(self._json_response(response))
+                    if response.get("proto") == protocolo_binario.PROTO_BINARIO:
+                        # HELLO aceptado: el resto de la conexión usa frames binarios
+                        while True:
+                            payload = protocolo_binario.leer_frame(lector)
+                            if payload is None:
+                                break
+                            conn.sendall(self.procesar_frame(payload))
                         break
-                    buffer += data.decode('utf-8')
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        print(f"[Nodo-{self.port}] Recibido: {line}")
-                        try:
-                            req = json.loads(line)
-                            req_type = req.get("type", "").upper()
-
-                            response = None
-                            if "PREPARE" in req_type:
-                                response = self._handle_prepare(req)
-                            elif req_type == "COMMIT":
-                                response = self._handle_commit(req)
-                            elif req_type == "ABORT":
-                                response = self._handle_abort(req)
-                            elif req_type == "CONSULTAR_CUENTA":
-                                response = self._handle_query(req)
-                            elif req_type == "SUM_PARTITION":
-                                response = self._handle_sum(req)
-                            else:
-                                response = self._json_response({"status": "ERROR", "error": "TIPO_DESCONOCIDO"})
-                            
-                            conn.sendall(response)
-
-                        except json.JSONDecodeError:
-                            conn.sendall(self._json_response({"status": "ERROR", "error": "JSON mal formado"}))
-                        except Exception as e:
-                            print(f"[Nodo-{self.port}] [ERROR] Inesperado en handle_connection: {e}")
-                            conn.sendall(self._json_response({"status": "ERROR", "error": "Excepción en el nodo"}))
         except ConnectionResetError:
-            print(f"[Nodo-{self.port}] Conexión cerrada abruptamente por {addr}")
+            self.log.debug("Conexión cerrada abruptamente por %s", addr)
         except Exception as e:
-            print(f"[Nodo-{self.port}] [ERROR] Fallo en la conexión con {addr}: {e}")
+            self.log.error("Fallo en la conexión con %s: %s", addr, e)
         finally:
-            print(f"[Nodo-{self.port}] Conexión con {addr} cerrada.")
+            self.conexion_abierta(-1)
+            self.log.debug("Conexión con %s cerrada.", addr)
 
 
     def start(self):
@@ -234,27 +1122,69 @@ class NodoWorker:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             s.bind(('127.0.0.1', self.port))
             s.listen()
-            print(f"[Nodo-{self.port}] Nodo trabajador de PYTHON escuchando en el puerto {self.port}")
+            self.log.info("Nodo trabajador de PYTHON escuchando en el puerto %d", self.port)
             while True:
                 conn, addr = s.accept()
+                if self.max_conexiones and self.conexiones >= self.max_conexiones:
+                    self.m_rechazadas.inc(motivo="max_conexiones")
+                    try:
+                        conn.sendall(self._json_response({"status": "BUSY", "error": "MAX_CONEXIONES", "retry_after": 1.0}))
+                    except OSError:
+                        pass
+                    conn.close()
+                    continue
+                # Sin Nagle: con peticiones en pipeline cada respuesta esperaría el ACK de la anterior
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 thread = threading.Thread(target=self.handle_connection, args=(conn, addr))
                 thread.daemon = True
                 thread.start()
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Uso: python python/nodo_worker.py <port> <data_file_path>")
-        sys.exit(1)
-    
+    parser = argparse.ArgumentParser(description="Nodo trabajador de Python")
+    parser.add_argument("port", type=int)
+    parser.add_argument("data_file_path")
+    parser.add_argument("--modo", choices=("hilos", "asyncio"), default="hilos",
+                        help="hilos: un hilo por conexión (por defecto); asyncio: un solo event loop con peticiones en pipeline")
+    parser.add_argument("--db", default=DB_PATH, help=f"base SQLite de auditoría (por defecto {DB_PATH})")
+    parser.add_argument("--almacen", choices=sorted(ALMACENES), default="dict",
+                        help="dict: búsquedas más rápidas; compacto: arreglos ordenados, ~16 bytes por cuenta")
+    parser.add_argument("--config", default=CONFIG_PATH, help="nodos_config.json para ubicar las otras réplicas de la partición")
+    parser.add_argument("--sin-catchup", action="store_true", help="no pedir a otras réplicas los commits perdidos al arrancar")
+    parser.add_argument("--metrics-port", type=int, help="puerto HTTP con las métricas en formato Prometheus (/metrics)")
+    parser.add_argument("--log-nivel", choices=bitacora.NIVELES, default="INFO",
+                        help="DEBUG registra cada conexión y cada línea recibida; OFF desactiva el log")
+    parser.add_argument("--log-max-por-segundo", type=int, default=20,
+                        help="máximo de mensajes iguales por segundo (0 = sin límite)")
+    parser.add_argument("--hilos", type=int, default=HILOS, help=f"hilos que procesan peticiones (por defecto {HILOS})")
+    parser.add_argument("--cola", type=int, default=CAPACIDAD_COLA,
+                        help=f"peticiones en espera antes de responder BUSY (por defecto {CAPACIDAD_COLA})")
+    parser.add_argument("--espera-max-cola", type=float, default=ESPERA_MAX_COLA,
+                        help=f"segundos en cola tras los que una petición se descarta con BUSY (por defecto {ESPERA_MAX_COLA})")
+    parser.add_argument("--max-conexiones", type=int, default=MAX_CONEXIONES,
+                        help=f"conexiones simultáneas en el modo por hilos (por defecto {MAX_CONEXIONES}; 0 = sin límite)")
+    parser.add_argument("--sin-admision", action="store_true",
+                        help="procesar cada petición en el hilo de su conexión, sin cola ni BUSY (comportamiento anterior)")
+    args = parser.parse_args()
+    bitacora.configurar(args.log_nivel, args.log_max_por_segundo)
+
     try:
-        port = int(sys.argv[1])
-        data_file = sys.argv[2]
-        
-        worker = NodoWorker(port, data_file)
-        worker.start()
-    except ValueError:
-        print("Error: El puerto debe ser un número entero.")
-        sys.exit(1)
+        worker = NodoWorker(args.port, args.data_file_path, db_path=args.db, almacen=args.almacen)
+        worker.max_conexiones = args.max_conexiones
+        if not args.sin_admision:
+            worker.activar_admision(args.hilos, args.cola, args.espera_max_cola)
+        if args.metrics_port:
+            servir_http(worker.metricas, args.metrics_port)
+            worker.log.info("Métricas en http://127.0.0.1:%d/metrics", args.metrics_port)
+        if not args.sin_catchup and os.path.exists(args.config):
+            with open(args.config) as f:
+                worker.ponerse_al_dia(json.load(f))
+        if args.modo == "asyncio":
+            from src.python.nodo_trabajador.servidor_asyncio import ServidorAsyncio
+            asyncio.run(ServidorAsyncio(worker, hilos=args.hilos).serve_forever())
+        else:
+            worker.start()
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
-        print(f"Error al iniciar el nodo: {e}")
+        logging.getLogger(f"nodo.{args.port}").error("Error al iniciar el nodo: %s", e)
         sys.exit(1)
@@ -0,0 +1,119 @@
+"""Retención de commits recientes y puesta al día de réplicas por envío de log.
+
+Cada nodo numera sus commits con el seq de su propio WAL, así que los seq de
+dos réplicas no son comparables entre sí. Una réplica que vuelve a arrancar
+se ubica en el log de un par a partir de los tx_id de sus últimos commits
+(LOG_POSITION) y pide desde ahí el resto (FETCH_LOG). Como los registros
+llevan saldos absolutos, volver a aplicar algunos commits que ya tenía no
+cambia nada, y empezar un poco antes cubre los commits que las réplicas
+aplicaron en distinto orden.
+
+Si el par ya no retiene esa parte del log, la réplica descarga una foto
+completa de la partición por partes (FETCH_SNAPSHOT) y sigue con el log desde
+el seq de esa foto.
+"""
+import itertools
+import json
+import os
+import threading
+from collections import deque
+
+# Commits que cada nodo conserva en memoria para servir FETCH_LOG
+RETENCION_LOG = 100000
+# tx_id de commits propios que se guardan junto al snapshot para ubicarse al reiniciar
+TX_RECIENTES = 1000
+# Últimos tx_id con los que se busca la posición: cubre commits aplicados en distinto orden por las réplicas
+VENTANA_POSICION = 256
+
+
+class LogTruncado(Exception):
+    def __init__(self, desde):
+        super().__init__(f"el log retenido empieza después del seq {desde}")
+        self.desde = desde
+
+
+class RegistroReplicacion:
+    """Últimos commits (seq, tx_id, cambios) en orden de seq, sin huecos.
+
+    Se retienen los registros `base + 1 .. base + len`; con base 0 el log está
+    completo desde el primer commit del nodo.
+    """
+
+    def __init__(self, capacidad=RETENCION_LOG):
+        self._lock = threading.Lock()
+        self._registros = deque()
+        self._por_tx = {}
+        self.capacidad = capacidad
+        self.base = 0
+
+    def reiniciar(self, seq):
+        """Vacía la retención; el próximo registro debe ser `seq + 1`."""
+        with self._lock:
+            self._registros.clear()
+            self._por_tx.clear()
+            self.base = seq
+
+    def ultimo(self):
+        with self._lock:
+            return self.base + len(self._registros)
+
+    def agregar(self, seq, tx_id, cambios):
+        with self._lock:
+            if seq <= self.base + len(self._registros):
+                return  # ya retenido (p.ej. un registro del WAL incluido en el snapshot)
+            if seq != self.base + len(self._registros) + 1:
+                # Hueco: lo anterior ya no sirve para FETCH_LOG
+                self._registros.clear()
+                self._por_tx.clear()
+                self.base = seq - 1
+            self._registros.append((seq, tx_id, cambios))
+            self._por_tx[tx_id] = seq
+            while len(self._registros) > self.capacidad:
+                viejo_seq, viejo, _ = self._registros.popleft()
+                self.base += 1
+                if self._por_tx.get(viejo) == viejo_seq:
+                    del self._por_tx[viejo]
+
+    def leer(self, since, maximo):
+        """Registros con seq > `since`, hasta `maximo`. Lanza LogTruncado si falta alguno."""
+        with self._lock:
+            if since < self.base:
+                raise LogTruncado(self.base)
+            inicio = since - self.base
+            return [{"seq": s, "tx": tx, "ops": ops}
+                    for s, tx, ops in itertools.islice(self._registros, inicio, inicio + maximo)]
+
+    def posicion(self, tx_ids):
+        """Menor seq entre los tx_ids conocidos y cuántos se encontraron."""
+        with self._lock:
+            seqs = [self._por_tx[tx] for tx in tx_ids if tx in self._por_tx]
+        return (min(seqs) if seqs else None), len(seqs)
+
+
+def leer_tx_recientes(ruta):
+    """Contenido de `<archivo de datos>.txs`: (últimos tx_id propios, resultados de tx_id recientes,
+    pares [cuenta, partición] de las cuentas que migraron a otra partición)."""
+    try:
+        with open(ruta) as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return [], [], []
+    return datos.get("tx", []), datos.get("resultados", []), datos.get("migradas", [])
+
+
+def guardar_tx_recientes(ruta, tx_ids, seq, resultados=(), migradas=()):
+    tmp = ruta + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"seq": seq, "tx": tx_ids, "resultados": list(resultados), "migradas": list(migradas)}, f,
+                  separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, ruta)
+
+
+def buscar_pares(config, port, hosts=("127.0.0.1", "localhost")):
+    """Partición y demás réplicas del nodo que escucha en `port`, según nodos_config.json."""
+    for particion, nodos in config.get("partitions_map", {}).items():
+        if any(int(n["port"]) == port and n["host"] in hosts for n in nodos):
+            return int(particion), [n for n in nodos if not (int(n["port"]) == port and n["host"] in hosts)]
+    return None, []
@@ -0,0 +1,86 @@
+"""Resultado reciente de cada tx_id, para que PREPARE/COMMIT/ABORT sean idempotentes.
+
+Un coordinador que no recibió la respuesta de un COMMIT (timeout, conexión
+cortada) lo reintenta con el mismo tx_id. Sin este registro el nodo ya no
+tiene la transacción preparada y responde "no preparada", y el coordinador no
+puede distinguir un COMMIT aplicado de uno perdido. Con él:
+
+* COMMIT de una transacción ya confirmada responde COMMITTED otra vez (después
+  de que su registro del WAL sea durable), sin volver a aplicarla;
+* PREPARE de un tx_id ya resuelto devuelve ese resultado en lugar de
+  prepararla de nuevo, así que un reintento nunca aplica dos veces;
+* ABORT de un tx_id desconocido deja constancia: un PREPARE atrasado que
+  llegue después se rechaza (aborto presunto).
+
+Los resultados se guardan en orden de llegada con su instante (epoch) y se
+descartan por antigüedad (`retencion` segundos) o al superar `capacidad`.
+Los COMMIT sobreviven a un reinicio porque el WAL lleva el tx_id y el
+instante de cada uno y el checkpoint guarda el registro junto al snapshot;
+los ABORT posteriores al último checkpoint se pierden en una caída, lo que
+solo cambia la respuesta de un reintento de "ABORTED" a "no preparada".
+"""
+import threading
+import time
+from collections import OrderedDict
+
+COMMITTED = "COMMITTED"
+ABORTED = "ABORTED"
+# Segundos que se recuerda el resultado de una transacción, y máximo de resultados retenidos
+RETENCION_RESULTADOS = 600.0
+MAX_RESULTADOS = 200000
+
+
+class RegistroResultados:
+    def __init__(self, retencion=RETENCION_RESULTADOS, capacidad=MAX_RESULTADOS):
+        self.retencion = retencion
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._resultados = OrderedDict()  # tx_id -> (resultado, instante, seq del WAL o 0)
+
+    def __len__(self):
+        return len(self._resultados)
+
+    def registrar(self, tx_id, resultado, seq=0, instante=None):
+        if tx_id is None:
+            return
+        instante = time.time() if instante is None else instante
+        with self._lock:
+            self._resultados.pop(tx_id, None)
+            self._resultados[tx_id] = (resultado, instante, seq)
+            self._expirar(instante)
+
+    def obtener(self, tx_id):
+        """(resultado, instante, seq) de `tx_id`, o None si no se conoce o ya venció."""
+        with self._lock:
+            entrada = self._resultados.get(tx_id)
+        if entrada is None or entrada[1] < time.time() - self.retencion:
+            return None
+        return entrada
+
+    def expirar(self):
+        with self._lock:
+            self._expirar(time.time())
+
+    def _expirar(self, ahora):
+        limite = ahora - self.retencion
+        while self._resultados:
+            _, (_, instante, _) = next(iter(self._resultados.items()))
+            if instante >= limite and len(self._resultados) <= self.capacidad:
+                break
+            self._resultados.popitem(last=False)
+
+    def instantanea(self):
+        """Resultados vigentes como [[tx_id, resultado, instante]], para guardarlos con el snapshot."""
+        with self._lock:
+            self._expirar(time.time())
+            return [[tx, resultado, round(instante, 3)] for tx, (resultado, instante, _) in self._resultados.items()]
+
+    def cargar(self, filas):
+        for tx, resultado, instante in filas:
+            self.registrar(tx, resultado, instante=instante)
+
+    def estadisticas(self):
+        with self._lock:
+            confirmadas = sum(1 for r, _, _ in self._resultados.values() if r == COMMITTED)
+            return {"retenidos": len(self._resultados), "confirmadas": confirmadas,
+                    "abortadas": len(self._resultados) - confirmadas}
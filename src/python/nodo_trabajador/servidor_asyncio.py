@@ -0,0 +1,161 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from src.python.common import protocolo_binario
+
+# Tipos que pueden bloquear (locks, espera del fsync del WAL); el resto se resuelve en memoria
+TIPOS_BLOQUEANTES = ("PREPARE", "COMMIT", "ABORT", "MIGRATE", "CONSULTAR_CUENTAS")
+
+
+class ServidorAsyncio:
+    """Servidor del NodoWorker sobre un único event loop.
+
+    Habla el mismo protocolo que el modo por hilos (una petición JSON por
+    línea, una respuesta por línea), pero acepta pipelining: el cliente puede
+    enviar muchas peticiones sin esperar las respuestas. Cada petición se
+    procesa en cuanto llega y las respuestas se escriben en el orden en que se
+    recibieron las peticiones, que es lo que esperan los clientes actuales.
+
+    Las consultas en memoria se atienden en el propio loop; PREPARE/COMMIT/
+    ABORT se envían a un pool de hilos porque toman locks y esperan el disco:
+    el pool de admisión del worker si está activo (cola acotada, BUSY al
+    saturarse, COMMIT/ABORT primero) o si no un ThreadPoolExecutor. Las
+    consultas no ocupan la cola, pero se rechazan con BUSY mientras esté llena.
+    Tras un HELLO que acepte el protocolo binario, la conexión pasa a frames.
+    Dentro de una conexión, las peticiones con el mismo tx_id se ejecutan en
+    orden, y una consulta espera a las escrituras enviadas antes que ella, así
+    que un pipeline ve lo mismo que si las peticiones se mandaran una a una.
+    """
+
+    def __init__(self, worker, host='127.0.0.1', max_en_vuelo=128, hilos=32, limite_linea=4 * 1024 * 1024):
+        self.worker = worker
+        self.host = host
+        self.max_en_vuelo = max_en_vuelo
+        self.limite_linea = limite_linea
+        self.executor = None
+        if worker.admision is None:
+            self.executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix=f"nodo-{worker.port}")
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._atender, self.host, self.worker.port,
+                                            limit=self.limite_linea, backlog=1024)
+        self.worker.log.info("Nodo trabajador de PYTHON (asyncio) escuchando en el puerto %d", self.worker.port)
+        async with server:
+            await server.serve_forever()
+
+    def _despachar(self, loop, req, escrituras, codificar):
+        """Devuelve un awaitable con la respuesta a `req` ya codificada con `codificar`.
+
+        `escrituras` mapea tx_id -> última tarea bloqueante de esa transacción
+        en la conexión, para encadenar las que deben ir en orden. Una bloqueante
+        sin tx_id (CONSULTAR_CUENTAS) es una lectura y, como las demás, espera a
+        todas las escrituras anteriores de la conexión.
+        """
+        req_type = str(req.get("type", "")).upper() if isinstance(req, dict) else ""
+        if any(t in req_type for t in TIPOS_BLOQUEANTES):
+            tx_id = req.get("tx_id")
+            previas = [escrituras.get(tx_id)] if tx_id is not None else list(escrituras.values())
+            tarea = asyncio.ensure_future(self._ejecutar_tras(previas, req, codificar, en_executor=True))
+            escrituras[tx_id] = tarea
+            tarea.add_done_callback(lambda t: escrituras.pop(tx_id) if escrituras.get(tx_id) is t else None)
+            return tarea
+        if escrituras:
+            return asyncio.ensure_future(self._ejecutar_tras(list(escrituras.values()), req, codificar, en_executor=False))
+        return self._listo(loop, codificar(self.worker.atender_en_linea(req)))
+
+    async def _ejecutar_tras(self, previas, req, codificar, en_executor):
+        previas = [p for p in previas if p is not None]
+        if previas:
+            await asyncio.wait(previas)
+        if en_executor and self.executor is None:
+            resp = await asyncio.wrap_future(self.worker.admision.enviar(req))
+        elif en_executor:
+            resp = await asyncio.get_running_loop().run_in_executor(self.executor, self.worker.procesar, req)
+        else:
+            resp = self.worker.atender_en_linea(req)
+        return codificar(resp)
+
+    @staticmethod
+    def _listo(loop, valor):
+        fut = loop.create_future()
+        fut.set_result(valor)
+        return fut
+
+    async def _atender(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        # La cola acota cuántas peticiones de una misma conexión pueden estar en vuelo
+        en_vuelo = asyncio.Queue(maxsize=self.max_en_vuelo)
+        escritor = asyncio.create_task(self._escribir_respuestas(en_vuelo, writer))
+        escrituras = {}
+        codificar = self.worker._json_response
+        self.worker.conexion_abierta(1)
+        try:
+            while True:
+                if codificar is protocolo_binario.codificar_respuesta:
+                    try:
+                        payload = await protocolo_binario.leer_frame_async(reader)
+                    except ValueError as e:
+                        await en_vuelo.put(self._listo(loop, codificar({"status": "ERROR", "error": str(e)})))
+                        break
+                    if payload is None:
+                        break
+                    try:
+                        req = protocolo_binario.decodificar_peticion(payload)
+                    except ValueError as e:
+                        await en_vuelo.put(self._listo(loop, codificar({"status": "ERROR", "error": f"Frame inválido: {e}"})))
+                        continue
+                    await en_vuelo.put(self._despachar(loop, req, escrituras, codificar))
+                    continue
+
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    await en_vuelo.put(self._listo(loop, codificar({"status": "ERROR", "error": "Petición demasiado grande"})))
+                    break
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    req = json.loads(line)
+                except json.JSONDecodeError:
+                    await en_vuelo.put(self._listo(loop, codificar({"status": "ERROR", "error": "JSON mal formado"})))
+                    continue
+                if isinstance(req, dict) and str(req.get("type", "")).upper() == "HELLO":
+                    resp = self.worker.procesar(req)
+                    await en_vuelo.put(self._listo(loop, codificar(resp)))
+                    if resp.get("proto") == protocolo_binario.PROTO_BINARIO:
+                        codificar = protocolo_binario.codificar_respuesta
+                    continue
+                await en_vuelo.put(self._despachar(loop, req, escrituras, codificar))
+        except ConnectionError:
+            pass
+        finally:
+            self.worker.conexion_abierta(-1)
+            await en_vuelo.put(None)
+            await escritor
+            writer.close()
+
+    async def _escribir_respuestas(self, en_vuelo, writer):
+        error = False
+        while True:
+            fut = await en_vuelo.get()
+            if fut is None:
+                break
+            resp = await fut
+            if error:
+                continue
+            try:
+                writer.write(resp)
+                # Se agrupan las escrituras mientras haya respuestas listas en la cola
+                if en_vuelo.empty():
+                    await writer.drain()
+            except ConnectionError:
+                error = True
+        if not error:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
@@ -0,0 +1,298 @@
+"""Supervisor de nodos Python: un proceso por réplica asignada a esta máquina.
+
+Lee `config/nodos_config.json`, lanza un `nodo_worker.py` por cada réplica
+cuyo host es local (o por las indicadas con `--puertos`), fija cada proceso a
+un núcleo con `sched_setaffinity` y lo reinicia si termina, con espera
+creciente si vuelve a caer enseguida. En el puerto de administración sirve
+por HTTP el estado de cada hijo (`/salud`) y sus ESTADISTICAS y sumas de
+partición agregadas (`/estadisticas`).
+
+Uso:
+    python3 src/python/nodo_trabajador/supervisor.py --puerto-admin 7100
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+sys.path.append(ROOT_DIR)
+
+from src.python.common.cliente import PoolConexiones
+
+CONFIG_PATH = os.path.join(ROOT_DIR, "config", "nodos_config.json")
+WORKER_PATH = os.path.join(ROOT_DIR, "src", "python", "nodo_trabajador", "nodo_worker.py")
+HOSTS_LOCALES = {"127.0.0.1", "localhost", "0.0.0.0", socket.gethostname()}
+# Espera antes de reiniciar un hijo caído: se duplica en cada caída rápida hasta el máximo
+ESPERA_REINICIO = 1.0
+ESPERA_REINICIO_MAX = 30.0
+# Un hijo que duró más que esto se considera estable y la espera vuelve al mínimo
+VIDA_ESTABLE = 60.0
+TIMEOUT_CONSULTA = 1.0
+
+
+def ruta_datos(particion, replica):
+    """Archivo de datos de una réplica según la convención de generar_datos.py."""
+    return os.path.join(ROOT_DIR, "data", f"particion{particion}_replica{replica}", f"cuentas_part{particion}.txt")
+
+
+def nodos_locales(config, puertos=None):
+    """(partición, índice de réplica, nodo) de cada réplica que corresponde a esta máquina.
+
+    Un nodo con `"lenguaje"` distinto de python en la configuración se deja a
+    su propio proceso (Java/Go).
+    """
+    asignados = []
+    for particion, nodos in sorted(config.get("partitions_map", {}).items(), key=lambda kv: int(kv[0])):
+        for replica, nodo in enumerate(nodos):
+            if puertos is not None and int(nodo["port"]) not in puertos:
+                continue
+            if puertos is None and (nodo["host"] not in HOSTS_LOCALES or nodo.get("lenguaje", "python") != "python"):
+                continue
+            asignados.append((int(particion), replica, nodo))
+    return asignados
+
+
+class Hijo:
+    """Un proceso nodo_worker.py y su historial de reinicios."""
+
+    def __init__(self, particion, replica, nodo, nucleo, args_worker, dir_logs=None, metrics_port=None):
+        self.particion = particion
+        self.replica = replica
+        self.port = int(nodo["port"])
+        self.metrics_port = metrics_port
+        self.data_file = nodo.get("data_file") or ruta_datos(particion, replica)
+        self.nucleo = nucleo
+        self.args_worker = args_worker
+        self.dir_logs = dir_logs
+        self.proceso = None
+        self.inicio = None
+        self.reinicios = 0
+        self.ultimo_codigo = None
+        self.espera = ESPERA_REINICIO
+        self.proximo_arranque = 0.0
+
+    def arrancar(self):
+        comando = [sys.executable, WORKER_PATH, str(self.port), self.data_file] + self.args_worker
+        if self.metrics_port:
+            comando += ["--metrics-port", str(self.metrics_port)]
+        salida = None
+        if self.dir_logs:
+            os.makedirs(self.dir_logs, exist_ok=True)
+            salida = open(os.path.join(self.dir_logs, f"nodo_{self.port}.log"), "ab")
+        try:
+            self.proceso = subprocess.Popen(comando, cwd=ROOT_DIR, stdout=salida,
+                                            stderr=subprocess.STDOUT if salida else None)
+        finally:
+            if salida:
+                salida.close()
+        self.inicio = time.monotonic()
+        if self.nucleo is not None:
+            try:
+                os.sched_setaffinity(self.proceso.pid, {self.nucleo})
+            except OSError as e:
+                print(f"[Supervisor] [WARN] No se pudo fijar el nodo {self.port} al núcleo {self.nucleo}: {e}")
+        print(f"[Supervisor] Nodo {self.port} (partición {self.particion}, réplica {self.replica}) "
+              f"iniciado con pid {self.proceso.pid}" + (f" en el núcleo {self.nucleo}" if self.nucleo is not None else ""))
+
+    def vivo(self):
+        return self.proceso is not None and self.proceso.poll() is None
+
+    def revisar(self, ahora):
+        """Reinicia el proceso si terminó y ya pasó su espera."""
+        if self.vivo():
+            return
+        if self.proceso is not None:
+            self.ultimo_codigo = self.proceso.returncode
+            duracion = ahora - self.inicio
+            self.espera = ESPERA_REINICIO if duracion >= VIDA_ESTABLE else min(self.espera * 2, ESPERA_REINICIO_MAX)
+            self.proximo_arranque = ahora + self.espera
+            self.proceso = None
+            print(f"[Supervisor] [WARN] Nodo {self.port} terminó con código {self.ultimo_codigo} "
+                  f"tras {duracion:.1f}s; se reinicia en {self.espera:.0f}s.")
+            return
+        if ahora >= self.proximo_arranque:
+            self.reinicios += 1
+            self.arrancar()
+
+    def detener(self, timeout=5.0):
+        if not self.vivo():
+            return
+        self.proceso.terminate()
+        try:
+            self.proceso.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
+            self.proceso.wait()
+
+    def salud(self):
+        vivo = self.vivo()
+        return {
+            "port": self.port,
+            "particion": self.particion,
+            "replica": self.replica,
+            "data_file": self.data_file,
+            "pid": self.proceso.pid if vivo else None,
+            "vivo": vivo,
+            "nucleo": self.nucleo,
+            "metrics_port": self.metrics_port,
+            "reinicios": self.reinicios,
+            "ultimo_codigo": self.ultimo_codigo,
+            "uptime": round(time.monotonic() - self.inicio, 1) if vivo else 0.0,
+        }
+
+
+class Supervisor:
+    def __init__(self, asignados, args_worker, nucleos=None, dir_logs=None, desplazamiento_metricas=None):
+        self.hijos = []
+        for i, (particion, replica, nodo) in enumerate(asignados):
+            nucleo = nucleos[i % len(nucleos)] if nucleos else None
+            metrics_port = int(nodo["port"]) + desplazamiento_metricas if desplazamiento_metricas else None
+            self.hijos.append(Hijo(particion, replica, nodo, nucleo, args_worker, dir_logs, metrics_port))
+        self.ejecutor = ThreadPoolExecutor(max_workers=max(1, min(32, len(self.hijos))))
+        self._detener = threading.Event()
+
+    def iniciar(self):
+        for hijo in self.hijos:
+            hijo.arrancar()
+
+    def vigilar(self):
+        while not self._detener.wait(0.5):
+            ahora = time.monotonic()
+            for hijo in self.hijos:
+                hijo.revisar(ahora)
+
+    def detener(self):
+        self._detener.set()
+        for hijo in self.hijos:
+            if hijo.vivo():
+                hijo.proceso.terminate()
+        for hijo in self.hijos:
+            hijo.detener()
+
+    def salud(self):
+        hijos = [h.salud() for h in self.hijos]
+        return {"status": "OK", "vivos": sum(h["vivo"] for h in hijos), "total": len(hijos), "nodos": hijos}
+
+    @staticmethod
+    def _consultar(port):
+        cliente = PoolConexiones("127.0.0.1", port, max_conexiones=1, timeout=TIMEOUT_CONSULTA, reintentos=0)
+        try:
+            stats, suma = cliente.solicitar_varias([{"type": "ESTADISTICAS"}, {"type": "SUM_PARTITION"}])
+            return stats, suma
+        except (OSError, ValueError) as e:
+            return {"status": "ERROR", "error": str(e)}, None
+        finally:
+            cliente.cerrar()
+
+    def estadisticas(self):
+        """ESTADISTICAS y SUM_PARTITION de cada hijo vivo, más totales por partición."""
+        vivos = [h for h in self.hijos if h.vivo()]
+        respuestas = list(self.ejecutor.map(lambda h: self._consultar(h.port), vivos))
+        nodos, particiones = [], {}
+        totales = {"cuentas": 0, "prepared_ops": 0, "cuentas_bloqueadas": 0}
+        for hijo, (stats, suma) in zip(vivos, respuestas):
+            nodos.append({"port": hijo.port, "particion": hijo.particion, "estadisticas": stats, "suma": suma})
+            if stats.get("status") != "OK":
+                continue
+            for clave in totales:
+                totales[clave] += stats.get(clave, 0)
+            if suma and suma.get("status") == "OK":
+                particiones.setdefault(hijo.particion, {})[hijo.port] = suma["sum"]
+        return {"status": "OK", "vivos": len(vivos), "total": len(self.hijos), "totales": totales,
+                "sumas_por_particion": particiones, "nodos": nodos}
+
+
+def crear_admin(supervisor, puerto):
+    class AdminHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            ruta = self.path.split("?", 1)[0].rstrip("/")
+            if ruta in ("", "/salud"):
+                datos = supervisor.salud()
+            elif ruta == "/estadisticas":
+                datos = supervisor.estadisticas()
+            else:
+                self.send_error(404)
+                return
+            cuerpo = json.dumps(datos, indent=2).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), AdminHandler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _interrumpir(*_):
+    raise KeyboardInterrupt
+
+
+def nucleos_disponibles():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return None  # sched_setaffinity solo existe en Linux
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lanza y supervisa un nodo Python por réplica asignada a esta máquina")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--puertos", help="lista de puertos a lanzar (por defecto, todos los nodos locales del config)")
+    parser.add_argument("--puerto-admin", type=int, default=7100, help="puerto HTTP con /salud y /estadisticas")
+    parser.add_argument("--sin-afinidad", action="store_true", help="no fijar cada nodo a un núcleo")
+    parser.add_argument("--logs", help="directorio para la salida de cada nodo (por defecto, la del supervisor)")
+    parser.add_argument("--modo", choices=("hilos", "asyncio"), default="hilos")
+    parser.add_argument("--almacen", default="dict")
+    parser.add_argument("--db", help="base SQLite de auditoría de los nodos")
+    parser.add_argument("--log-nivel", default="INFO", help="nivel de log de los nodos (DEBUG, INFO, WARNING, ERROR, OFF)")
+    parser.add_argument("--metrics-desplazamiento", type=int,
+                        help="servir las métricas de cada nodo en su puerto + este valor (p.ej. 1000: 7008 -> 8008)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    puertos = {int(p) for p in args.puertos.split(",")} if args.puertos else None
+    asignados = nodos_locales(config, puertos)
+    if not asignados:
+        print("[Supervisor] Ningún nodo del config corresponde a esta máquina.")
+        sys.exit(1)
+
+    args_worker = ["--modo", args.modo, "--almacen", args.almacen, "--config", os.path.abspath(args.config),
+                   "--log-nivel", args.log_nivel]
+    if args.db:
+        args_worker += ["--db", os.path.abspath(args.db)]
+    nucleos = None if args.sin_afinidad else nucleos_disponibles()
+
+    supervisor = Supervisor(asignados, args_worker, nucleos, args.logs, args.metrics_desplazamiento)
+    # SIGTERM (p.ej. detener_cluster.sh) detiene a los hijos igual que Ctrl+C
+    signal.signal(signal.SIGTERM, _interrumpir)
+    admin = crear_admin(supervisor, args.puerto_admin)
+    print(f"[Supervisor] {len(asignados)} nodos en {len(nucleos) if nucleos else 0} núcleos; "
+          f"administración en http://127.0.0.1:{args.puerto_admin}/salud")
+    supervisor.iniciar()
+    try:
+        supervisor.vigilar()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("[Supervisor] Deteniendo nodos...")
+        admin.shutdown()
+        supervisor.detener()
+
+
+if __name__ == "__main__":
+    main()
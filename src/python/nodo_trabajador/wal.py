@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+
+
+class WriteAheadLog:
+    """Log de escritura anticipada con group commit para el NodoWorker.
+
+    Cada COMMIT agrega un registro con los valores *absolutos* que dejó en las
+    cuentas (no los deltas), así reproducir el log dos veces sobre el mismo
+    snapshot da el mismo resultado. El registro lleva además el tx_id y el
+    instante ("t", epoch) del commit, con los que el nodo recuerda qué
+    transacciones ya confirmó después de un reinicio. Un único hilo escribe los registros
+    pendientes y hace un solo fsync por lote: todos los COMMIT que llegaron
+    mientras el fsync anterior estaba en curso se confirman juntos.
+
+    Un error de escritura o de fsync es permanente: después de un fsync fallido
+    no se sabe qué llegó a disco, así que todo `esperar_durable` posterior
+    falla y el dueño del log (vía `al_fallar`) debe detenerse y reproducirlo.
+    """
+
+    def __init__(self, ruta, seq_inicial=0, al_sincronizar=None, al_fallar=None):
+        self.ruta = ruta
+        # Callback opcional (segundos, registros) tras cada write+fsync de un lote
+        self.al_sincronizar = al_sincronizar
+        # Callback opcional (excepción) cuando el log pasa a estado de error
+        self.al_fallar = al_fallar
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._pendientes = []
+        self._seq = seq_inicial
+        self._seq_durable = seq_inicial
+        self._error = None
+        self._cerrado = False
+        self._archivo = open(self.ruta, 'ab')
+        self._hilo = threading.Thread(target=self._bucle_flush, daemon=True)
+        self._hilo.start()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def registrar(self, tx_id, cambios):
+        """Encola un registro y devuelve su número de secuencia.
+
+        `cambios` es una lista de ["set", cuenta, saldo] o ["del", cuenta]; la
+        salida de una cuenta por migración es ["del", cuenta, partición destino].
+        El registro no es durable hasta que `esperar_durable(seq)` retorna.
+        """
+        with self._cond:
+            self._seq += 1
+            linea = json.dumps({"seq": self._seq, "tx": tx_id, "t": round(time.time(), 3), "ops": cambios},
+                               separators=(',', ':'))
+            self._pendientes.append((linea + '\n').encode())
+            self._cond.notify_all()
+            return self._seq
+
+    def esperar_durable(self, seq, timeout=None):
+        """Bloquea hasta que el registro `seq` haya sido escrito y sincronizado a disco."""
+        with self._cond:
+            ok = self._cond.wait_for(lambda: self._seq_durable >= seq or self._error is not None, timeout)
+            if self._error is not None:
+                raise IOError(f"WAL no disponible: {self._error}")
+            if not ok:
+                raise TimeoutError(f"WAL: timeout esperando seq {seq}")
+
+    def tamano(self):
+        try:
+            return os.path.getsize(self.ruta)
+        except OSError:
+            return 0
+
+    def _tomar_lote(self):
+        with self._cond:
+            lote, self._pendientes = self._pendientes, []
+            return lote, self._seq
+
+    def _escribir_lote(self, lote, ultimo_seq):
+        """Escribe un lote y hace fsync. Debe llamarse con `_io_lock` tomado."""
+        try:
+            if lote:
+                inicio = time.perf_counter()
+                self._archivo.write(b''.join(lote))
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+                if self.al_sincronizar is not None:
+                    self.al_sincronizar(time.perf_counter() - inicio, len(lote))
+        except Exception as e:
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+            if self.al_fallar is not None:
+                self.al_fallar(e)
+            return
+        with self._cond:
+            if ultimo_seq > self._seq_durable:
+                self._seq_durable = ultimo_seq
+            self._cond.notify_all()
+
+    def _bucle_flush(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pendientes or self._cerrado)
+                if self._cerrado and not self._pendientes:
+                    return
+            with self._io_lock:
+                lote, ultimo = self._tomar_lote()
+                self._escribir_lote(lote, ultimo)
+
+    def rotar(self):
+        """Vacía lo pendiente, renombra el log actual a `<ruta>.old` y abre uno nuevo.
+
+        Devuelve la ruta del log antiguo, que el checkpoint borra cuando el
+        snapshot que lo cubre ya está en disco.
+        """
+        ruta_old = self.ruta + '.old'
+        with self._io_lock:
+            lote, ultimo = self._tomar_lote()
+            self._escribir_lote(lote, ultimo)
+            if self._error is not None:
+                raise IOError(f"WAL no disponible: {self._error}")
+            self._archivo.close()
+            if os.path.exists(ruta_old):
+                # Un checkpoint anterior no llegó a terminar: se conserva su contenido.
+                with open(ruta_old, 'ab') as old, open(self.ruta, 'rb') as actual:
+                    old.write(actual.read())
+                    old.flush()
+                    os.fsync(old.fileno())
+                os.remove(self.ruta)
+            else:
+                os.replace(self.ruta, ruta_old)
+            self._archivo = open(self.ruta, 'ab')
+        return ruta_old
+
+    def cerrar(self):
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify_all()
+        self._hilo.join()
+        with self._io_lock:
+            self._archivo.close()
+
+    @staticmethod
+    def leer_registros(ruta):
+        """Itera los registros de un archivo de log, ignorando una última línea truncada."""
+        if not os.path.exists(ruta):
+            return
+        with open(ruta, 'rb') as f:
+            for linea in f:
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    # Escritura interrumpida por una caída: el resto del archivo no es confiable.
+                    return